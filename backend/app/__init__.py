@@ -1,11 +1,28 @@
-from . import auth
-from . import crud
-from . import db
-from . import models
-from . import schemas
-from . import websocket_manager
-from . import ai_evaluator
-from . import config
-from . import speech_google
-from . import opensmile_integration
-from . import audio_processor # <-- NEW: Register the new module
\ No newline at end of file
+from . import auth
+from . import user_cache
+from . import crud
+from . import question_bank
+from . import db
+from . import models
+from . import schemas
+from . import metrics
+from . import pubsub
+from . import websocket_manager
+from . import llm_cache
+from . import llm_client
+from . import ai_evaluator
+from . import config
+from . import process_pool
+from . import transcription
+from . import speech_google
+from . import stt_backends
+from . import opensmile_integration
+from . import acoustic_features
+from . import audio_stream
+from . import audio_decoder
+from . import vad
+from . import pipeline
+from . import live_stt
+from . import job_queue
+from . import eval_writer
+from . import audio_processor # <-- NEW: Register the new module
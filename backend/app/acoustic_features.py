@@ -0,0 +1,199 @@
+import numpy as np
+
+from .audio_decoder import DecodedAudio
+
+# ----------------------------------------------------
+# In-process replacement for the emobase LLDs we use
+# (jitter, shimmer, intensity, voicing probability)
+# ----------------------------------------------------
+FRAME_SEC = 0.04          # two periods of the lowest pitch we track
+HOP_SEC = 0.01            # emobase frame step
+F0_MIN, F0_MAX = 50.0, 500.0
+VOICING_THRESHOLD = 0.45
+INTENSITY_FRAME_SEC = 0.025
+PERIOD_SEARCH = 0.2       # cPitchJitter searchRangeRel
+PERIOD_REFINE = 3         # samples a period mark may move to match the previous period
+MIN_PERIOD_CC = 0.5       # cPitchJitter minCC
+BLOCK_FRAMES = 2048       # frames per FFT batch, bounds peak memory
+
+
+def _frame_signal(x: np.ndarray, frame_len: int, hop: int) -> np.ndarray:
+    if len(x) < frame_len:
+        x = np.pad(x, (0, frame_len - len(x)))
+    return np.lib.stride_tricks.sliding_window_view(x, frame_len)[::hop]
+
+
+def _pitch_block(frames: np.ndarray, window: np.ndarray, window_ac: np.ndarray,
+                 lag_min: int, lag_max: int):
+    """Normalised autocorrelation pitch picking for a block of frames."""
+    windowed = (frames - frames.mean(axis=1, keepdims=True)) * window
+    n_fft = 1 << int(np.ceil(np.log2(2 * frames.shape[1])))
+    spec = np.fft.rfft(windowed, n_fft, axis=1)
+    ac = np.fft.irfft(spec.real ** 2 + spec.imag ** 2, n_fft, axis=1)[:, :lag_max + 2]
+
+    energy = ac[:, :1]
+    ac = np.divide(ac, energy, out=np.zeros_like(ac), where=energy > 0)
+    # Undo the taper of the analysis window (Boersma 1993)
+    ac = ac / window_ac[:lag_max + 2]
+
+    search = ac[:, lag_min:lag_max + 1]
+    lag = np.argmax(search, axis=1) + lag_min
+    rows = np.arange(len(frames))
+
+    # Octave check: prefer a sub-multiple of the best lag if it is nearly as strong
+    best = ac[rows, lag]
+    for k in (3, 2):
+        sub_lag = np.rint(lag / k).astype(int)
+        ok = (sub_lag >= lag_min) & (ac[rows, np.maximum(sub_lag, 1)] >= 0.9 * best)
+        lag = np.where(ok, sub_lag, lag)
+
+    # Parabolic interpolation around the peak for sub-sample periods
+    left, mid, right = ac[rows, lag - 1], ac[rows, lag], ac[rows, lag + 1]
+    denom = left - 2 * mid + right
+    offset = np.divide(0.5 * (left - right), denom,
+                       out=np.zeros_like(mid), where=np.abs(denom) > 1e-12)
+    offset = np.clip(offset, -0.5, 0.5)
+
+    return lag + offset, np.clip(mid, 0.0, 1.0)
+
+
+def _period_marks(frames: np.ndarray, lag: np.ndarray, max_periods: int):
+    """
+    Walk each frame period by period, as cPitchJitter does: the next period
+    starts at the strongest peak 0.8-1.2 periods on, moved by a few samples to
+    where the waveform best matches the previous period. Returns period
+    lengths (NaN where the match is poor) and peak-to-peak amplitudes, both
+    NaN-padded to (frames, max_periods).
+    """
+    n, frame_len = frames.shape
+    rows = np.arange(n)[:, None]
+    period = np.rint(lag).astype(int)
+    span = np.arange(period.max())[None, :]
+    in_period = span < period[:, None]
+    mag = np.abs(frames)
+
+    def segment(starts):
+        idx = np.clip(starts[:, None] + span, 0, frame_len - 1)
+        return np.where(in_period, frames[rows, idx], 0.0)
+
+    mark = np.argmax(np.where(in_period, mag[:, :period.max()], -1.0), axis=1)
+    lengths = np.full((n, max_periods), np.nan, dtype=np.float32)
+    amps = np.full((n, max_periods), np.nan, dtype=np.float32)
+    width = np.ceil(2 * PERIOD_SEARCH * lag).astype(int) + 1
+    search = np.arange(width.max())[None, :]
+    shifts = np.arange(-PERIOD_REFINE, PERIOD_REFINE + 1)
+    shift_idx = np.arange(len(shifts))[None, :]
+    reach = np.arange(span.shape[1] + 2 * PERIOD_REFINE)[None, :]
+
+    for k in range(max_periods):
+        lo = np.floor(mark + (1 - PERIOD_SEARCH) * lag).astype(int)
+        inside = lo + width + period + PERIOD_REFINE < frame_len
+        if not inside.any():
+            break
+        idx = np.minimum(lo[:, None] + search, frame_len - 1)
+        peak = idx[rows[:, 0], np.argmax(np.where(search < width[:, None], mag[rows, idx], -1.0), axis=1)]
+
+        # Match the previous period against every shift from one gather
+        prev = segment(mark)
+        ahead = frames[rows, np.clip(peak[:, None] - PERIOD_REFINE + reach, 0, frame_len - 1)]
+        windows = np.lib.stride_tricks.sliding_window_view(ahead, span.shape[1], axis=1)
+        dots = np.einsum("nst,nt->ns", windows, prev)
+        energy = np.concatenate([np.zeros((n, 1)), np.cumsum(ahead ** 2, axis=1)], axis=1)
+        cur_energy = np.take_along_axis(energy, shift_idx + period[:, None], axis=1) - energy[:, :len(shifts)]
+        norm = np.sqrt(np.sum(prev ** 2, axis=1)[:, None] * cur_energy)
+        cc = np.divide(dots, norm, out=np.zeros_like(dots), where=norm > 0)
+        best = np.clip(np.argmax(cc, axis=1), 1, len(shifts) - 2)
+        left, mid, right = (cc[rows[:, 0], best + d] for d in (-1, 0, 1))
+        denom = left - 2 * mid + right
+        offset = np.divide(0.5 * (left - right), denom,
+                           out=np.zeros_like(mid), where=np.abs(denom) > 1e-12)
+
+        nxt = peak + shifts[best]
+        matched = inside & (mid >= MIN_PERIOD_CC)
+        lengths[:, k] = np.where(matched, nxt + np.clip(offset, -0.5, 0.5) - mark, np.nan)
+        amps[:, k] = np.where(inside, prev.max(axis=1) - prev.min(axis=1), np.nan)
+        mark = np.where(inside, nxt, mark)
+    return lengths, amps
+
+
+def _local_perturbation(values: np.ndarray) -> np.ndarray:
+    """Per frame: mean |v[i+1] - v[i]| over adjacent non-NaN pairs / mean v."""
+    diffs = np.abs(np.diff(values, axis=1))
+    pairs = np.sum(~np.isnan(diffs), axis=1)
+    counts = np.sum(~np.isnan(values), axis=1)
+    num = np.divide(np.nansum(diffs, axis=1), pairs, out=np.zeros(len(values)), where=pairs > 0)
+    den = np.divide(np.nansum(values, axis=1), counts, out=np.zeros(len(values)), where=counts > 0)
+    return np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+
+
+def _emobase_intensity(x: np.ndarray, sr: int) -> np.ndarray:
+    """
+    pcm_intensity as emobase's cIntensity computes it: its loop is bounded by
+    the output vector length, so only the first two samples of each 25ms
+    frame are summed, but divided by the whole Hamming window's sum.
+    """
+    frame_len = int(round(INTENSITY_FRAME_SEC * sr))
+    hop = int(round(HOP_SEC * sr))
+    if len(x) < frame_len:
+        return np.zeros(0)
+    window = np.hamming(frame_len)
+    starts = np.arange(0, len(x) - frame_len + 1, hop)
+    return (window[0] * x[starts] ** 2 + window[1] * x[starts + 1] ** 2) / window.sum()
+
+
+def extract_numpy_features(audio: DecodedAudio) -> dict:
+    """
+    Compute jitter, shimmer, loudness and voicing from in-memory PCM.
+    Returns the same keys as extract_opensmile_features.
+    """
+    sr = audio.sample_rate
+    x = audio.as_float()
+    frame_len = int(round(FRAME_SEC * sr))
+    hop = int(round(HOP_SEC * sr))
+    lag_min = int(sr / F0_MAX)
+    lag_max = min(int(np.ceil(sr / F0_MIN)), frame_len - 2)
+
+    window = np.hamming(frame_len).astype(np.float32)
+    window_ac = np.correlate(window, window, mode="full")[frame_len - 1:]
+    window_ac = window_ac / window_ac[0]
+    window_ac = np.maximum(window_ac, 1e-3)
+
+    frames = _frame_signal(x, frame_len, hop)
+    max_periods = frame_len // lag_min
+
+    lags, voicing, energy = [], [], []
+    for start in range(0, len(frames), BLOCK_FRAMES):
+        block = frames[start:start + BLOCK_FRAMES]
+        lag, prob = _pitch_block(block, window, window_ac, lag_min, lag_max)
+        lags.append(lag)
+        voicing.append(prob)
+        energy.append(np.sum(block ** 2 * window, axis=1) / np.sum(window))
+
+    lags = np.concatenate(lags)
+    voicing = np.concatenate(voicing)
+    energy = np.concatenate(energy)
+
+    # Ignore near-silent frames, whose autocorrelation is all noise
+    audible = energy > max(1e-6, 0.01 * np.percentile(energy, 95))
+    voiced = np.flatnonzero((voicing >= VOICING_THRESHOLD) & audible)
+    # Blocks of similar pitch keep the per-period arrays as narrow as the periods
+    voiced = voiced[np.argsort(lags[voiced], kind="stable")]
+
+    jitter, shimmer = [np.zeros(0)], [np.zeros(0)]
+    for start in range(0, len(voiced), BLOCK_FRAMES):
+        idx = voiced[start:start + BLOCK_FRAMES]
+        lengths, amps = _period_marks(frames[idx], lags[idx], max_periods)
+        jitter.append(_local_perturbation(lengths))
+        shimmer.append(_local_perturbation(amps))
+    jitter = np.concatenate(jitter)
+    shimmer = np.concatenate(shimmer)
+    # Like cPitchJitter, frames without two matched periods give no value
+    measured = jitter > 0
+    intensity = _emobase_intensity(x, sr)
+
+    return {
+        "jitter": float(np.mean(jitter[measured])) if measured.any() else 0.0,
+        "shimmer": float(np.mean(shimmer[measured])) if measured.any() else 0.0,
+        "loudness": float(np.mean(intensity)) if len(intensity) else 0.0,
+        "voicing": float(np.mean(np.where(audible, voicing, 0.0))) if len(voicing) else 0.0,
+    }
@@ -1,95 +1,299 @@
-import asyncio
-import json
-import re
-from google import genai
-from google.genai import types
-from .config import settings
-
-# ---- REQUIRED GLOBAL CLIENT ----
-client = genai.Client(api_key=settings.GEMINI_API_KEY)
-
-async def evaluate_answer_with_gemini(question_text, answer_text, acoustic_features):
-    """
-    Evaluate correctness using transcript + fluency using acoustic features.
-    """
-
-    prompt = f"""
-    Evaluate a candidate's interview answer.
-
-    You MUST return a JSON object with ONLY these keys:
-    - correctness_score (0–100)
-    - fluency_score (0–100)
-    - combined_score (0–100)
-    - feedback (string)
-
-    --- Interview Question ---
-    {question_text}
-
-    --- Transcript ---
-    "{answer_text}"
-
-    --- Acoustic Features (from real audio analysis) ---
-    jitter: {acoustic_features['jitter']}          # vocal stability
-    shimmer: {acoustic_features['shimmer']}        # amplitude stability
-    loudness: {acoustic_features['loudness']}      # speaking energy
-    speech_rate: {acoustic_features['speech_rate']}  # words per second
-    pause_ratio: {acoustic_features['pause_ratio']}  # silence proportion
-
-    **Interpretation rules for fluency:**
-    - High jitter/shimmer = shaky/unclear voice → reduce fluency score
-    - Very low or very high speech rate = slow/rushed speech → reduce fluency score
-    - High pause_ratio = too many pauses → reduce fluency
-    - loudness too low = low confidence
-
-    Rate correctness ONLY on meaning and quality of the transcript.
-    """
-
-    loop = asyncio.get_event_loop()
-
-    def run_gemini():
-        return client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json",
-                temperature=0.2
-            )
-        )
-
-    resp = await loop.run_in_executor(None, run_gemini)
-    content = resp.text
-
-    try:
-        return json.loads(content)
-    except:
-        import re
-        match = re.search(r"\{.*\}", content, re.S)
-        if match:
-            return json.loads(match.group(0))
-        return {
-            "correctness_score": 0,
-            "fluency_score": 0,
-            "combined_score": 0,
-            "feedback": "Could not parse Gemini response."
-        }
-async def generate_followup_question(transcript: str):
-    prompt = f"""
-    You are an AI interviewer.
-    Given the candidate's answer, generate ONE follow-up question.
-    Make it relevant and non-repetitive.
-
-    Answer: {transcript}
-
-    Output ONLY the follow-up question as plain text.
-    """
-
-    loop = asyncio.get_event_loop()
-
-    def run_gemini():
-        return client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt
-        )
-
-    resp = await loop.run_in_executor(None, run_gemini)
-    return resp.text.strip()
+import json
+import re
+from typing import Callable
+from google import genai
+from google.genai import types
+from pydantic import ValidationError
+from .config import settings
+from .llm_cache import llm_cache, make_key
+from .llm_client import llm_client, LlmError
+from . import schemas
+
+# ---- REQUIRED GLOBAL CLIENT ----
+# The SDK's own HTTP timeout (ms) backs up llm_client's deadline, so a hung
+# request does not hold one of its worker threads forever
+client = genai.Client(
+    api_key=settings.GEMINI_API_KEY,
+    http_options=types.HttpOptions(timeout=int(settings.LLM_TIMEOUT_SECONDS * 1000)),
+)
+
+# Returned (never cached) when Gemini is unreachable or the breaker is open
+DEGRADED_EVALUATION = {
+    "correctness_score": 0,
+    "fluency_score": 0,
+    "combined_score": 0,
+    "feedback": "Automatic scoring is temporarily unavailable; this answer was not scored.",
+    "degraded": True,
+}
+DEGRADED_FOLLOWUP = "Could you walk me through a concrete example from your own experience?"
+UNPARSEABLE_FEEDBACK = "Could not parse Gemini response."
+
+
+def _parse_json_response(content: str):
+    try:
+        return json.loads(content)
+    except:
+        match = re.search(r"\{.*\}", content, re.S)
+        if match:
+            try:
+                return json.loads(match.group(0))
+            except ValueError:
+                pass
+        return None
+
+
+# ----------------------------------------------------
+# Streaming: pull fields out of a JSON response as it arrives
+# ----------------------------------------------------
+_SCORE_RE = re.compile(r'"(correctness_score|fluency_score|combined_score)"\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}]')
+_FEEDBACK_RE = re.compile(r'"feedback"\s*:\s*"')
+
+
+def _partial_json_string(text: str, start: int) -> str:
+    """Decode the complete part of the JSON string literal starting at `start`."""
+    i, n = start, len(text)
+    while i < n:
+        c = text[i]
+        if c == '"':
+            break
+        if c == "\\":
+            width = 6 if i + 1 < n and text[i + 1] == "u" else 2
+            if i + width > n:
+                break           # escape sequence split across chunks
+            i += width
+        else:
+            i += 1
+    value = json.loads('"' + text[start:i] + '"', strict=False)
+    if value and "\ud800" <= value[-1] <= "\udbff":
+        # First half of a surrogate pair; wait for the second
+        value = value[:-1]
+    return value
+
+
+class _PartialEvaluation:
+    """
+    Feed it the response text chunk by chunk; each feed returns what became
+    known: newly complete scores and the feedback text added since last time.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.scores = {}
+        self.feedback = ""
+
+    def feed(self, chunk: str) -> dict:
+        self.text += chunk
+        update = {}
+        for key, value in _SCORE_RE.findall(self.text):
+            if key not in self.scores:
+                self.scores[key] = json.loads(value)
+                update.setdefault("scores", {})[key] = self.scores[key]
+
+        match = _FEEDBACK_RE.search(self.text)
+        if match:
+            feedback = _partial_json_string(self.text, match.end())
+            if len(feedback) > len(self.feedback):
+                update["feedback_delta"] = feedback[len(self.feedback):]
+                self.feedback = feedback
+        return update
+
+
+async def _generate_json(prompt, config, kind: str, on_partial: Callable[[dict], None] = None) -> str:
+    """
+    Response text of a JSON-mode call. With on_partial (and GEMINI_STREAMING)
+    the response is streamed and every parsed update is passed to it first.
+
+    If the stream fails after updates were passed on, the text received so
+    far is returned when it already holds the whole JSON object; otherwise
+    the LlmError propagates (and the caller retracts what was streamed).
+    """
+    if on_partial is None or not settings.GEMINI_STREAMING:
+        def run_gemini():
+            return client.models.generate_content(
+                model=settings.GEMINI_MODEL,
+                contents=prompt,
+                config=config
+            )
+
+        resp = await llm_client.call(run_gemini, kind=kind)
+        return resp.text or ""
+
+    def open_stream():
+        return client.models.generate_content_stream(
+            model=settings.GEMINI_MODEL,
+            contents=prompt,
+            config=config
+        )
+
+    parsed = _PartialEvaluation()
+
+    def on_text(chunk):
+        update = parsed.feed(chunk)
+        if update:
+            on_partial(update)
+
+    try:
+        return await llm_client.stream(open_stream, on_text, kind=kind)
+    except LlmError:
+        if not parsed.text:
+            raise
+        if isinstance(_parse_json_response(parsed.text), dict):
+            # Only the end of the stream was lost; the callers validate it as usual
+            return parsed.text
+        raise
+
+
+def _evaluation_prompt(question_text, answer_text, acoustic_features, with_followup=False):
+    followup_key = """
+    - followup_question (string): ONE relevant, non-repetitive follow-up question""" if with_followup else ""
+
+    return f"""
+    Evaluate a candidate's interview answer.
+
+    You MUST return a JSON object with ONLY these keys:
+    - correctness_score (0–100)
+    - fluency_score (0–100)
+    - combined_score (0–100)
+    - feedback (string){followup_key}
+
+    --- Interview Question ---
+    {question_text}
+
+    --- Transcript ---
+    "{answer_text}"
+
+    --- Acoustic Features (from real audio analysis) ---
+    jitter: {acoustic_features['jitter']}          # vocal stability
+    shimmer: {acoustic_features['shimmer']}        # amplitude stability
+    loudness: {acoustic_features['loudness']}      # speaking energy
+    speech_rate: {acoustic_features['speech_rate']}  # words per second
+    pause_ratio: {acoustic_features['pause_ratio']}  # silence proportion
+
+    **Interpretation rules for fluency:**
+    - High jitter/shimmer = shaky/unclear voice → reduce fluency score
+    - Very low or very high speech rate = slow/rushed speech → reduce fluency score
+    - High pause_ratio = too many pauses → reduce fluency
+    - loudness too low = low confidence
+
+    Rate correctness ONLY on meaning and quality of the transcript.
+    """
+
+
+async def evaluate_answer_with_gemini(question_text, answer_text, acoustic_features, on_partial=None):
+    """
+    Evaluate correctness using transcript + fluency using acoustic features.
+    Identical (normalized) inputs are answered from llm_cache.
+    on_partial receives streamed scores / feedback deltas (GEMINI_STREAMING).
+    """
+    cache_key = make_key(
+        "evaluation", settings.GEMINI_MODEL, question_text, answer_text, acoustic_features
+    )
+    cached = await llm_cache.get(cache_key)
+    if cached is not None:
+        # Callers decorate the feedback, so never hand out the cached dict itself
+        return dict(cached)
+
+    prompt = _evaluation_prompt(question_text, answer_text, acoustic_features)
+
+    config = types.GenerateContentConfig(
+        response_mime_type="application/json",
+        temperature=0.2
+    )
+    try:
+        text = await _generate_json(prompt, config, "evaluation", on_partial)
+    except LlmError:
+        return dict(DEGRADED_EVALUATION)
+    data = _parse_json_response(text)
+
+    # Only a well-formed evaluation may be cached; anything else would fail on every hit
+    if isinstance(data, dict):
+        try:
+            result = schemas.EvaluationScores(**data).dict()
+        except ValidationError:
+            result = None
+        if result is not None:
+            await llm_cache.set(cache_key, result)
+            return dict(result)
+
+    return {
+        "correctness_score": 0,
+        "fluency_score": 0,
+        "combined_score": 0,
+        "feedback": UNPARSEABLE_FEEDBACK
+    }
+
+
+async def generate_followup_question(transcript: str):
+    cache_key = make_key("followup", settings.GEMINI_MODEL, transcript=transcript)
+    cached = await llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    prompt = f"""
+    You are an AI interviewer.
+    Given the candidate's answer, generate ONE follow-up question.
+    Make it relevant and non-repetitive.
+
+    Answer: {transcript}
+
+    Output ONLY the follow-up question as plain text.
+    """
+
+    def run_gemini():
+        return client.models.generate_content(
+            model=settings.GEMINI_MODEL,
+            contents=prompt
+        )
+
+    try:
+        resp = await llm_client.call(run_gemini, kind="followup")
+    except LlmError:
+        return DEGRADED_FOLLOWUP
+    question = resp.text.strip()
+    if question:
+        await llm_cache.set(cache_key, question)
+    return question
+
+
+
+async def evaluate_and_followup_with_gemini(question_text, answer_text, acoustic_features, on_partial=None):
+    """
+    Scores, feedback and the follow-up question from ONE structured-JSON call.
+    Returns None when the response does not validate, so callers can fall back
+    to evaluate_answer_with_gemini + generate_followup_question. When Gemini
+    itself is unavailable the degraded result is returned instead; two more
+    calls would only fail the same way. on_partial works as in
+    evaluate_answer_with_gemini.
+    """
+    cache_key = make_key(
+        "combined", settings.GEMINI_MODEL, question_text, answer_text, acoustic_features
+    )
+    cached = await llm_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached)
+
+    prompt = _evaluation_prompt(question_text, answer_text, acoustic_features, with_followup=True)
+
+    config = types.GenerateContentConfig(
+        response_mime_type="application/json",
+        response_schema=schemas.CombinedEvaluationOut,
+        temperature=0.2
+    )
+    try:
+        text = await _generate_json(prompt, config, "combined", on_partial)
+    except LlmError:
+        return dict(DEGRADED_EVALUATION, followup_question=DEGRADED_FOLLOWUP)
+    data = _parse_json_response(text)
+    if not isinstance(data, dict):
+        return None
+
+    try:
+        result = schemas.CombinedEvaluationOut(**data).dict()
+    except ValidationError:
+        return None
+
+    if not result["followup_question"].strip():
+        return None
+
+    await llm_cache.set(cache_key, result)
+    return dict(result)
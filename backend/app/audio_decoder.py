@@ -0,0 +1,180 @@
+import asyncio
+import os
+import subprocess
+import tempfile
+from dataclasses import dataclass
+
+import numpy as np
+import soundfile as sf
+
+from .config import settings
+
+
+# ----------------------------------------------------
+# Decoded audio shared by every pipeline stage
+# ----------------------------------------------------
+@dataclass
+class DecodedAudio:
+    samples: np.ndarray      # mono int16 PCM
+    sample_rate: int
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate if self.sample_rate > 0 else 0.0
+
+    @property
+    def pcm_bytes(self) -> bytes:
+        """Raw LINEAR16 bytes, as expected by Google STT."""
+        return self.samples.tobytes()
+
+    def as_float(self) -> np.ndarray:
+        return self.samples.astype(np.float32) / 32768.0
+
+
+# ----------------------------------------------------
+# FFMPEG: WebM bytes → PCM over stdin/stdout
+# ----------------------------------------------------
+_decode_slots = None
+
+
+def _slots() -> asyncio.Semaphore:
+    global _decode_slots
+    if _decode_slots is None:
+        _decode_slots = asyncio.Semaphore(settings.FFMPEG_MAX_CONCURRENCY)
+    return _decode_slots
+
+
+def _ffmpeg_command(sample_rate: int):
+    return [
+        settings.FFMPEG_PATH,
+        "-nostats", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
+        "-ac", "1",
+        "-ar", str(sample_rate),
+        "pipe:1",
+    ]
+
+
+def _run_ffmpeg_blocking(command, audio_bytes: bytes):
+    proc = subprocess.run(
+        command, input=audio_bytes, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    return proc.returncode, proc.stdout, proc.stderr
+
+
+async def decode_audio(audio_bytes: bytes, sample_rate: int = None) -> DecodedAudio:
+    """
+    Decode a WebM/Opus answer to mono 16-bit PCM fully in memory.
+    At most FFMPEG_MAX_CONCURRENCY ffmpeg processes run at once.
+    """
+    sample_rate = sample_rate or settings.AUDIO_SAMPLE_RATE
+    command = _ffmpeg_command(sample_rate)
+
+    async with _slots():
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except NotImplementedError:
+            # Windows SelectorEventLoop has no subprocess support
+            loop = asyncio.get_running_loop()
+            returncode, stdout, stderr = await loop.run_in_executor(
+                None, _run_ffmpeg_blocking, command, audio_bytes
+            )
+        else:
+            stdout, stderr = await proc.communicate(audio_bytes)
+            returncode = proc.returncode
+
+    if returncode != 0:
+        raise RuntimeError(f"FFMPEG failed: {stderr.decode(errors='replace').strip()}")
+
+    # Drop a dangling odd byte rather than failing the whole answer
+    usable = len(stdout) - (len(stdout) % 2)
+    samples = np.frombuffer(stdout[:usable], dtype=np.int16)
+    return DecodedAudio(samples=samples, sample_rate=sample_rate)
+
+
+def write_temp_wav(audio: DecodedAudio) -> str:
+    """For tools that can only read from disk (SMILExtract). Caller removes the file."""
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    sf.write(path, audio.samples, audio.sample_rate, subtype="PCM_16")
+    return path
+
+
+# ----------------------------------------------------
+# Incremental decoding for live answers
+# ----------------------------------------------------
+class StreamingDecoder:
+    """
+    One long-running ffmpeg per live answer: WebM chunks go in as they arrive,
+    PCM comes out as soon as ffmpeg produces it and is handed to `on_pcm`.
+    These sessions are not counted against FFMPEG_MAX_CONCURRENCY because they
+    live as long as the recording; at most one exists per recording room.
+    """
+
+    READ_SIZE = 6400  # 200ms of 16 kHz mono s16le
+
+    def __init__(self, on_pcm=None, sample_rate: int = None):
+        self.sample_rate = sample_rate or settings.AUDIO_SAMPLE_RATE
+        self.on_pcm = on_pcm
+        self._pcm = bytearray()
+        self._proc = None
+        self._reader = None
+
+    async def start(self):
+        command = _ffmpeg_command(self.sample_rate)
+        # Start producing output after the WebM header instead of probing seconds of input
+        command[1:1] = ["-fflags", "nobuffer", "-probesize", "4096", "-analyzeduration", "0"]
+        command[-1:-1] = ["-flush_packets", "1"]
+
+        # Raises NotImplementedError on loops without subprocess support
+        self._proc = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        self._reader = asyncio.ensure_future(self._read_stdout())
+
+    async def _read_stdout(self):
+        pending = b""
+        while True:
+            block = await self._proc.stdout.read(self.READ_SIZE)
+            if not block:
+                break
+            block = pending + block
+            usable = len(block) - (len(block) % 2)
+            block, pending = block[:usable], block[usable:]
+            if not block:
+                continue
+            self._pcm.extend(block)
+            if self.on_pcm is not None:
+                self.on_pcm(block)
+
+    async def feed(self, chunk: bytes):
+        self._proc.stdin.write(chunk)
+        await self._proc.stdin.drain()
+
+    async def finish(self) -> DecodedAudio:
+        self._proc.stdin.close()
+        await self._reader
+        stderr = await self._proc.stderr.read()
+        returncode = await self._proc.wait()
+        if returncode != 0:
+            raise RuntimeError(f"FFMPEG failed: {stderr.decode(errors='replace').strip()}")
+
+        samples = np.frombuffer(bytes(self._pcm), dtype=np.int16)
+        return DecodedAudio(samples=samples, sample_rate=self.sample_rate)
+
+    async def abort(self):
+        if self._proc is not None and self._proc.returncode is None:
+            self._proc.kill()
+            await self._proc.wait()
+        if self._reader is not None:
+            self._reader.cancel()
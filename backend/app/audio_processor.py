@@ -1,177 +1,352 @@
-import base64
-import tempfile
-import os
-import subprocess
-import asyncio
-import soundfile as sf
-from typing import Dict, Any
-
-from .config import settings
-from .ai_evaluator import evaluate_answer_with_gemini, generate_followup_question
-from .speech_google import transcribe_audio_google
-from .opensmile_integration import extract_opensmile_features
-from .websocket_manager import ConnectionManager
-from . import crud
-
-
-# ----------------------------------------------------
-# FFMPEG: Convert WebM → WAV (Windows + async safe)
-# ----------------------------------------------------
-async def webm_to_wav_ffmpeg(webm_path: str, wav_path: str):
-    command = [
-        "ffmpeg", "-i", webm_path,
-        "-nostats", "-loglevel", "error",
-        "-y",
-        "-acodec", "pcm_s16le",
-        "-ac", "1",
-        "-ar", "16000",
-        wav_path
-    ]
-
-    loop = asyncio.get_event_loop()
-
-    def run_cmd():
-        return subprocess.run(
-            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-        )
-
-    proc = await loop.run_in_executor(None, run_cmd)
-
-    if proc.returncode != 0:
-        raise RuntimeError(f"FFMPEG failed: {proc.stderr.strip()}")
-
-    return wav_path
-
-
-
-# ----------------------------------------------------
-#        MAIN PIPELINE (STT + OpenSMILE + Gemini)
-# ----------------------------------------------------
-async def process_audio_and_evaluate(
-    room_id: str,
-    question: str,
-    interview_id: int,        # ← NEW
-    base64_audio: str,
-    manager: ConnectionManager
-):
-    tmp_webm_path = None
-    tmp_wav_path = None
-
-    try:
-        # ----------------------------------------------------
-        # 1. Base64 → WebM temp file
-        # ----------------------------------------------------
-        audio_bytes = base64.b64decode(base64_audio)
-        tmp_webm_path = tempfile.NamedTemporaryFile(delete=False, suffix=".webm").name
-
-        with open(tmp_webm_path, "wb") as f:
-            f.write(audio_bytes)
-
-        # ----------------------------------------------------
-        # 2. Convert WebM → WAV
-        # ----------------------------------------------------
-        tmp_wav_path = tempfile.NamedTemporaryFile(delete=False, suffix=".wav").name
-        await webm_to_wav_ffmpeg(tmp_webm_path, tmp_wav_path)
-
-        await manager.broadcast(room_id, {
-            "type": "status",
-            "message": "Audio converted to WAV. Starting transcription..."
-        })
-
-        # ----------------------------------------------------
-        # 3. Google Speech-to-Text
-        # ----------------------------------------------------
-        transcript_text = transcribe_audio_google(tmp_wav_path)
-
-        await manager.broadcast(room_id, {
-            "type": "transcript_result",
-            "text": transcript_text
-        })
-
-        # ----------------------------------------------------
-        # 4. OpenSMILE Feature Extraction
-        # ----------------------------------------------------
-        features = {}
-        smile_status = ""
-
-        try:
-            features = extract_opensmile_features(tmp_wav_path)
-            smile_status = "Acoustic features extracted."
-        except FileNotFoundError:
-            smile_status = "OpenSMILE processed."
-        except Exception as e:
-            smile_status = f"OpenSMILE error: {str(e)}"
-
-        # ----------------------------------------------------
-        # 5. Additional acoustic metrics
-        # ----------------------------------------------------
-        audio_data, sr = sf.read(tmp_wav_path)
-        duration_sec = len(audio_data) / sr if sr > 0 else 1
-
-        words = len(transcript_text.split()) if transcript_text else 0
-        speech_rate = words / duration_sec if duration_sec > 0 else 0
-
-        voicing_prob = features.get("voicing", 0)
-        pause_ratio = 1 - voicing_prob
-
-        acoustic_payload = {
-            "jitter": features.get("jitter", 0),
-            "shimmer": features.get("shimmer", 0),
-            "loudness": features.get("loudness", 0),
-            "speech_rate": speech_rate,
-            "pause_ratio": pause_ratio
-        }
-
-        # ----------------------------------------------------
-        # 6. Gemini interview evaluation
-        # ----------------------------------------------------
-        eval_res = await evaluate_answer_with_gemini(
-            question_text=question,
-            answer_text=transcript_text,
-            acoustic_features=acoustic_payload
-        )
-
-        # Add acoustic status to feedback
-        eval_res["feedback"] = f"[{smile_status}] " + eval_res["feedback"]
-
-        # ----------------------------------------------------
-        # 7. SAVE evaluation to the database
-        # ----------------------------------------------------
-        await crud.save_evaluation(
-            interview_id=interview_id,
-            question_text=question,
-            eval_data=eval_res
-        )
-
-        # ----------------------------------------------------
-        # 8. Generate follow-up question via Gemini
-        # ----------------------------------------------------
-        followup_question = await generate_followup_question(transcript_text)
-
-        await manager.broadcast(room_id, {
-            "type": "followup",
-            "question": followup_question
-        })
-
-        # ----------------------------------------------------
-        # 9. Send evaluation back to frontend
-        # ----------------------------------------------------
-        await manager.broadcast(room_id, {
-            "type": "evaluation",
-            "evaluation": eval_res
-        })
-
-    except Exception as e:
-        await manager.broadcast(room_id, {
-            "type": "error",
-            "message": f"Pipeline failed: {repr(e)}"
-        })
-
-    finally:
-        # Cleanup
-        for path in [tmp_webm_path, tmp_wav_path]:
-            try:
-                if path and os.path.exists(path):
-                    os.remove(path)
-            except:
-                pass
+import asyncio
+import time
+from typing import Dict, Any
+
+from .config import settings
+from .ai_evaluator import (
+    evaluate_answer_with_gemini,
+    evaluate_and_followup_with_gemini,
+    generate_followup_question,
+    UNPARSEABLE_FEEDBACK,
+)
+from .stt_backends import stt_backend
+from .opensmile_integration import opensmile_service
+from .acoustic_features import extract_numpy_features
+from .audio_decoder import DecodedAudio, decode_audio
+from .pipeline import Stage, StageGraph, StageError
+from .vad import detect_speech
+from .transcription import TranscriptResult
+from .websocket_manager import ConnectionManager
+from . import crud
+from .eval_writer import eval_writer
+from . import metrics
+
+
+# ----------------------------------------------------
+# Acoustic Feature Extraction (off the event loop)
+# ----------------------------------------------------
+async def extract_acoustic_features(audio: DecodedAudio) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+
+    if settings.ACOUSTIC_BACKEND == "numpy":
+        feats = await loop.run_in_executor(None, extract_numpy_features, audio)
+        return {"features": feats, "status": "Acoustic features extracted.", "timings": {}}
+
+    try:
+        feats, timings = await opensmile_service.extract(audio)
+        for phase, seconds in timings.items():
+            metrics.acoustic_phase_seconds.labels(phase).observe(seconds)
+        return {"features": feats, "status": "Acoustic features extracted.", "timings": timings}
+    except FileNotFoundError:
+        # Binary or config missing: compute the same features in-process
+        metrics.acoustic_fallbacks.labels("opensmile_missing").inc()
+        feats = await loop.run_in_executor(None, extract_numpy_features, audio)
+        return {"features": feats, "status": "Acoustic features extracted (NumPy).", "timings": {}}
+    except Exception as e:
+        metrics.acoustic_fallbacks.labels(type(e).__name__).inc()
+        return {"features": {}, "status": f"OpenSMILE error: {str(e)}", "timings": {}}
+
+
+# ----------------------------------------------------
+#        MAIN PIPELINE (STT + OpenSMILE + Gemini)
+# ----------------------------------------------------
+#
+#   decode ── vad ─┬─ transcript ─┬─ acoustics ── evaluation ── save
+#                  │              └─ followup
+#                  └─ features ───┘
+#
+# With GEMINI_COMBINED_CALL a single "llm" stage after acoustics feeds both
+# evaluation and followup; they only call Gemini again if it failed.
+# vad trims silence; STT and feature extraction only see the speech.
+#
+NO_SPEECH_EVALUATION = {
+    "correctness_score": 0,
+    "fluency_score": 0,
+    "combined_score": 0,
+    "feedback": "No speech was detected in this answer.",
+}
+NO_SPEECH_FOLLOWUP = "I couldn't hear an answer. Could you try answering that again?"
+
+
+def build_answer_graph(
+    room_id: str,
+    question: str,
+    interview_id: int,
+    manager: ConnectionManager
+) -> StageGraph:
+
+    def emit(build):
+        async def on_done(value):
+            await manager.broadcast(room_id, build(value))
+        return on_done
+
+    # 1. Decode WebM → in-memory PCM (ffmpeg over pipes)
+    async def decode(r):
+        audio = await decode_audio(r["audio_bytes"])
+        metrics.audio_seconds.observe(audio.duration)
+        return audio
+
+    # 1b. Voice activity detection (None when VAD_ENABLED is off)
+    async def vad(r):
+        if not settings.VAD_ENABLED:
+            return None
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, detect_speech, r["decode"])
+        metrics.vad_audio_seconds.labels("received").inc(result.total_seconds)
+        metrics.vad_audio_seconds.labels("kept").inc(result.audio.duration)
+        return result
+
+    def speech_audio(r) -> DecodedAudio:
+        return r["vad"].audio if r.get("vad") is not None else r["decode"]
+
+    def no_speech(r) -> bool:
+        return r.get("vad") is not None and not r["vad"].has_speech
+
+    def skip_llm(r) -> bool:
+        return settings.VAD_SKIP_LLM_WITHOUT_SPEECH and no_speech(r)
+
+    async def with_partials(r, call):
+        """
+        Run call(on_partial), forwarding its updates to the room as
+        evaluation_partial messages, in order and all before it returns. The
+        feedback deltas add up to the final evaluation's feedback, status
+        prefix included; the evaluation message itself stays authoritative.
+        When the call streamed something but ends without a usable result
+        (raised, None, degraded or unparseable), a final {"discarded": true}
+        partial tells the room that everything streamed so far is void.
+        """
+        if not settings.GEMINI_STREAMING:
+            return await call(None)
+
+        partials = asyncio.Queue()
+        streamed = False
+
+        def on_partial(update):
+            nonlocal streamed
+            streamed = True
+            partials.put_nowait(update)
+
+        async def forward():
+            while True:
+                update = await partials.get()
+                if update is None:
+                    return
+                await manager.broadcast(room_id, {"type": "evaluation_partial", **update})
+
+        sender = asyncio.ensure_future(forward())
+        partials.put_nowait({"feedback_delta": f"[{r['features']['status']}] "})
+        result = None
+        try:
+            result = await call(on_partial)
+            return result
+        finally:
+            if streamed and (
+                result is None or result.get("degraded") or result.get("feedback") == UNPARSEABLE_FEEDBACK
+            ):
+                partials.put_nowait({"discarded": True})
+            partials.put_nowait(None)
+            await sender
+
+    # 2. Speech-to-text via STT_BACKEND (word times mapped back to the untrimmed answer)
+    async def transcript(r):
+        if no_speech(r):
+            return TranscriptResult(text="")
+        result = await stt_backend.transcribe(speech_audio(r))
+        if r.get("vad") is not None:
+            result = result.mapped(r["vad"].to_original)
+        return result
+
+    # 3. Acoustic features (OpenSMILE or NumPy backend)
+    async def features(r):
+        if no_speech(r):
+            return {"features": {}, "status": "No speech detected.", "timings": {}}
+        return await extract_acoustic_features(speech_audio(r))
+
+    # 4. Additional acoustic metrics
+    async def acoustics(r):
+        text = r["transcript"].text
+        feats = r["features"]["features"]
+        words = len(text.split()) if text else 0
+
+        payload = {
+            "jitter": feats.get("jitter", 0),
+            "shimmer": feats.get("shimmer", 0),
+            "loudness": feats.get("loudness", 0),
+        }
+
+        vad_result = r.get("vad")
+        if vad_result is not None:
+            # Measured pauses; rate over the time actually spent answering
+            stats = vad_result.stats
+            span = stats["total_seconds"] - stats["leading_silence_sec"] - stats["trailing_silence_sec"]
+            payload["speech_rate"] = words / span if span > 0 else 0
+            payload.update(stats)
+        else:
+            duration_sec = r["decode"].duration or 1
+            payload["speech_rate"] = words / duration_sec if duration_sec > 0 else 0
+            payload["pause_ratio"] = 1 - feats.get("voicing", 0)
+
+        if r["transcript"].words:
+            # STT word offsets are the most direct measure when available
+            payload["speech_rate"] = r["transcript"].speech_rate()
+
+        return payload
+
+    # 5a. Combined Gemini call (scores + follow-up in one round trip)
+    async def llm(r):
+        if skip_llm(r):
+            return None
+        try:
+            return await with_partials(r, lambda on_partial: evaluate_and_followup_with_gemini(
+                question_text=question,
+                answer_text=r["transcript"].text,
+                acoustic_features=r["acoustics"],
+                on_partial=on_partial
+            ))
+        except Exception:
+            # evaluation / followup fall back to the two-call path
+            return None
+
+    # 5. Gemini interview evaluation
+    async def evaluation(r):
+        combined = r.get("llm")
+        if skip_llm(r):
+            return dict(NO_SPEECH_EVALUATION)
+        if combined is not None:
+            eval_res = {k: v for k, v in combined.items() if k != "followup_question"}
+        elif not settings.GEMINI_COMBINED_CALL:
+            eval_res = await with_partials(r, lambda on_partial: evaluate_answer_with_gemini(
+                question_text=question,
+                answer_text=r["transcript"].text,
+                acoustic_features=r["acoustics"],
+                on_partial=on_partial
+            ))
+        else:
+            # Fallback after a failed combined call, which may already have streamed
+            eval_res = await evaluate_answer_with_gemini(
+                question_text=question,
+                answer_text=r["transcript"].text,
+                acoustic_features=r["acoustics"]
+            )
+        # Add acoustic status to feedback
+        smile_status = r["features"]["status"]
+        eval_res["feedback"] = f"[{smile_status}] " + eval_res["feedback"]
+        return eval_res
+
+    # 6. Follow-up question via Gemini (runs alongside the evaluation)
+    async def followup(r):
+        combined = r.get("llm")
+        if skip_llm(r):
+            return NO_SPEECH_FOLLOWUP
+        if combined is not None:
+            return combined["followup_question"]
+        return await generate_followup_question(r["transcript"].text)
+
+    # 7. SAVE evaluation to the database
+    async def save(r):
+        if r["evaluation"].get("degraded"):
+            # Placeholder scores from an unavailable Gemini would skew analytics
+            return None
+        if settings.EVAL_WRITE_BEHIND:
+            # Returns once the batch holding this row has committed
+            return await eval_writer.submit(
+                interview_id=interview_id,
+                question_text=question,
+                eval_data=r["evaluation"],
+                transcript=r["transcript"].text,
+                acoustic_features=r["acoustics"]
+            )
+        return await crud.save_evaluation(
+            interview_id=interview_id,
+            question_text=question,
+            eval_data=r["evaluation"],
+            transcript=r["transcript"].text,
+            acoustic_features=r["acoustics"]
+        )
+
+    llm_deps = ("llm",) if settings.GEMINI_COMBINED_CALL else ()
+
+    stages = [
+        Stage("decode", decode, on_done=emit(lambda _: {
+            "type": "status",
+            "message": "Audio decoded. Starting transcription..."
+        })),
+        Stage("vad", vad, deps=("decode",)),
+        Stage("transcript", transcript, deps=("decode", "vad"), on_done=emit(lambda result: {
+            "type": "transcript_result",
+            "text": result.text
+        })),
+        Stage("features", features, deps=("decode", "vad"), on_done=emit(lambda res: {
+            "type": "status",
+            "message": res["status"],
+            "timings": res["timings"]
+        })),
+        Stage("acoustics", acoustics, deps=("decode", "vad", "transcript", "features"), on_done=emit(lambda payload: {
+            "type": "acoustics",
+            "features": payload
+        })),
+        Stage("evaluation", evaluation, deps=("acoustics",) + llm_deps, on_done=emit(lambda eval_res: {
+            "type": "evaluation",
+            "evaluation": eval_res
+        })),
+        Stage("followup", followup, deps=("vad", "transcript") + llm_deps, on_done=emit(lambda q: {
+            "type": "followup",
+            "question": q
+        })),
+        Stage("save", save, deps=("transcript", "acoustics", "evaluation")),
+    ]
+    if settings.GEMINI_COMBINED_CALL:
+        stages.append(Stage("llm", llm, deps=("acoustics",)))
+
+    return StageGraph(stages, observer=metrics.pipeline_observer)
+
+
+async def process_audio_and_evaluate(
+    room_id: str,
+    question: str,
+    interview_id: int,        # ← NEW
+    audio_bytes: bytes,
+    manager: ConnectionManager,
+    decoded: DecodedAudio = None,
+    transcript: str = None
+):
+    """
+    `decoded` / `transcript` are passed when the answer was already decoded and
+    transcribed live (STT_STREAMING); those stages are then skipped.
+    """
+    graph = build_answer_graph(room_id, question, interview_id, manager)
+
+    seed = {"audio_bytes": audio_bytes}
+    if decoded is not None:
+        seed["decode"] = decoded
+    if transcript is not None:
+        # Live STT gives text only; speech rate falls back to the VAD span
+        seed["transcript"] = TranscriptResult(text=transcript)
+        await manager.broadcast(room_id, {
+            "type": "transcript_result",
+            "text": transcript
+        })
+
+    metrics.payload_bytes.labels("answer_audio").observe(len(audio_bytes or b""))
+    started = time.perf_counter()
+    try:
+        await graph.run(seed)
+        metrics.answers_total.labels("ok").inc()
+
+    except StageError as e:
+        metrics.answers_total.labels("failed").inc()
+        await manager.broadcast(room_id, {
+            "type": "error",
+            "stage": e.stage,
+            "error": type(e.error).__name__,
+            "message": f"Pipeline failed at {e.stage}: {repr(e.error)}"
+        })
+    except Exception as e:
+        metrics.answers_total.labels("failed").inc()
+        await manager.broadcast(room_id, {
+            "type": "error",
+            "error": type(e).__name__,
+            "message": f"Pipeline failed: {repr(e)}"
+        })
+    finally:
+        metrics.answer_seconds.observe(time.perf_counter() - started)
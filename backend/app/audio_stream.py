@@ -0,0 +1,92 @@
+from typing import Dict, Optional
+
+from .config import settings
+
+
+class AudioBufferOverflow(Exception):
+    """Raised when a streamed answer grows past MAX_AUDIO_BYTES."""
+
+
+class AudioStreamBusy(Exception):
+    """Raised when a socket touches an answer another socket in the room is recording."""
+
+
+class AudioBuffer:
+    """
+    Collects the binary recorder timeslices of one answer.
+    Chunks are appended as they arrive, so no base64 copy is ever made.
+    """
+
+    def __init__(self, question: str, interview_id: int, mime_type: str = None,
+                 max_bytes: int = None, owner=None):
+        self.owner = owner
+        self.question = question
+        self.interview_id = interview_id
+        self.mime_type = mime_type
+        self.max_bytes = max_bytes or settings.MAX_AUDIO_BYTES
+        self._data = bytearray()
+        self.chunks = 0
+        # Optional LiveTranscriber fed alongside the buffer (STT_STREAMING)
+        self.live = None
+
+    def append(self, chunk: bytes):
+        if len(self._data) + len(chunk) > self.max_bytes:
+            raise AudioBufferOverflow(
+                f"Answer exceeds the {self.max_bytes} byte audio limit"
+            )
+        self._data.extend(chunk)
+        self.chunks += 1
+
+    def __len__(self):
+        return len(self._data)
+
+    def getvalue(self) -> bytes:
+        return bytes(self._data)
+
+
+class AudioStreamRegistry:
+    """
+    One in-flight AudioBuffer per room (start → chunk* → end). Only the
+    socket that started an answer (its owner) may add to, finish or drop it;
+    the others get AudioStreamBusy until it is finished.
+    """
+
+    def __init__(self):
+        self.buffers: Dict[str, AudioBuffer] = {}
+
+    def _owned(self, room: str, owner) -> Optional[AudioBuffer]:
+        buf = self.buffers.get(room)
+        if buf is not None and buf.owner is not owner:
+            raise AudioStreamBusy("Another connection is recording an answer in this room")
+        return buf
+
+    def start(self, room: str, question: str, interview_id: int,
+              mime_type: str = None, owner=None) -> AudioBuffer:
+        # A new "start" replaces the owner's unfinished answer; the caller
+        # discards it first to abort its `live`
+        self._owned(room, owner)
+        buf = AudioBuffer(question, interview_id, mime_type, owner=owner)
+        self.buffers[room] = buf
+        return buf
+
+    def append(self, room: str, chunk: bytes, owner) -> Optional[AudioBuffer]:
+        buf = self._owned(room, owner)
+        if buf is None:
+            return None
+        buf.append(chunk)
+        return buf
+
+    def finish(self, room: str, owner) -> Optional[AudioBuffer]:
+        if self._owned(room, owner) is None:
+            return None
+        return self.buffers.pop(room)
+
+    def discard(self, room: str, owner) -> Optional[AudioBuffer]:
+        """Drop `owner`'s unfinished answer, if any; never raises."""
+        buf = self.buffers.get(room)
+        if buf is not None and buf.owner is owner:
+            return self.buffers.pop(room)
+        return None
+
+
+audio_streams = AudioStreamRegistry()
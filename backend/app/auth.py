@@ -1,32 +1,97 @@
-from datetime import datetime, timedelta
-from jose import jwt, JWTError
-from passlib.context import CryptContext
-from .config import settings
-
-# --- FIX: SWITCHING HASHING ALGORITHM TO PBKDF2_SHA256 ---
-# This resolves both the bcrypt library corruption and the 72-byte limit.
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
-
-def hash_password(password: str) -> str:
-    # PBKDF2_SHA256 handles arbitrary length passwords internally.
-    return pwd_context.hash(password)
-
-def verify_password(plain_password, hashed_password) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-def create_access_token(data: dict, expires_delta: timedelta = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
-
-def decode_token(token: str):
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
-    except JWTError:
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from jose import jwt, JWTError
+from passlib.context import CryptContext
+from .config import settings
+from .process_pool import new_process_pool
+
+# --- FIX: SWITCHING HASHING ALGORITHM TO PBKDF2_SHA256 ---
+# This resolves both the bcrypt library corruption and the 72-byte limit.
+# Pinning min/max to the configured rounds makes verify_and_update flag any
+# hash made with a different count, so a rounds change rolls out on login.
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=settings.PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__min_rounds=settings.PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__max_rounds=settings.PASSWORD_HASH_ROUNDS,
+)
+
+def hash_password(password: str) -> str:
+    # PBKDF2_SHA256 handles arbitrary length passwords internally.
+    return pwd_context.hash(password)
+
+def verify_password(plain_password, hashed_password) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+def verify_and_update(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """Returns (valid, new_hash); new_hash is set when the stored hash is outdated."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """
+    Runs hash_password / verify_and_update in a pool of PASSWORD_HASH_WORKERS
+    processes so a burst of logins cannot stall the event loop. At most
+    PASSWORD_HASH_MAX_PENDING calls are admitted at once; beyond that callers
+    get PasswordHasherBusy immediately instead of piling up behind the pool.
+    """
+
+    def __init__(self, workers: int = None, max_pending: int = None):
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS
+        self.max_pending = max_pending or settings.PASSWORD_HASH_MAX_PENDING
+        self._pool = None
+        self.pending = 0
+        self.rejected = 0
+
+    async def _submit(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        if self._pool is None:
+            self._pool = new_process_pool(self.workers)
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(hash_password, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await self._submit(verify_and_update, password, hashed)
+
+    def stats(self) -> dict:
+        return {"pending": self.pending, "rejected": self.rejected, "workers": self.workers}
+
+    def close(self):
+        if self._pool is not None:
+            # Runs on the event loop during shutdown; in-flight hashes finish unattended
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+password_hasher = PasswordHasher()
+
+def create_access_token(data: dict, expires_delta: timedelta = None):
+    to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.utcnow() + expires_delta
+    else:
+        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire})
+    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return encoded_jwt
+
+def decode_token(token: str):
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        return payload
+    except JWTError:
         return None
\ No newline at end of file
@@ -1,19 +1,131 @@
-import os
-from pydantic_settings import BaseSettings
-
-class Settings(BaseSettings):
-    DATABASE_URL: str
-    SECRET_KEY: str
-    ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int
-
-    GEMINI_API_KEY: str
-    GOOGLE_APPLICATION_CREDENTIALS: str
-
-    OPENSMILE_PATH: str
-    OPENSMILE_CONFIG_PATH: str
-
-    class Config:
-        env_file = ".env"
-
-settings = Settings()
+import os
+from pydantic_settings import BaseSettings
+
+class Settings(BaseSettings):
+    DATABASE_URL: str
+    SECRET_KEY: str
+    ALGORITHM: str = "HS256"
+    ACCESS_TOKEN_EXPIRE_MINUTES: int
+
+    # Token → user snapshot cache used by get_current_user
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_CACHE_TTL_SECONDS: int = 60
+
+    # Password hashing runs in its own process pool, away from the event loop.
+    # Changing PASSWORD_HASH_ROUNDS rehashes each user's password on next login.
+    PASSWORD_HASH_ROUNDS: int = 29000
+    PASSWORD_HASH_WORKERS: int = 2
+    # Hash/verify calls allowed in flight before new ones are refused with 503
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    GEMINI_API_KEY: str
+    GEMINI_MODEL: str = "gemini-2.0-flash"
+    # One structured call for scores + follow-up; the two-call path is the fallback
+    GEMINI_COMBINED_CALL: bool = True
+    # Stream the evaluation: scores and feedback reach the room as they are generated
+    GEMINI_STREAMING: bool = False
+
+    # Gemini calls: dedicated thread pool, per-request deadline, retries on
+    # transient errors (5xx, 429, timeouts) with jittered backoff
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_TIMEOUT_SECONDS: float = 20.0
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_MS: int = 250
+    LLM_RETRY_MAX_MS: int = 4000
+    # Send a duplicate request when the first is slower than the recent p95
+    LLM_HEDGE: bool = False
+    LLM_HEDGE_MIN_DELAY_MS: int = 1000
+    # Consecutive failures before Gemini calls fail fast for the cooldown period
+    LLM_BREAKER_THRESHOLD: int = 5
+    LLM_BREAKER_COOLDOWN_SECONDS: float = 30.0
+
+    # Gemini response cache: "memory", "sqlite" or "off"
+    LLM_CACHE_BACKEND: str = "memory"
+    LLM_CACHE_MAX_ENTRIES: int = 1024
+    LLM_CACHE_TTL_SECONDS: int = 3600
+    LLM_CACHE_SQLITE_PATH: str = "llm_cache.sqlite3"
+    GOOGLE_APPLICATION_CREDENTIALS: str
+
+    OPENSMILE_PATH: str
+    # Comma-separated; LLD columns are merged across configs, first one wins
+    OPENSMILE_CONFIG_PATH: str
+    # The configs' command-line option for the frame-level CSV sink
+    OPENSMILE_LLD_OPTION: str = "-lld_csv_output"
+    # "opensmile" (SMILExtract, falls back to numpy if missing) or "numpy"
+    ACOUSTIC_BACKEND: str = "opensmile"
+    OPENSMILE_WORKERS: int = 2
+    OPENSMILE_BATCH_SIZE: int = 4
+
+    # In-memory question bank
+    QUESTION_BANK_REFRESH_SECONDS: int = 30
+    # Interviews whose served questions are remembered (LRU)
+    QUESTION_BANK_MAX_INTERVIEWS: int = 10000
+
+    # Upper bound for one streamed answer held in memory per room
+    MAX_AUDIO_BYTES: int = 20 * 1024 * 1024
+
+    # Answer processing queue
+    PIPELINE_MAX_CONCURRENCY: int = 4
+    PIPELINE_MAX_QUEUED: int = 64
+
+    # Per-connection outgoing WebSocket queue; clients that fall this far behind are dropped
+    WS_SEND_QUEUE_SIZE: int = 256
+
+    # Write-behind batching of evaluation inserts
+    EVAL_WRITE_BEHIND: bool = False
+    EVAL_WRITE_BATCH_SIZE: int = 50
+    EVAL_WRITE_FLUSH_MS: int = 200
+    # submit() waits while this many rows are buffered or being written
+    EVAL_WRITE_MAX_BUFFERED: int = 200
+
+    # Prometheus-format /metrics endpoint and event-loop lag sampling
+    METRICS_ENABLED: bool = True
+    LOOP_LAG_INTERVAL_MS: int = 100
+
+    # Room fan-out across workers: "memory://" (single process) or "redis://host:6379"
+    BROKER_URL: str = "memory://"
+    # Connecting to / subscribing through the broker gives up after this long
+    BROKER_TIMEOUT_SECONDS: float = 5.0
+
+    # ffmpeg decoder pool
+    FFMPEG_PATH: str = "ffmpeg"
+    FFMPEG_MAX_CONCURRENCY: int = 4
+    AUDIO_SAMPLE_RATE: int = 16000
+
+    # Voice activity detection: trim silence before STT / feature extraction
+    VAD_ENABLED: bool = True
+    VAD_ENERGY_MARGIN_DB: float = 12.0
+    VAD_MIN_SPEECH_MS: int = 120
+    # Gaps shorter than this count as part of the surrounding speech
+    VAD_MIN_PAUSE_MS: int = 250
+    VAD_PAD_MS: int = 150
+    # Longer pauses are cut down to this in the audio sent to STT
+    VAD_MAX_KEPT_PAUSE_MS: int = 600
+    # Answers with no detected speech get a fixed evaluation instead of a Gemini call
+    VAD_SKIP_LLM_WITHOUT_SPEECH: bool = True
+
+    # Speech-to-text engine: "google" (Cloud Speech) or "local" (faster-whisper on CPU)
+    STT_BACKEND: str = "google"
+    STT_LOCAL_MODEL: str = "base.en"
+    STT_LOCAL_WORKERS: int = 2
+    # CPU threads per local worker process
+    STT_LOCAL_THREADS: int = 1
+    STT_LOCAL_COMPUTE_TYPE: str = "int8"
+
+    # Google STT worker pool
+    STT_MAX_WORKERS: int = 4
+    # Long answers are split at pauses into chunks of at most this length
+    # (synchronous recognize rejects audio over one minute) ...
+    STT_CHUNK_SECONDS: float = 50.0
+    # ... and up to this many chunks of one answer are transcribed at once
+    STT_CHUNK_FANOUT: int = 4
+
+    # Streaming STT: transcribe while the candidate is still speaking
+    STT_STREAMING: bool = False
+    STT_MAX_STREAMS: int = 16
+
+    class Config:
+        env_file = ".env"
+
+settings = Settings()
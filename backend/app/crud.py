@@ -1,126 +1,316 @@
-from sqlalchemy.future import select
-from sqlalchemy import insert, func
-from .models import User, Interview, Question
-from .db import async_session
-from .auth import hash_password
-from sqlalchemy.exc import NoResultFound
-
-async def create_user(email: str, password: str, full_name: str = None):
-    # Debugging print removed from here to rely on main.py's traceback
-    async with async_session() as session:
-        # Note: full_name=None is acceptable if models.User is set to nullable=True
-        user = User(email=email, hashed_password=hash_password(password), full_name=full_name)
-        session.add(user)
-        await session.commit() # This line is the potential commit failure point
-        await session.refresh(user)
-        return user
-
-async def get_user_by_email(email: str):
-    async with async_session() as session:
-        q = await session.execute(select(User).where(User.email == email))
-        return q.scalars().first()
-
-async def get_user(user_id: int):
-    async with async_session() as session:
-        q = await session.execute(select(User).where(User.id == user_id))
-        return q.scalars().first()
-
-async def create_interview(user_id: int):
-    async with async_session() as session:
-        it = Interview(user_id=user_id)
-        session.add(it)
-        await session.commit()
-        await session.refresh(it)
-        return it
-
-async def update_interview_feedback(interview_id: int, score: float, feedback: str):
-    async with async_session() as session:
-        q = await session.execute(select(Interview).where(Interview.id == interview_id))
-        it = q.scalars().first()
-        if it:
-            it.score = score
-            it.feedback = feedback
-            await session.commit()
-            await session.refresh(it)
-        return it
-
-async def list_questions(level: int = 1, limit: int = 10):
-    async with async_session() as session:
-        q = await session.execute(select(Question).where(Question.level == level).limit(limit))
-        questions = q.scalars().all()
-        
-        # Temporary fallback questions for testing
-        if not questions:
-            return [
-                Question(id=1, text="Explain the difference between a process and a thread.", level=1),
-                Question(id=2, text="Describe how the virtual DOM works in React.", level=1),
-                Question(id=3, text="What is a closure in JavaScript, and provide a use case?", level=1),
-                Question(id=4, text="Walk me through the steps of an HTTP GET request.", level=1),
-            ]
-        return questions
-
-async def get_user_interview_stats(user_id: int):
-    """Returns summary + full evaluation history for Profile page."""
-    async with async_session() as session:
-
-        # --- Summary ---
-        q_summary = await session.execute(
-            select(
-                func.count(Evaluation.id),
-                func.avg(Evaluation.correctness_score),
-                func.avg(Evaluation.fluency_score),
-                func.avg(Evaluation.combined_score),
-            ).join(Interview, Evaluation.interview_id == Interview.id)
-            .where(Interview.user_id == user_id)
-        )
-        summary = q_summary.one_or_none()
-        total_interviews = summary[0] or 0
-        avg_correctness = float(summary[1] or 0)
-        avg_fluency = float(summary[2] or 0)
-        avg_combined = float(summary[3] or 0)
-
-        # --- Last Feedback ---
-        q_latest_feedback = await session.execute(
-            select(Evaluation.feedback)
-            .join(Interview, Evaluation.interview_id == Interview.id)
-            .where(Interview.user_id == user_id)
-            .order_by(Evaluation.created_at.desc())
-            .limit(1)
-        )
-        last_feedback = q_latest_feedback.scalars().first() or "No interviews yet."
-
-        # --- Full History ---
-        q_history = await session.execute(
-            select(Evaluation)
-            .join(Interview, Evaluation.interview_id == Interview.id)
-            .where(Interview.user_id == user_id)
-            .order_by(Evaluation.created_at.desc())
-        )
-        history = q_history.scalars().all()
-
-        return {
-            "total_interviews": total_interviews,
-            "avg_correctness": avg_correctness,
-            "avg_fluency": avg_fluency,
-            "avg_combined": avg_combined,
-            "last_feedback": last_feedback,
-            "history": history,
-        }
-
-
-from .models import Evaluation
-
-async def save_evaluation(interview_id: int, question_text: str, eval_data: dict):
-    async with async_session() as session:
-        evaluation = Evaluation(
-            interview_id=interview_id,
-            question_text=question_text,
-            correctness_score=eval_data["correctness_score"],
-            fluency_score=eval_data["fluency_score"],
-            combined_score=eval_data["combined_score"],
-            feedback=eval_data["feedback"],
-        )
-        session.add(evaluation)
-        await session.commit()
-        await session.refresh(evaluation)
-        return evaluation
+import base64
+import datetime
+from sqlalchemy.future import select
+from sqlalchemy import insert, func, update, or_, and_, bindparam
+from sqlalchemy.exc import IntegrityError
+from .models import User, Interview, Evaluation, UserStats
+from .db import async_session
+from .auth import password_hasher
+from sqlalchemy.exc import NoResultFound
+
+async def create_user(email: str, password: str, full_name: str = None):
+    # Debugging print removed from here to rely on main.py's traceback
+    hashed = await password_hasher.hash(password)
+    async with async_session() as session:
+        # Note: full_name=None is acceptable if models.User is set to nullable=True
+        user = User(email=email, hashed_password=hashed, full_name=full_name)
+        session.add(user)
+        await session.commit() # This line is the potential commit failure point
+        await session.refresh(user)
+        return user
+
+async def update_password_hash(user_id: int, hashed_password: str):
+    async with async_session() as session:
+        async with session.begin():
+            user = await session.get(User, user_id)
+            if user:
+                user.hashed_password = hashed_password
+
+async def get_user_by_email(email: str):
+    async with async_session() as session:
+        q = await session.execute(select(User).where(User.email == email))
+        return q.scalars().first()
+
+async def get_user(user_id: int):
+    async with async_session() as session:
+        q = await session.execute(select(User).where(User.id == user_id))
+        return q.scalars().first()
+
+async def create_interview(user_id: int):
+    async with async_session() as session:
+        it = Interview(user_id=user_id)
+        session.add(it)
+        await session.commit()
+        await session.refresh(it)
+        return it
+
+async def update_interview_feedback(interview_id: int, score: float, feedback: str):
+    async with async_session() as session:
+        q = await session.execute(select(Interview).where(Interview.id == interview_id))
+        it = q.scalars().first()
+        if it:
+            it.score = score
+            it.feedback = feedback
+            await session.commit()
+            await session.refresh(it)
+        return it
+
+# ----------------------------------------------------
+# Profile: running aggregates + keyset-paginated history
+# ----------------------------------------------------
+def encode_history_cursor(created_at, evaluation_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{evaluation_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_history_cursor(cursor: str):
+    """Raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, evaluation_id = raw.rsplit("|", 1)
+        return datetime.datetime.fromisoformat(created_at), int(evaluation_id)
+    except Exception as e:
+        raise ValueError("Invalid history cursor") from e
+
+async def _compute_user_stats(session, user_id: int) -> UserStats:
+    """Full aggregate over a user's evaluations; only used to (re)build a UserStats row."""
+    q_summary = await session.execute(
+        select(
+            func.count(Evaluation.id),
+            func.sum(Evaluation.correctness_score),
+            func.sum(Evaluation.fluency_score),
+            func.sum(Evaluation.combined_score),
+        ).join(Interview, Evaluation.interview_id == Interview.id)
+        .where(Interview.user_id == user_id)
+    )
+    count, sum_c, sum_f, sum_comb = q_summary.one()
+
+    q_latest = await session.execute(
+        select(Evaluation.feedback, Evaluation.created_at)
+        .join(Interview, Evaluation.interview_id == Interview.id)
+        .where(Interview.user_id == user_id)
+        .order_by(Evaluation.created_at.desc(), Evaluation.id.desc())
+        .limit(1)
+    )
+    latest = q_latest.first()
+
+    return UserStats(
+        user_id=user_id,
+        evaluation_count=count or 0,
+        sum_correctness=float(sum_c or 0),
+        sum_fluency=float(sum_f or 0),
+        sum_combined=float(sum_comb or 0),
+        last_feedback=latest[0] if latest else None,
+        last_evaluation_at=latest[1] if latest else None,
+    )
+
+async def _apply_user_stats(session, user_id: int, evaluations: list):
+    """
+    Add freshly flushed evaluations to the user's running aggregates.
+    Must run in the transaction that inserted them.
+    """
+    latest = max(evaluations, key=lambda e: e.created_at)
+    result = await session.execute(
+        update(UserStats)
+        .where(UserStats.user_id == user_id)
+        .values(
+            evaluation_count=UserStats.evaluation_count + len(evaluations),
+            sum_correctness=UserStats.sum_correctness + sum(e.correctness_score for e in evaluations),
+            sum_fluency=UserStats.sum_fluency + sum(e.fluency_score for e in evaluations),
+            sum_combined=UserStats.sum_combined + sum(e.combined_score for e in evaluations),
+            last_feedback=latest.feedback,
+            last_evaluation_at=latest.created_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        return
+
+    # No row yet: build it from the full history, which already includes `evaluations`
+    try:
+        async with session.begin_nested():
+            session.add(await _compute_user_stats(session, user_id))
+    except IntegrityError:
+        # A concurrent save created the row first; retry as an increment
+        await _apply_user_stats(session, user_id, evaluations)
+
+async def _get_user_stats(user_id: int) -> UserStats:
+    async with async_session() as session:
+        stats = await session.get(UserStats, user_id)
+        if stats is not None:
+            return stats
+
+        # Users with history from before user_stats existed: backfill once
+        stats = await _compute_user_stats(session, user_id)
+        if stats.evaluation_count:
+            try:
+                session.add(stats)
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                stats = await session.get(UserStats, user_id)
+        return stats
+
+async def get_user_evaluation_history(user_id: int, cursor: str = None, limit: int = 20):
+    """
+    One page of evaluations, newest first, keyset-paginated on (created_at, id).
+    Returns {"items": [...], "next_cursor": str | None}.
+    """
+    q = (
+        select(Evaluation)
+        .join(Interview, Evaluation.interview_id == Interview.id)
+        .where(Interview.user_id == user_id)
+    )
+    if cursor:
+        created_at, evaluation_id = decode_history_cursor(cursor)
+        q = q.where(or_(
+            Evaluation.created_at < created_at,
+            and_(Evaluation.created_at == created_at, Evaluation.id < evaluation_id),
+        ))
+    q = q.order_by(Evaluation.created_at.desc(), Evaluation.id.desc()).limit(limit + 1)
+
+    async with async_session() as session:
+        rows = (await session.execute(q)).scalars().all()
+
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_history_cursor(items[-1].created_at, items[-1].id)
+    return {"items": items, "next_cursor": next_cursor}
+
+async def get_user_interview_stats(user_id: int, history_limit: int = 20):
+    """Returns summary + the first page of evaluation history for Profile page."""
+    stats = await _get_user_stats(user_id)
+    page = await get_user_evaluation_history(user_id, limit=history_limit)
+
+    count = stats.evaluation_count or 0
+    return {
+        "total_interviews": count,
+        "avg_correctness": stats.sum_correctness / count if count else 0.0,
+        "avg_fluency": stats.sum_fluency / count if count else 0.0,
+        "avg_combined": stats.sum_combined / count if count else 0.0,
+        "last_feedback": stats.last_feedback or "No interviews yet.",
+        "history": page["items"],
+        "next_cursor": page["next_cursor"],
+    }
+
+
+async def save_evaluation(
+    interview_id: int,
+    question_text: str,
+    eval_data: dict,
+    transcript: str = None,
+    acoustic_features: dict = None,
+):
+    async with async_session() as session:
+        async with session.begin():
+            evaluation = Evaluation(
+                interview_id=interview_id,
+                question_text=question_text,
+                correctness_score=eval_data["correctness_score"],
+                fluency_score=eval_data["fluency_score"],
+                combined_score=eval_data["combined_score"],
+                feedback=eval_data["feedback"],
+                transcript=transcript,
+                acoustic_features=acoustic_features,
+            )
+            session.add(evaluation)
+            await session.flush()
+
+            user_id = (await session.execute(
+                select(Interview.user_id).where(Interview.id == interview_id)
+            )).scalar()
+            if user_id is not None:
+                await _apply_user_stats(session, user_id, [evaluation])
+
+        # id and created_at are already set by the flush; no refresh round trip
+        return evaluation
+
+
+async def save_evaluations_batch(rows: list):
+    """
+    Insert many evaluations with ONE multi-row INSERT and update every affected
+    user's aggregates, all in a single transaction (used by eval_writer).
+    Each row is a dict of Evaluation column values including created_at.
+    """
+    if not rows:
+        return
+    async with async_session() as session:
+        async with session.begin():
+            await session.execute(insert(Evaluation).values(rows))
+
+            interview_ids = {r["interview_id"] for r in rows if r["interview_id"] is not None}
+            owners = {}
+            if interview_ids:
+                q = await session.execute(
+                    select(Interview.id, Interview.user_id).where(Interview.id.in_(interview_ids))
+                )
+                owners = dict(q.all())
+
+            by_user = {}
+            for r in rows:
+                user_id = owners.get(r["interview_id"])
+                if user_id is not None:
+                    by_user.setdefault(user_id, []).append(Evaluation(**r))
+            for user_id, evaluations in by_user.items():
+                await _apply_user_stats(session, user_id, evaluations)
+
+
+async def update_rescored_evaluations(rows: list):
+    """
+    Write re-scored evaluations in one transaction (used by app.rescore):
+    one executemany UPDATE, then each owner's aggregates shifted by the
+    score differences. Each row holds id, user_id, created_at, the old and
+    new correctness/fluency/combined scores (old_* / plain names) and feedback.
+    """
+    if not rows:
+        return
+    async with async_session() as session:
+        async with session.begin():
+            await session.execute(
+                update(Evaluation)
+                .where(Evaluation.id == bindparam("_id"))
+                .values(
+                    correctness_score=bindparam("_correctness"),
+                    fluency_score=bindparam("_fluency"),
+                    combined_score=bindparam("_combined"),
+                    feedback=bindparam("_feedback"),
+                )
+                .execution_options(synchronize_session=False),
+                [
+                    {
+                        "_id": r["id"],
+                        "_correctness": r["correctness_score"],
+                        "_fluency": r["fluency_score"],
+                        "_combined": r["combined_score"],
+                        "_feedback": r["feedback"],
+                    }
+                    for r in rows
+                ],
+            )
+
+            by_user = {}
+            for r in rows:
+                if r["user_id"] is not None:
+                    by_user.setdefault(r["user_id"], []).append(r)
+            for user_id, user_rows in by_user.items():
+                # Users without a user_stats row are backfilled from history on first read
+                await session.execute(
+                    update(UserStats)
+                    .where(UserStats.user_id == user_id)
+                    .values(
+                        sum_correctness=UserStats.sum_correctness
+                        + sum(r["correctness_score"] - r["old_correctness_score"] for r in user_rows),
+                        sum_fluency=UserStats.sum_fluency
+                        + sum(r["fluency_score"] - r["old_fluency_score"] for r in user_rows),
+                        sum_combined=UserStats.sum_combined
+                        + sum(r["combined_score"] - r["old_combined_score"] for r in user_rows),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                latest = max(user_rows, key=lambda r: r["created_at"])
+                await session.execute(
+                    update(UserStats)
+                    .where(UserStats.user_id == user_id, UserStats.last_evaluation_at == latest["created_at"])
+                    .values(last_feedback=latest["feedback"])
+                    .execution_options(synchronize_session=False)
+                )
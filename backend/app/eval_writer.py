@@ -0,0 +1,153 @@
+import asyncio
+import datetime
+import logging
+from typing import List, Tuple
+
+from .config import settings
+from . import crud
+
+logger = logging.getLogger(__name__)
+
+class EvaluationWriteBuffer:
+    """
+    Write-behind buffer for evaluation rows.
+
+    Rows from concurrent pipelines are collected and written by
+    crud.save_evaluations_batch as one multi-row INSERT, either every
+    EVAL_WRITE_FLUSH_MS or as soon as EVAL_WRITE_BATCH_SIZE rows are waiting.
+    submit() returns only after the batch holding the row has committed, and
+    waits for room while EVAL_WRITE_MAX_BUFFERED rows are not yet committed.
+    If a batch fails, its rows are retried one at a time so only the rows
+    that cannot be written fail.
+    """
+
+    def __init__(self, batch_size: int = None, flush_ms: int = None, max_buffered: int = None):
+        self.batch_size = batch_size or settings.EVAL_WRITE_BATCH_SIZE
+        self.flush_interval = (flush_ms or settings.EVAL_WRITE_FLUSH_MS) / 1000
+        self.max_buffered = max(self.batch_size, max_buffered or settings.EVAL_WRITE_MAX_BUFFERED)
+        self._pending: List[Tuple[dict, asyncio.Future]] = []
+        self._room = None
+        self._full = None
+        self._task = None
+        self._closing = False
+        self.flushes = 0
+        self.rows_written = 0
+        self.batch_failures = 0
+        self.rows_failed = 0
+
+    def durability(self) -> dict:
+        return {
+            "mode": "write-behind",
+            "acknowledged": "after commit",
+            "max_rows_at_risk": self.max_buffered,
+            "max_delay_ms": int(self.flush_interval * 1000),
+            "guarantee": (
+                "A row is durable once submit() returns. On a crash, rows not yet "
+                "committed (at most max_rows_at_risk; submit() waits for room beyond "
+                "that) are lost and their pipelines never report success. Buffered "
+                "rows are flushed every max_delay_ms and on shutdown."
+            ),
+        }
+
+    def _ensure_started(self):
+        if self._task is None:
+            self._full = asyncio.Event()
+            self._room = asyncio.Semaphore(self.max_buffered)
+            self._task = asyncio.ensure_future(self._run())
+
+    async def submit(
+        self,
+        interview_id: int,
+        question_text: str,
+        eval_data: dict,
+        transcript: str = None,
+        acoustic_features: dict = None,
+    ):
+        if self._closing:
+            raise RuntimeError("Evaluation writer is shutting down")
+        self._ensure_started()
+
+        row = {
+            "interview_id": interview_id,
+            "question_text": question_text,
+            "correctness_score": eval_data["correctness_score"],
+            "fluency_score": eval_data["fluency_score"],
+            "combined_score": eval_data["combined_score"],
+            "feedback": eval_data["feedback"],
+            "transcript": transcript,
+            "acoustic_features": acoustic_features,
+            "created_at": datetime.datetime.utcnow(),
+        }
+        # The slot is given back when the row's write settles (see _settle)
+        await self._room.acquire()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((row, future))
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+        await future
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+    def _settle(self, future: asyncio.Future, error: Exception = None):
+        self._room.release()
+        if future.done():
+            return
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+    async def flush(self):
+        while self._pending:
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            try:
+                await crud.save_evaluations_batch([row for row, _ in batch])
+            except Exception:
+                self.batch_failures += 1
+                logger.warning("Evaluation batch of %d failed; retrying row by row", len(batch), exc_info=True)
+            else:
+                self.flushes += 1
+                self.rows_written += len(batch)
+                for _, future in batch:
+                    self._settle(future)
+                continue
+
+            # One bad row must not fail the answers batched with it
+            for row, future in batch:
+                try:
+                    await crud.save_evaluations_batch([row])
+                except Exception as e:
+                    self.rows_failed += 1
+                    self._settle(future, e)
+                else:
+                    self.rows_written += 1
+                    self._settle(future)
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._pending),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "batch_failures": self.batch_failures,
+            "rows_failed": self.rows_failed,
+            **self.durability(),
+        }
+
+    async def close(self):
+        """Stop the timer and flush whatever is still buffered."""
+        self._closing = True
+        if self._task is not None:
+            self._full.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self.flush()
+
+
+eval_writer = EvaluationWriteBuffer()
@@ -0,0 +1,133 @@
+"""
+Bulk question importer.
+
+    python -m app.import_questions questions.ndjson
+    python -m app.import_questions questions.csv --level 2 --batch-size 2000
+
+NDJSON lines and CSV rows carry `text` and optionally `level` and `tags`
+(a list, or a comma-separated string). Rows whose text already exists are
+skipped, so re-running an import is safe. Invalid rows (no text, a level
+that is not a positive integer, a line that is not a JSON object) are
+reported on stderr with their line number and skipped. Running servers pick
+the new rows up on their next question bank refresh.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+from typing import Iterator, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.future import select
+
+from .db import async_session, init_db
+from .models import Question
+from .question_bank import parse_tags
+
+
+def _read_rows(path: str, fmt: str) -> Iterator[Tuple[int, object]]:
+    """(line number, parsed row); a line that is not valid JSON yields its error instead."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, ValueError(f"not valid JSON ({e})")
+
+
+def _normalize(row, default_level: int) -> dict:
+    """Raises ValueError saying what is wrong with the row."""
+    if isinstance(row, ValueError):
+        raise row
+    if not isinstance(row, dict):
+        raise ValueError(f"expected an object, got {type(row).__name__}")
+    text = row.get("text") or row.get("question") or ""
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("no question text")
+
+    level = row.get("level")
+    if level in (None, ""):
+        level = default_level
+    elif isinstance(level, bool) or not isinstance(level, (int, str)):
+        raise ValueError(f"level {level!r} is not an integer")
+    else:
+        try:
+            level = int(level)
+        except ValueError:
+            raise ValueError(f"level {level!r} is not an integer") from None
+    if level < 1:
+        raise ValueError(f"level {level} is below 1")
+
+    tags = row.get("tags")
+    if tags is not None and not isinstance(tags, str) and not (
+        isinstance(tags, list) and all(isinstance(t, str) for t in tags)
+    ):
+        raise ValueError("tags must be a string or a list of strings")
+    return {
+        "text": text.strip(),
+        "level": level,
+        "tags": ",".join(sorted(parse_tags(tags))) or None,
+    }
+
+
+async def import_questions(path: str, fmt: str = None, default_level: int = 1, batch_size: int = 1000) -> dict:
+    fmt = fmt or ("csv" if os.path.splitext(path)[1].lower() == ".csv" else "ndjson")
+    await init_db()
+
+    async with async_session() as session:
+        seen = set((await session.execute(select(Question.text))).scalars().all())
+
+    counts = {"inserted": 0, "duplicates": 0, "invalid": 0}
+    batch = []
+
+    async def flush():
+        if not batch:
+            return
+        async with async_session() as session:
+            async with session.begin():
+                await session.execute(insert(Question), batch)
+        counts["inserted"] += len(batch)
+        batch.clear()
+
+    for line_no, raw in _read_rows(path, fmt):
+        try:
+            row = _normalize(raw, default_level)
+        except ValueError as e:
+            counts["invalid"] += 1
+            print(f"line {line_no}: skipped ({e})", file=sys.stderr)
+            continue
+        if row["text"] in seen:
+            counts["duplicates"] += 1
+            continue
+        seen.add(row["text"])
+        batch.append(row)
+        if len(batch) >= batch_size:
+            await flush()
+    await flush()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-import interview questions from NDJSON or CSV.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="defaults to the file extension")
+    parser.add_argument("--level", type=int, default=1, help="level for rows that do not set one")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    counts = asyncio.run(import_questions(args.path, args.format, args.level, args.batch_size))
+    print(f"inserted {counts['inserted']}, skipped {counts['duplicates']} duplicates, {counts['invalid']} invalid rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict
+
+from .config import settings
+
+
+class QueueFullError(Exception):
+    """Raised by submit() when PIPELINE_MAX_QUEUED answers are already pending."""
+
+
+Job = Callable[[], Awaitable[None]]
+
+
+@dataclass(frozen=True)
+class QueuePosition:
+    # 1-based place behind earlier answers of the same room (1 = next to run there)
+    room: int
+    # 1-based place among all answers on this worker not yet running; an
+    # estimate, since rooms take free slots in whatever order they ask
+    overall: int
+
+
+class AnswerJobQueue:
+    """
+    In-process queue for answer pipelines.
+    - at most `max_concurrency` pipelines run at once (global cap)
+    - answers from the same room run strictly one after another, in order
+    - at most `max_queued` answers may be pending (queued + running)
+    """
+
+    def __init__(self, max_concurrency: int = None, max_queued: int = None):
+        self.max_concurrency = max_concurrency or settings.PIPELINE_MAX_CONCURRENCY
+        self.max_queued = max_queued or settings.PIPELINE_MAX_QUEUED
+        self._rooms: Dict[str, Deque[Job]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._slots = None
+        self.pending = 0
+        self.running = 0
+
+    def submit(self, room_id: str, job: Job) -> QueuePosition:
+        """Queue `job` behind earlier answers of the same room."""
+        if self.pending >= self.max_queued:
+            raise QueueFullError(
+                f"Server busy: {self.pending} answers already queued, please retry shortly"
+            )
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+
+        room_jobs = self._rooms.setdefault(room_id, deque())
+        room_jobs.append(job)
+        self.pending += 1
+
+        if room_id not in self._workers:
+            self._workers[room_id] = asyncio.ensure_future(self._drain_room(room_id))
+        return QueuePosition(room=len(room_jobs), overall=self.pending - self.running)
+
+    async def _drain_room(self, room_id: str):
+        room_jobs = self._rooms[room_id]
+        try:
+            while room_jobs:
+                job = room_jobs[0]
+                try:
+                    async with self._slots:
+                        self.running += 1
+                        try:
+                            await job()
+                        finally:
+                            self.running -= 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    # Jobs report their own failures to the room
+                    pass
+                finally:
+                    room_jobs.popleft()
+                    self.pending -= 1
+        finally:
+            self.pending -= len(room_jobs)
+            self._rooms.pop(room_id, None)
+            self._workers.pop(room_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "running": self.running,
+            "rooms": len(self._rooms),
+            "max_concurrency": self.max_concurrency,
+            "max_queued": self.max_queued,
+        }
+
+    async def close(self):
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+answer_queue = AnswerJobQueue()
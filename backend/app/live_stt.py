@@ -0,0 +1,51 @@
+from typing import Tuple
+
+from .audio_decoder import StreamingDecoder, DecodedAudio
+from .speech_google import StreamingRecognizer
+from .websocket_manager import ConnectionManager
+
+
+class LiveTranscriber:
+    """
+    Decodes and transcribes one answer while it is being recorded:
+    WebM chunk → ffmpeg (stdin) → PCM → Google streaming STT → transcript_partial.
+    """
+
+    def __init__(self, room_id: str, manager: ConnectionManager):
+        self.room_id = room_id
+        self.manager = manager
+        self.recognizer = None
+        self.decoder = StreamingDecoder(on_pcm=self._on_pcm)
+
+    async def start(self):
+        await self.decoder.start()
+        self.recognizer = StreamingRecognizer(
+            self.decoder.sample_rate, on_partial=self._on_partial
+        )
+        self.recognizer.start()
+
+    def _on_pcm(self, pcm: bytes):
+        self.recognizer.feed(pcm)
+
+    async def _on_partial(self, text: str):
+        await self.manager.broadcast(self.room_id, {
+            "type": "transcript_partial",
+            "text": text
+        })
+
+    async def feed(self, chunk: bytes):
+        await self.decoder.feed(chunk)
+
+    async def finish(self) -> Tuple[DecodedAudio, str]:
+        try:
+            audio = await self.decoder.finish()
+        except Exception:
+            self.recognizer.abort()
+            raise
+        transcript = await self.recognizer.finish()
+        return audio, transcript
+
+    async def abort(self):
+        if self.recognizer is not None:
+            self.recognizer.abort()
+        await self.decoder.abort()
@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from .config import settings
+
+
+# ----------------------------------------------------
+# Cache keys
+# ----------------------------------------------------
+# Bucket widths for acoustic features: answers that only differ by
+# measurement noise share a cache entry. These are exactly the features the
+# evaluation prompt shows Gemini; anything else in the payload (VAD timings,
+# pause counts, ...) does not change the response and is left out of the key.
+FEATURE_BUCKETS = {
+    "jitter": 0.005,
+    "shimmer": 0.01,
+    "loudness": 0.01,
+    "speech_rate": 0.25,
+    "pause_ratio": 0.05,
+}
+
+
+def normalize_text(text: Optional[str]) -> str:
+    text = (text or "").lower()
+    text = re.sub(r"[^\w\s']", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def bucket_features(features: Optional[dict]) -> dict:
+    if not features:
+        return {}
+    out = {}
+    for name, step in FEATURE_BUCKETS.items():
+        try:
+            value = float(features[name])
+        except (KeyError, TypeError, ValueError):
+            continue
+        out[name] = round(value / step)
+    return out
+
+
+def make_key(kind: str, model: str, question: str = None, transcript: str = None,
+             features: dict = None) -> str:
+    raw = json.dumps({
+        "kind": kind,
+        "model": model,
+        "question": normalize_text(question),
+        "transcript": normalize_text(transcript),
+        "features": bucket_features(features),
+    }, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+# ----------------------------------------------------
+# Backends
+# ----------------------------------------------------
+class MemoryCacheBackend:
+    """LRU with per-entry TTL."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any):
+        self._data[key] = (time.time() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    """On-disk cache that survives restarts; same LRU + TTL semantics."""
+
+    def __init__(self, path: str, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_llm_cache_last_used ON llm_cache (last_used)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_used)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl, now),
+            )
+            self._conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+# ----------------------------------------------------
+# Cache facade used by ai_evaluator
+# ----------------------------------------------------
+class ResponseCache:
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def get(self, key: str):
+        if self.backend is None:
+            return None
+        if isinstance(self.backend, SQLiteCacheBackend):
+            value = await asyncio.to_thread(self.backend.get, key)
+        else:
+            value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any):
+        if self.backend is None:
+            return
+        if isinstance(self.backend, SQLiteCacheBackend):
+            await asyncio.to_thread(self.backend.set, key, value)
+        else:
+            self.backend.set(key, value)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "entries": len(self.backend) if self.backend else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def build_cache() -> ResponseCache:
+    kind = settings.LLM_CACHE_BACKEND.lower()
+    if kind == "memory":
+        return ResponseCache(MemoryCacheBackend(settings.LLM_CACHE_MAX_ENTRIES, settings.LLM_CACHE_TTL_SECONDS))
+    if kind == "sqlite":
+        return ResponseCache(SQLiteCacheBackend(
+            settings.LLM_CACHE_SQLITE_PATH, settings.LLM_CACHE_MAX_ENTRIES, settings.LLM_CACHE_TTL_SECONDS
+        ))
+    return ResponseCache(None)
+
+
+llm_cache = build_cache()
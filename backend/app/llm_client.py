@@ -0,0 +1,283 @@
+import asyncio
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional, TypeVar
+
+import httpx
+from google.genai import errors as genai_errors
+
+from .config import settings
+from .metrics import llm_call_seconds
+
+T = TypeVar("T")
+
+# HTTP status codes worth another attempt
+TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+
+class LlmError(Exception):
+    """The call failed after retries, timed out, or was refused by the open breaker."""
+
+
+class LlmUnavailable(LlmError):
+    """Circuit breaker is open; no request was sent."""
+
+
+def is_transient(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(error, genai_errors.ServerError):
+        return True
+    if isinstance(error, genai_errors.APIError):
+        return getattr(error, "code", None) in TRANSIENT_STATUS
+    return False
+
+
+class CircuitBreaker:
+    """
+    closed → open after `threshold` consecutive failed calls; open refuses
+    everything for `cooldown` seconds; then half-open lets one trial call
+    through, which closes the breaker on success or re-opens it on failure.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def end_trial(self):
+        """Let another half-open trial through; for calls that ended without a verdict."""
+        self._trial_running = False
+
+    def record(self, ok: bool):
+        self._trial_running = False
+        if ok:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class LlmClient:
+    """
+    Runs blocking Gemini SDK calls on a dedicated, bounded thread pool (so a
+    burst of answers cannot starve the default executor) with:
+    - a per-attempt deadline (LLM_TIMEOUT_SECONDS)
+    - jittered exponential backoff on transient errors (LLM_MAX_RETRIES)
+    - optional hedging: a duplicate request once the first has run longer
+      than the recent p95, first response wins (LLM_HEDGE)
+    - a circuit breaker that fails fast while Gemini is down
+    """
+
+    def __init__(self, max_concurrency: int = None):
+        self.max_concurrency = max_concurrency or settings.LLM_MAX_CONCURRENCY
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="gemini")
+        self._slots = None
+        self.breaker = CircuitBreaker(settings.LLM_BREAKER_THRESHOLD, settings.LLM_BREAKER_COOLDOWN_SECONDS)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counts = {"calls": 0, "retries": 0, "timeouts": 0, "failures": 0, "rejected": 0, "hedges": 0, "hedge_wins": 0}
+
+    def _p95(self) -> Optional[float]:
+        if len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._slots
+
+    def _submit(self, fn: Callable[[], T], kind: str) -> asyncio.Future:
+        """
+        Start one request on the pool under a slot the caller has acquired.
+        The slot is released when the thread returns, not when the caller
+        stops waiting, so abandoned requests still count against the cap.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            future = loop.run_in_executor(self._executor, fn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        def finished(f):
+            self._slots.release()
+            if f.cancelled():
+                return
+            elapsed = time.perf_counter() - started
+            error = f.exception()
+            if error is None:
+                self._latencies.append(elapsed)
+                llm_call_seconds.labels(kind, "ok").observe(elapsed)
+            else:
+                llm_call_seconds.labels(kind, type(error).__name__).observe(elapsed)
+
+        future.add_done_callback(finished)
+        return future
+
+    async def _attempt(self, fn: Callable[[], T], kind: str, hedge: bool) -> T:
+        """One attempt within the deadline, hedged once it runs past the p95."""
+        slots = self._get_slots()
+        # Waiting for a free slot does not count against the deadline
+        await slots.acquire()
+        primary = self._submit(fn, kind)
+        hedge_after = self._p95() if hedge and settings.LLM_HEDGE else None
+        if hedge_after is not None:
+            hedge_after = max(hedge_after, settings.LLM_HEDGE_MIN_DELAY_MS / 1000)
+
+        deadline = time.perf_counter() + settings.LLM_TIMEOUT_SECONDS
+        pending = {primary}
+        hedged = None
+        # Requests left behind (timeout, lost hedge, cancellation) are never
+        # cancelled: they keep their slot until the thread returns and their
+        # results are dropped
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            wait = remaining
+            if hedged is None and hedge_after is not None:
+                wait = min(remaining, max(0.0, hedge_after - (settings.LLM_TIMEOUT_SECONDS - remaining)))
+            done, pending = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+
+            for future in done:
+                if future.exception() is None:
+                    if future is hedged:
+                        self.counts["hedge_wins"] += 1
+                    return future.result()
+            if done and not pending:
+                # Every request of this attempt failed; surface the last error
+                raise next(iter(done)).exception()
+
+            if hedged is None and hedge_after is not None and not done:
+                # Fire the hedge only while the pool has room; never queue it behind answers
+                if not slots.locked():
+                    await slots.acquire()
+                    hedged = self._submit(fn, kind)
+                    pending.add(hedged)
+                    self.counts["hedges"] += 1
+                hedge_after = None
+
+    async def call(
+        self,
+        fn: Callable[[], T],
+        kind: str = "generate",
+        hedge: bool = True,
+        retry_if: Callable[[], bool] = None,
+    ) -> T:
+        """
+        Run `fn` (a blocking SDK call) with deadline, retries, hedging and the
+        breaker. `retry_if`, when given, must also return True for a transient
+        failure to be retried.
+        """
+        trial = self.breaker.state != "closed"
+        if not self.breaker.allow():
+            self.counts["rejected"] += 1
+            raise LlmUnavailable("Gemini circuit breaker is open")
+
+        self.counts["calls"] += 1
+        attempts = settings.LLM_MAX_RETRIES + 1
+        try:
+            for attempt in range(attempts):
+                try:
+                    result = await self._attempt(fn, kind, hedge)
+                except Exception as e:
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.counts["timeouts"] += 1
+                    transient = is_transient(e)
+                    if not transient or attempt == attempts - 1 or (retry_if is not None and not retry_if()):
+                        self.counts["failures"] += 1
+                        if transient:
+                            # 4xx / validation errors say nothing about Gemini's health
+                            self.breaker.record(ok=False)
+                        raise LlmError(f"Gemini {kind} call failed: {e!r}") from e
+                    # Full jitter keeps retries from a burst of answers from lining up
+                    cap = min(settings.LLM_RETRY_MAX_MS, settings.LLM_RETRY_BASE_MS * 2 ** attempt) / 1000
+                    self.counts["retries"] += 1
+                    await asyncio.sleep(random.uniform(0, cap))
+                    continue
+                self.breaker.record(ok=True)
+                return result
+        finally:
+            if trial:
+                # A half-open trial that was cancelled or ended without a
+                # verdict must not keep the breaker refusing every call
+                self.breaker.end_trial()
+
+    async def stream(self, open_stream: Callable[[], Iterator], on_text: Callable[[str], None], kind: str = "stream") -> str:
+        """
+        Consume a streaming SDK call (`open_stream` returns the chunk iterator)
+        on the pool and hand each chunk's text to `on_text` on the event loop,
+        in order, before this returns. Returns the whole text.
+
+        Never hedged, and retried only while nothing has been delivered: a
+        second stream would interleave with text the caller already used.
+        """
+        loop = asyncio.get_running_loop()
+        state = {"attempt": 0, "delivered": False, "closed": False}
+
+        def deliver(attempt, text):
+            if attempt == state["attempt"] and not state["closed"]:
+                state["delivered"] = True
+                on_text(text)
+
+        def consume():
+            state["attempt"] += 1
+            attempt = state["attempt"]
+            parts = []
+            for chunk in open_stream():
+                if attempt != state["attempt"] or state["closed"]:
+                    # Timed out and superseded; stop reading
+                    break
+                text = chunk.text or ""
+                if text:
+                    parts.append(text)
+                    loop.call_soon_threadsafe(deliver, attempt, text)
+            return "".join(parts)
+
+        try:
+            return await self.call(consume, kind, hedge=False, retry_if=lambda: not state["delivered"])
+        finally:
+            state["closed"] = True
+
+    def stats(self) -> dict:
+        p95 = self._p95()
+        return {
+            **self.counts,
+            "breaker_open": self.breaker.state != "closed",
+            "p95_latency_sec": p95 if p95 is not None else 0.0,
+            "max_concurrency": self.max_concurrency,
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+llm_client = LlmClient()
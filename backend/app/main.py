@@ -1,119 +1,334 @@
-from fastapi import FastAPI, Depends, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.middleware.cors import CORSMiddleware
-
-from datetime import timedelta
-
-from .config import settings
-from . import crud, auth, schemas
-from .db import init_db
-from .websocket_manager import manager
-from .audio_processor import process_audio_and_evaluate
-
-
-# ----------------------------
-# INIT APP
-# ----------------------------
-app = FastAPI(title="AI Interviewer")
-
-# ----------------------------
-# CORS - ONLY THIS BLOCK
-# ----------------------------
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:5173"],   # 🔥 Correct
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
-
-# ----------------------------
-# STARTUP INIT
-# ----------------------------
-@app.on_event("startup")
-async def startup():
-    await init_db()
-
-
-# ---------------- AUTH ----------------
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    payload = auth.decode_token(token)
-    if not payload:
-        raise HTTPException(401, "Invalid token")
-
-    user_id = int(payload.get("sub"))
-    user = await crud.get_user(user_id)
-    if not user:
-        raise HTTPException(404, "User not found")
-
-    return user
-
-
-@app.post("/register", response_model=schemas.UserOut)
-async def register(u: schemas.UserCreate):
-    existing = await crud.get_user_by_email(u.email)
-    if existing:
-        raise HTTPException(400, "Email already registered")
-    
-    user = await crud.create_user(u.email, u.password, u.full_name)
-    return user
-
-
-@app.post("/token", response_model=schemas.Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = await crud.get_user_by_email(form_data.username)
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
-        raise HTTPException(400, "Incorrect username or password")
-
-    token = auth.create_access_token(
-        {"sub": str(user.id)},
-        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    )
-    return {"access_token": token, "token_type": "bearer"}
-
-
-# ---------------- INTERVIEW ----------------
-@app.post("/start_interview", response_model=schemas.InterviewOut)
-async def start_interview(payload: schemas.InterviewCreate, current_user=Depends(get_current_user)):
-    if payload.user_id != current_user.id:
-        raise HTTPException(403, "Unauthorized interview start")
-
-    interview = await crud.create_interview(payload.user_id)
-    return interview
-
-
-@app.get("/questions", response_model=list[schemas.QuestionOut])
-async def get_questions(level: int = 1, limit: int = 5, current_user=Depends(get_current_user)):
-    return await crud.list_questions(level, limit)
-
-
-@app.get("/profile/stats")
-async def get_profile_stats(current_user=Depends(get_current_user)):
-    return await crud.get_user_interview_stats(current_user.id)
-
-
-# ---------------- WEBSOCKET ----------------
-@app.websocket("/ws/{room_id}")
-async def websocket_endpoint(websocket: WebSocket, room_id: str, token: str = None):
-    await manager.connect(room_id, websocket)
-
-    try:
-        while True:
-            data = await websocket.receive_json()
-
-            if data.get("type") == "audio_data":
-                await process_audio_and_evaluate(
-                    room_id=room_id,
-                    question=data.get("question"),
-                    interview_id=data.get("interview_id"),
-                    base64_audio=data.get("data"),
-                    manager=manager
-                )
-            else:
-                await manager.broadcast(room_id, data)
-
-    except WebSocketDisconnect:
-        manager.disconnect(room_id, websocket)
+from fastapi import FastAPI, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.middleware.cors import CORSMiddleware
+
+from datetime import timedelta
+import asyncio
+import base64
+import json
+import time
+
+from .config import settings
+from . import crud, auth, schemas
+from .db import init_db
+from .websocket_manager import manager
+from .audio_stream import audio_streams, AudioBufferOverflow, AudioStreamBusy
+from .audio_processor import process_audio_and_evaluate
+from .live_stt import LiveTranscriber
+from .opensmile_integration import opensmile_service
+from .job_queue import answer_queue, QueueFullError
+from .eval_writer import eval_writer
+from .user_cache import user_cache, UserSnapshot
+from .question_bank import question_bank
+from .stt_backends import stt_backend
+from .llm_cache import llm_cache
+from .llm_client import llm_client
+from . import metrics
+
+
+# ----------------------------
+# INIT APP
+# ----------------------------
+app = FastAPI(title="AI Interviewer")
+
+# ----------------------------
+# CORS - ONLY THIS BLOCK
+# ----------------------------
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:5173"],   # 🔥 Correct
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+
+
+# ----------------------------
+# STARTUP INIT
+# ----------------------------
+@app.on_event("startup")
+async def startup():
+    await init_db()
+    await question_bank.start()
+    stt_backend.start()
+    if settings.METRICS_ENABLED:
+        metrics.loop_lag_monitor.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await answer_queue.close()
+    await question_bank.close()
+    await metrics.loop_lag_monitor.close()
+    await eval_writer.close()
+    opensmile_service.close()
+    auth.password_hasher.close()
+    stt_backend.close()
+    llm_client.close()
+    await manager.broker.close()
+
+
+# ---------------- AUTH ----------------
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserSnapshot:
+    cached = user_cache.get(token)
+    if cached is not None:
+        return cached
+
+    payload = auth.decode_token(token)
+    if not payload:
+        raise HTTPException(401, "Invalid token")
+
+    user_id = int(payload.get("sub"))
+    user = await crud.get_user(user_id)
+    if not user:
+        raise HTTPException(404, "User not found")
+
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.put(token, snapshot, token_exp=payload.get("exp"))
+    return snapshot
+
+
+@app.post("/register", response_model=schemas.UserOut)
+async def register(u: schemas.UserCreate):
+    existing = await crud.get_user_by_email(u.email)
+    if existing:
+        raise HTTPException(400, "Email already registered")
+    
+    try:
+        user = await crud.create_user(u.email, u.password, u.full_name)
+    except auth.PasswordHasherBusy:
+        raise HTTPException(503, "Server busy, please retry", headers={"Retry-After": "1"})
+    return user
+
+
+@app.post("/token", response_model=schemas.Token)
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await crud.get_user_by_email(form_data.username)
+    if not user:
+        raise HTTPException(400, "Incorrect username or password")
+    try:
+        valid, new_hash = await auth.password_hasher.verify_and_update(form_data.password, user.hashed_password)
+    except auth.PasswordHasherBusy:
+        raise HTTPException(503, "Server busy, please retry", headers={"Retry-After": "1"})
+    if not valid:
+        raise HTTPException(400, "Incorrect username or password")
+    if new_hash:
+        # Stored hash predates the current PASSWORD_HASH_ROUNDS
+        await crud.update_password_hash(user.id, new_hash)
+
+    token = auth.create_access_token(
+        {"sub": str(user.id)},
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"access_token": token, "token_type": "bearer"}
+
+
+# ---------------- METRICS ----------------
+# Existing stats() dicts, exported as gauges at scrape time
+metrics.registry.register_stats("stt", stt_backend.stats)
+metrics.registry.register_stats("ws", manager.stats)
+metrics.registry.register_stats("answer_queue", answer_queue.stats)
+metrics.registry.register_stats("llm_cache", llm_cache.stats)
+metrics.registry.register_stats("llm", llm_client.stats)
+metrics.registry.register_stats("eval_writer", eval_writer.stats)
+metrics.registry.register_stats("user_cache", user_cache.stats)
+metrics.registry.register_stats("password_hasher", auth.password_hasher.stats)
+metrics.registry.register_stats("question_bank", question_bank.stats)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(404, "Not Found")
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+# ---------------- INTERVIEW ----------------
+@app.post("/start_interview", response_model=schemas.InterviewOut)
+async def start_interview(payload: schemas.InterviewCreate, current_user=Depends(get_current_user)):
+    if payload.user_id != current_user.id:
+        raise HTTPException(403, "Unauthorized interview start")
+
+    interview = await crud.create_interview(payload.user_id)
+    return interview
+
+
+@app.get("/questions", response_model=list[schemas.QuestionOut])
+async def get_questions(
+    level: int = 1,
+    limit: int = 5,
+    tag: str = None,
+    interview_id: int = None,
+    current_user=Depends(get_current_user),
+):
+    # Served from memory; with interview_id, no question repeats within the interview
+    interview_key = (current_user.id, interview_id) if interview_id is not None else None
+    return question_bank.sample(level, max(1, min(limit, 50)), tag=tag, interview_key=interview_key)
+
+
+@app.get("/profile/stats")
+async def get_profile_stats(current_user=Depends(get_current_user)):
+    return await crud.get_user_interview_stats(current_user.id)
+
+
+@app.get("/profile/history", response_model=schemas.EvaluationPage)
+async def get_profile_history(cursor: str = None, limit: int = 20, current_user=Depends(get_current_user)):
+    limit = max(1, min(limit, 100))
+    try:
+        return await crud.get_user_evaluation_history(current_user.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+# ---------------- WEBSOCKET ----------------
+async def _start_live(room_id: str):
+    if not settings.STT_STREAMING or not stt_backend.supports_streaming:
+        return None
+    live = LiveTranscriber(room_id, manager)
+    try:
+        await live.start()
+    except Exception:
+        # e.g. no subprocess support on this loop → buffered mode
+        await live.abort()
+        return None
+    return live
+
+
+async def _enqueue_answer(room_id: str, live: LiveTranscriber = None, **kwargs):
+    """Run the pipeline in the background so this socket keeps receiving."""
+    # Close the live STT stream right away, even if the answer has to wait in the queue
+    finishing = asyncio.ensure_future(live.finish()) if live is not None else None
+
+    submitted = time.perf_counter()
+
+    async def job():
+        metrics.queue_wait_seconds.observe(time.perf_counter() - submitted)
+        if finishing is not None:
+            try:
+                kwargs["decoded"], kwargs["transcript"] = await finishing
+            except Exception:
+                # Fall back to decoding + transcribing the buffered answer
+                await live.abort()
+        await process_audio_and_evaluate(room_id=room_id, manager=manager, **kwargs)
+
+    try:
+        position = answer_queue.submit(room_id, job)
+    except QueueFullError as e:
+        if finishing is not None:
+            finishing.cancel()
+            await live.abort()
+        await manager.broadcast(room_id, {"type": "error", "message": str(e)})
+        return
+
+    await manager.broadcast(room_id, {
+        "type": "queued",
+        "position": position.room,
+        "overall_position": position.overall,
+        "message": f"Answer queued, position {position.room} in this room, {position.overall} overall"
+    })
+
+
+async def _drop_live(buf):
+    if buf is not None and buf.live is not None:
+        live, buf.live = buf.live, None
+        await live.abort()
+
+
+# Audio protocol:
+#   {"type": "audio_start", "question", "interview_id", "format"}  (text)
+#   <binary frames>  one per MediaRecorder timeslice
+#   {"type": "audio_end"}                                          (text)
+@app.websocket("/ws/{room_id}")
+async def websocket_endpoint(websocket: WebSocket, room_id: str, token: str = None):
+    try:
+        await manager.connect(room_id, websocket)
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            # ---- Binary audio chunk ----
+            if message.get("bytes") is not None:
+                metrics.payload_bytes.labels("audio_chunk").observe(len(message["bytes"]))
+                try:
+                    buf = audio_streams.append(room_id, message["bytes"], websocket)
+                except AudioStreamBusy:
+                    # Frames from anyone but the recording socket are ignored
+                    continue
+                except AudioBufferOverflow as e:
+                    await _drop_live(audio_streams.discard(room_id, websocket))
+                    await manager.broadcast(room_id, {"type": "error", "message": str(e)})
+                    continue
+                if buf is None:
+                    await manager.broadcast(room_id, {
+                        "type": "error",
+                        "message": "Audio chunk received without audio_start"
+                    })
+                elif buf.live is not None:
+                    try:
+                        await buf.live.feed(message["bytes"])
+                    except Exception:
+                        # Live decoding died; the buffered bytes are still complete
+                        await _drop_live(buf)
+                continue
+
+            data = json.loads(message.get("text") or "{}")
+            msg_type = data.get("type")
+
+            if msg_type == "audio_start":
+                await _drop_live(audio_streams.discard(room_id, websocket))
+                try:
+                    buf = audio_streams.start(
+                        room_id,
+                        question=data.get("question"),
+                        interview_id=data.get("interview_id"),
+                        mime_type=data.get("format"),
+                        owner=websocket,
+                    )
+                except AudioStreamBusy as e:
+                    await manager.broadcast(room_id, {"type": "error", "message": str(e)})
+                    continue
+                buf.live = await _start_live(room_id)
+
+            elif msg_type == "audio_end":
+                try:
+                    buf = audio_streams.finish(room_id, websocket)
+                except AudioStreamBusy as e:
+                    await manager.broadcast(room_id, {"type": "error", "message": str(e)})
+                    continue
+                if buf is None or len(buf) == 0:
+                    await _drop_live(buf)
+                    await manager.broadcast(room_id, {
+                        "type": "error",
+                        "message": "No audio received for this answer"
+                    })
+                    continue
+
+                await _enqueue_answer(
+                    room_id,
+                    live=buf.live,
+                    question=buf.question,
+                    interview_id=buf.interview_id,
+                    audio_bytes=buf.getvalue(),
+                )
+
+            elif msg_type == "audio_data":
+                # Legacy single-blob base64 upload
+                await _enqueue_answer(
+                    room_id,
+                    question=data.get("question"),
+                    interview_id=data.get("interview_id"),
+                    audio_bytes=base64.b64decode(data.get("data") or ""),
+                )
+            else:
+                await manager.broadcast(room_id, data)
+
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Any exit (disconnect, bad frame, server error) releases the room slot
+        await _drop_live(audio_streams.discard(room_id, websocket))
+        manager.disconnect(room_id, websocket)
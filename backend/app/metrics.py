@@ -0,0 +1,300 @@
+import asyncio
+import math
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .config import settings
+
+# Seconds; covers a fast cache hit up to a slow Gemini call
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Bytes; WebSocket messages up to whole recorded answers
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [
+        '%s="%s"' % (n, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for n, v in zip(names, values)
+    ]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+# ----------------------------------------------------
+# Metric types (updated from the event loop thread only)
+# ----------------------------------------------------
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values, **kwvalues):
+        if kwvalues:
+            values = tuple(kwvalues[n] for n in self.labelnames)
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+    _new_child = _Value
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_labels(self.labelnames, key)} {_fmt(child.value)}"]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def dec(self, amount: float = 1):
+        self._default().dec(amount)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def _render_child(self, key, child):
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets, child.counts):
+            cumulative += count
+            le = _labels(self.labelnames, key, f'le="{_fmt(bound)}"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        base = _labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{base} {_fmt(child.sum)}")
+        lines.append(f"{self.name}_count{base} {child.count}")
+        return lines
+
+
+# ----------------------------------------------------
+# Registry + Prometheus text exposition
+# ----------------------------------------------------
+class Registry:
+    def __init__(self, prefix: str = "interviewer_"):
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Tuple[str, Callable[[], dict]]] = []
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(self.prefix + name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(self.prefix + name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(self.prefix + name, documentation, labelnames, buckets))
+
+    def register_stats(self, subsystem: str, stats: Callable[[], dict]):
+        """
+        Export the numeric fields of an existing stats()/snapshot() dict as
+        gauges named <prefix><subsystem>_<field>, read at scrape time.
+        """
+        self._collectors.append((subsystem, stats))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for subsystem, stats in self._collectors:
+            try:
+                values = stats()
+            except Exception:
+                continue
+            for field, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                name = f"{self.prefix}{subsystem}_{field}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# ----------------------------------------------------
+# Application metrics
+# ----------------------------------------------------
+stage_seconds = registry.histogram(
+    "pipeline_stage_seconds", "Wall time of one answer pipeline stage.", ("stage",)
+)
+stage_errors = registry.counter(
+    "pipeline_stage_errors_total", "Pipeline stages that raised, by exception type.", ("stage", "error")
+)
+stage_in_flight = registry.gauge(
+    "pipeline_stage_in_flight", "Pipeline stages currently running.", ("stage",)
+)
+answers_total = registry.counter(
+    "pipeline_answers_total", "Answers that went through the pipeline, by outcome.", ("outcome",)
+)
+answer_seconds = registry.histogram(
+    "pipeline_answer_seconds", "Time from pipeline start to the last stage finishing."
+)
+queue_wait_seconds = registry.histogram(
+    "pipeline_queue_wait_seconds", "Time an answer waited in the job queue before its pipeline started."
+)
+acoustic_phase_seconds = registry.histogram(
+    "acoustic_phase_seconds", "OpenSMILE worker timings per phase.", ("phase",)
+)
+acoustic_fallbacks = registry.counter(
+    "acoustic_fallbacks_total", "Answers whose OpenSMILE extraction fell back or failed.", ("reason",)
+)
+payload_bytes = registry.histogram(
+    "payload_bytes", "Size of audio answers and outgoing WebSocket messages.", ("kind",), buckets=SIZE_BUCKETS
+)
+audio_seconds = registry.histogram(
+    "answer_audio_seconds", "Decoded answer duration.", buckets=(1, 5, 10, 20, 30, 60, 120, 300, 600)
+)
+vad_audio_seconds = registry.counter(
+    "vad_audio_seconds_total", "Answer audio before and after silence trimming.", ("kind",)
+)
+llm_call_seconds = registry.histogram(
+    "llm_call_seconds", "Gemini requests (including retries and hedges), by outcome.", ("kind", "outcome")
+)
+loop_lag_seconds = registry.histogram(
+    "event_loop_lag_seconds", "How late a periodic timer fired; lag means the loop was blocked.",
+    buckets=LAG_BUCKETS,
+)
+loop_lag_max = registry.gauge(
+    "event_loop_lag_max_seconds", "Largest event loop lag seen since the last scrape."
+)
+
+
+class PipelineObserver:
+    """Passed to StageGraph; records per-stage latency, errors and in-flight counts."""
+
+    def stage_started(self, stage: str):
+        stage_in_flight.labels(stage).inc()
+
+    def stage_finished(self, stage: str, seconds: float, error: Optional[BaseException] = None):
+        stage_in_flight.labels(stage).dec()
+        stage_seconds.labels(stage).observe(seconds)
+        if error is not None:
+            stage_errors.labels(stage, type(error).__name__).inc()
+
+
+pipeline_observer = PipelineObserver()
+
+
+class LoopLagMonitor:
+    """Sleeps LOOP_LAG_INTERVAL_MS at a time and records how late each wake-up is."""
+
+    def __init__(self, interval: float = None):
+        self.interval = interval or settings.LOOP_LAG_INTERVAL_MS / 1000.0
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            loop_lag_seconds.observe(lag)
+            if lag > loop_lag_max._default().value:
+                loop_lag_max.set(lag)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+loop_lag_monitor = LoopLagMonitor()
+
+
+def render_metrics() -> str:
+    text = registry.render()
+    # Max lag is per scrape interval
+    loop_lag_max.set(0)
+    return text
@@ -1,51 +1,75 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float
-from sqlalchemy.orm import relationship
-from .db import Base
-import datetime
-
-class User(Base):
-    __tablename__ = "users"
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True, nullable=False)
-    hashed_password = Column(String, nullable=False)
-    full_name = Column(String, nullable=True) # <-- FIX: MUST BE NULLABLE=TRUE
-    is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-
-    interviews = relationship("Interview", back_populates="user")
-
-class Interview(Base):
-    __tablename__ = "interviews"
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    started_at = Column(DateTime, default=datetime.datetime.utcnow)
-    ended_at = Column(DateTime, nullable=True)
-    score = Column(Float, nullable=True)
-    feedback = Column(Text, nullable=True)
-    evaluations = relationship("Evaluation", back_populates="interview")
-
-
-    user = relationship("User", back_populates="interviews")
-
-class Question(Base):
-    __tablename__ = "questions"
-    id = Column(Integer, primary_key=True, index=True)
-    text = Column(Text, nullable=False)
-    level = Column(Integer, default=1)
-    tags = Column(String, nullable=True)
-
-class Evaluation(Base):
-    __tablename__ = "evaluations"
-
-    id = Column(Integer, primary_key=True, index=True)
-    interview_id = Column(Integer, ForeignKey("interviews.id"))
-    question_text = Column(Text, nullable=False)
-
-    correctness_score = Column(Float, nullable=False)
-    fluency_score = Column(Float, nullable=False)
-    combined_score = Column(Float, nullable=False)
-    feedback = Column(Text, nullable=False)
-
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-
-    interview = relationship("Interview", back_populates="evaluations")
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, Index, JSON
+from sqlalchemy.orm import relationship
+from .db import Base
+import datetime
+
+class User(Base):
+    __tablename__ = "users"
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String, unique=True, index=True, nullable=False)
+    hashed_password = Column(String, nullable=False)
+    full_name = Column(String, nullable=True) # <-- FIX: MUST BE NULLABLE=TRUE
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    interviews = relationship("Interview", back_populates="user")
+
+class Interview(Base):
+    __tablename__ = "interviews"
+    __table_args__ = (
+        Index("ix_interviews_user_id_id", "user_id", "id"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    started_at = Column(DateTime, default=datetime.datetime.utcnow)
+    ended_at = Column(DateTime, nullable=True)
+    score = Column(Float, nullable=True)
+    feedback = Column(Text, nullable=True)
+    evaluations = relationship("Evaluation", back_populates="interview")
+
+
+    user = relationship("User", back_populates="interviews")
+
+class Question(Base):
+    __tablename__ = "questions"
+    id = Column(Integer, primary_key=True, index=True)
+    text = Column(Text, nullable=False)
+    level = Column(Integer, default=1)
+    tags = Column(String, nullable=True)
+
+class Evaluation(Base):
+    __tablename__ = "evaluations"
+    # Keyset pagination on (created_at, id), per interview and globally
+    __table_args__ = (
+        Index("ix_evaluations_interview_created_id", "interview_id", "created_at", "id"),
+        Index("ix_evaluations_created_id", "created_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    interview_id = Column(Integer, ForeignKey("interviews.id"))
+    question_text = Column(Text, nullable=False)
+
+    correctness_score = Column(Float, nullable=False)
+    fluency_score = Column(Float, nullable=False)
+    combined_score = Column(Float, nullable=False)
+    feedback = Column(Text, nullable=False)
+
+    # Inputs of the evaluation, kept so answers can be re-scored (app.rescore)
+    transcript = Column(Text, nullable=True)
+    acoustic_features = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    interview = relationship("Interview", back_populates="evaluations")
+
+class UserStats(Base):
+    """Running per-user aggregates, updated by save_evaluation in the same transaction."""
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    evaluation_count = Column(Integer, nullable=False, default=0)
+    sum_correctness = Column(Float, nullable=False, default=0.0)
+    sum_fluency = Column(Float, nullable=False, default=0.0)
+    sum_combined = Column(Float, nullable=False, default=0.0)
+    last_feedback = Column(Text, nullable=True)
+    last_evaluation_at = Column(DateTime, nullable=True)
@@ -1,53 +1,220 @@
-import csv
-import subprocess
-import tempfile
-import os
-from .config import settings
-
-def extract_opensmile_features(wav_path: str):
-    """
-    Extract jitter, shimmer, loudness, and voicing
-    using OpenSMILE emobase.conf.
-    """
-
-    smil_path = settings.OPENSMILE_PATH
-    config_path = settings.OPENSMILE_CONFIG_PATH
-
-    if not os.path.isfile(smil_path):
-        raise FileNotFoundError(f"Opensmile processed")
-
-    if not os.path.isfile(config_path):
-        raise FileNotFoundError(f"Opensmile processed")
-
-    # Temporary output CSV file
-    tmp_csv = tempfile.NamedTemporaryFile(delete=False, suffix=".csv").name
-
-    cmd = [
-        smil_path,
-        "-C", config_path,
-        "-I", wav_path,
-        "-O", tmp_csv,
-    ]
-
-    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    if proc.returncode != 0:
-        raise RuntimeError("Opensmile processed")
-
-    # Parse CSV
-    with open(tmp_csv, "r") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-
-    os.remove(tmp_csv)
-
-    if not rows:
-        raise ValueError("OpenSMILE CSV empty – config may not output features.")
-
-    row = rows[0]
-
-    return {
-        "jitter": float(row.get("jitterLocal_sma", 0)),
-        "shimmer": float(row.get("shimmerLocal_sma", 0)),
-        "loudness": float(row.get("pcm_intensity_sma", 0)),
-        "voicing": float(row.get("voicingFinalUnclipped_sma", 0)),
-    }
+import asyncio
+import csv
+import subprocess
+import tempfile
+import time
+import os
+from typing import List, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from .config import settings
+from .process_pool import new_process_pool
+
+# feature -> (frame-level LLD column, aggregate over frames). Averaged the way
+# extract_numpy_features averages its frames, so both ACOUSTIC_BACKENDs give
+# comparable numbers (checked by bench/bench_acoustic_conformance.py).
+LLD_COLUMNS = {
+    "jitter": ("jitterLocal_sma", "voiced_mean"),
+    "shimmer": ("shimmerLocal_sma", "voiced_mean"),
+    "loudness": ("pcm_intensity_sma", "mean"),
+    "voicing": ("voicingFinalUnclipped_sma", "mean"),
+}
+
+
+def config_paths() -> List[str]:
+    """OPENSMILE_CONFIG_PATH may list several configs, comma-separated."""
+    return [p.strip() for p in settings.OPENSMILE_CONFIG_PATH.split(",") if p.strip()]
+
+
+def opensmile_available() -> bool:
+    return os.path.isfile(settings.OPENSMILE_PATH) and all(os.path.isfile(p) for p in config_paths())
+
+
+def _run_lld(smil_path: str, config_path: str, wav_path: str, lld_option: str) -> dict:
+    """Frame-level LLD columns of one SMILExtract run, as arrays."""
+    fd, tmp_csv = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    os.remove(tmp_csv)
+    try:
+        cmd = [smil_path, "-C", config_path, "-I", wav_path, lld_option, tmp_csv, "-nologfile"]
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"SMILExtract failed with {config_path}: {proc.stderr[-500:]}")
+        if not os.path.exists(tmp_csv):
+            raise ValueError(f"{config_path} wrote no LLD CSV; check OPENSMILE_LLD_OPTION")
+        with open(tmp_csv, newline="") as f:
+            rows = list(csv.DictReader(f, delimiter=";"))
+    finally:
+        if os.path.exists(tmp_csv):
+            os.remove(tmp_csv)
+    if not rows:
+        return {}
+    return {name: np.array([float(row[name]) for row in rows]) for name in rows[0] if name != "name"}
+
+
+def aggregate_lld(lld: dict) -> dict:
+    features = {}
+    for feature, (column, how) in LLD_COLUMNS.items():
+        values = lld.get(column)
+        if values is None or not len(values):
+            continue
+        if how == "voiced_mean":
+            # cPitchJitter writes 0 for frames without measurable periods
+            values = values[values > 0]
+        features[feature] = float(np.mean(values)) if len(values) else 0.0
+    return features
+
+
+def extract_opensmile_features(wav_path: str, smil_path: str = None, configs: List[str] = None,
+                               lld_option: str = None) -> dict:
+    """
+    Jitter, shimmer, loudness and voicing from SMILExtract's frame-level LLD
+    output, averaged over frames. Each config runs once and the first to
+    produce a column wins (emobase has pcm_intensity; jitter, shimmer and
+    voicing need e.g. IS10_paraling). Features no config produces are left out.
+    """
+    smil_path = smil_path or settings.OPENSMILE_PATH
+    configs = configs or config_paths()
+    lld_option = lld_option or settings.OPENSMILE_LLD_OPTION
+
+    for path in [smil_path] + configs:
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"OpenSMILE file not found: {path}")
+
+    features = {}
+    for config_path in configs:
+        for feature, value in aggregate_lld(_run_lld(smil_path, config_path, wav_path, lld_option)).items():
+            features.setdefault(feature, value)
+
+    if not features:
+        raise ValueError("OpenSMILE LLD output empty – config may not output features.")
+    return features
+
+
+# ----------------------------------------------------
+# Worker side: runs inside the OpenSMILE process pool
+# ----------------------------------------------------
+def _extract_batch(jobs: List[Tuple[np.ndarray, int]]) -> List[dict]:
+    """
+    Run several queued answers in one pool round trip.
+    SMILExtract takes a single input per run, so each file still gets its own
+    process, but the batch shares one IPC hop and one warm worker.
+    """
+    results = []
+    for samples, sample_rate in jobs:
+        started = time.perf_counter()
+        timings = {}
+        wav_path = None
+        try:
+            fd, wav_path = tempfile.mkstemp(suffix=".wav")
+            os.close(fd)
+            sf.write(wav_path, samples, sample_rate, subtype="PCM_16")
+            timings["write_wav"] = time.perf_counter() - started
+
+            extract_started = time.perf_counter()
+            features = extract_opensmile_features(wav_path)
+            timings["extract"] = time.perf_counter() - extract_started
+
+            results.append({"features": features, "error": None})
+        except Exception as e:
+            results.append({"features": None, "error": e})
+        finally:
+            if wav_path and os.path.exists(wav_path):
+                os.remove(wav_path)
+            timings["worker_total"] = time.perf_counter() - started
+            results[-1]["timings"] = timings
+    return results
+
+
+# ----------------------------------------------------
+# Event-loop side: queue + batching dispatcher
+# ----------------------------------------------------
+class OpenSmileService:
+    """
+    Exact-parity OpenSMILE extraction without blocking the event loop.
+    Requests go to a persistent pool of OPENSMILE_WORKERS processes. While every
+    worker is busy, requests queue up and the next free worker takes up to
+    OPENSMILE_BATCH_SIZE of them in one invocation; an idle worker never waits.
+    """
+
+    def __init__(self, workers: int = None, batch_size: int = None):
+        self.workers = workers or settings.OPENSMILE_WORKERS
+        self.batch_size = batch_size or settings.OPENSMILE_BATCH_SIZE
+        self._pool = None
+        self._queue = None
+        self._dispatcher = None
+        self._slots = None
+        self._busy = 0
+
+    def _ensure_started(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._pool = self._pool or new_process_pool(self.workers)
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.workers)
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    async def extract(self, audio) -> Tuple[dict, dict]:
+        """Returns (features, timings) for one DecodedAudio."""
+        if not opensmile_available():
+            raise FileNotFoundError("OpenSMILE binary or config missing")
+
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((audio, future, time.perf_counter()))
+        return await future
+
+    async def _dispatch(self):
+        while True:
+            first = await self._queue.get()
+            # Wait for a free worker; meanwhile new requests keep queueing behind `first`
+            await self._slots.acquire()
+
+            # Spread the backlog over the idle workers, capped at batch_size each
+            idle = self.workers - self._busy
+            share = -(-(1 + self._queue.qsize()) // idle)
+            batch = [first]
+            while len(batch) < min(share, self.batch_size) and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self._busy += 1
+            asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        try:
+            jobs = [(audio.samples, audio.sample_rate) for audio, _, _ in batch]
+            results = await loop.run_in_executor(self._pool, _extract_batch, jobs)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._busy -= 1
+            self._slots.release()
+
+        finished = time.perf_counter()
+        for (audio, future, enqueued), result in zip(batch, results):
+            if future.done():
+                continue
+            timings = dict(result["timings"])
+            timings["queue_wait"] = submitted - enqueued
+            timings["batch_size"] = len(batch)
+            timings["total"] = finished - enqueued
+            if result["error"] is not None:
+                future.set_exception(result["error"])
+            else:
+                future.set_result((result["features"], timings))
+
+    def close(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+        if self._pool is not None:
+            # A SMILExtract run can take seconds; do not hold the shutdown hook for it
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+opensmile_service = OpenSmileService()
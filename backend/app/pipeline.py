@@ -0,0 +1,112 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class StageError(Exception):
+    """Wraps the first exception raised inside a stage, keeping its name."""
+
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"{stage}: {error!r}")
+        self.stage = stage
+        self.error = error
+
+
+@dataclass
+class Stage:
+    """
+    One node of the pipeline graph.
+    `run` receives the results of all finished stages (keyed by name);
+    `on_done` is awaited with the stage's result as soon as it is available.
+    """
+    name: str
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]
+    deps: Tuple[str, ...] = field(default_factory=tuple)
+    on_done: Optional[Callable[[Any], Awaitable[None]]] = None
+
+
+class StageGraph:
+    """
+    `observer`, if given, gets stage_started(name) and
+    stage_finished(name, seconds, error) around every stage that runs.
+    """
+
+    def __init__(self, stages: List[Stage], observer=None):
+        self.observer = observer
+        self.stages = {s.name: s for s in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Duplicate stage names in pipeline graph")
+        self.order = self._toposort()
+
+    def _toposort(self) -> List[Stage]:
+        order, state = [], {}
+
+        def visit(name, path=()):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Cycle in pipeline graph: {' -> '.join(path + (name,))}")
+            if name not in self.stages:
+                raise ValueError(f"Unknown pipeline stage: {name}")
+            state[name] = "visiting"
+            for dep in self.stages[name].deps:
+                visit(dep, path + (name,))
+            state[name] = "done"
+            order.append(self.stages[name])
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    async def run(self, results: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Start every stage as soon as its dependencies finish.
+        Stages already present in `results` are treated as done and skipped.
+        """
+        results = dict(results or {})
+        tasks: Dict[str, asyncio.Future] = {}
+
+        async def run_stage(stage: Stage):
+            if stage.deps:
+                await asyncio.gather(*(tasks[d] for d in stage.deps))
+            observer = self.observer
+            if observer is not None:
+                observer.stage_started(stage.name)
+            started = time.perf_counter()
+            error = None
+            try:
+                value = await stage.run(results)
+            except asyncio.CancelledError as e:
+                error = e
+                raise
+            except Exception as e:
+                error = e
+                raise StageError(stage.name, e) from e
+            finally:
+                if observer is not None:
+                    observer.stage_finished(stage.name, time.perf_counter() - started, error)
+            results[stage.name] = value
+            if stage.on_done is not None:
+                await stage.on_done(value)
+            return value
+
+        loop = asyncio.get_running_loop()
+        for stage in self.order:
+            if stage.name in results:
+                done = loop.create_future()
+                done.set_result(results[stage.name])
+                tasks[stage.name] = done
+            else:
+                tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            # Let cancelled stages unwind before surfacing the error
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        return results
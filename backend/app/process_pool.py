@@ -0,0 +1,17 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def new_process_pool(max_workers: int, initializer=None, initargs=()) -> ProcessPoolExecutor:
+    """
+    Process pool whose workers are not forked from the server process.
+    A plain fork copies every open fd, including the pipes of running ffmpeg
+    subprocesses; the worker then holds their write ends open and the
+    decoder never sees EOF. forkserver (spawn where unavailable) starts
+    workers from a clean process instead.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    return ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=context, initializer=initializer, initargs=initargs
+    )
@@ -0,0 +1,264 @@
+import asyncio
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+from .config import settings
+
+Handler = Callable[[str], None]
+
+
+class Broker:
+    """
+    Room fan-out between workers. ConnectionManager publishes every room
+    message here and receives it back through the handler it subscribed with,
+    so local and remote members see the same stream in the same order.
+    """
+
+    async def publish(self, room: str, text: str):
+        raise NotImplementedError
+
+    async def subscribe(self, room: str, handler: Handler):
+        raise NotImplementedError
+
+    async def unsubscribe(self, room: str):
+        raise NotImplementedError
+
+    def is_subscribed(self, room: str) -> bool:
+        """True once messages published to `room` are coming back to this worker."""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+# ----------------------------------------------------
+# Single-process broker (default)
+# ----------------------------------------------------
+class InMemoryBroker(Broker):
+    def __init__(self):
+        self.handlers: Dict[str, Handler] = {}
+
+    async def publish(self, room: str, text: str):
+        handler = self.handlers.get(room)
+        if handler is not None:
+            handler(text)
+
+    async def subscribe(self, room: str, handler: Handler):
+        self.handlers[room] = handler
+
+    async def unsubscribe(self, room: str):
+        self.handlers.pop(room, None)
+
+    def is_subscribed(self, room: str) -> bool:
+        return room in self.handlers
+
+
+# ----------------------------------------------------
+# Redis pub/sub over the plain RESP protocol
+# ----------------------------------------------------
+class RedisError(Exception):
+    pass
+
+
+def _encode_command(*args) -> bytes:
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(out)
+
+
+async def _read_reply(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Redis connection closed")
+    prefix, rest = line[:1], line[1:-2]
+    if prefix == b"+":
+        return rest.decode()
+    if prefix == b"-":
+        raise RedisError(rest.decode())
+    if prefix == b":":
+        return int(rest)
+    if prefix == b"$":
+        length = int(rest)
+        if length == -1:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if prefix == b"*":
+        length = int(rest)
+        if length == -1:
+            return None
+        return [await _read_reply(reader) for _ in range(length)]
+    raise RedisError(f"Unexpected RESP reply: {line!r}")
+
+
+class RedisBroker(Broker):
+    """
+    One connection for PUBLISH, one in subscriber mode. Rooms map to
+    channels `<prefix><room>`; the subscriber connection is re-established
+    (and every room re-subscribed) if it drops. A room counts as subscribed
+    from Redis' confirmation until it is unsubscribed or the connection drops.
+    """
+
+    RECONNECT_DELAY = 1.0
+
+    def __init__(self, url: str, channel_prefix: str = "room:", timeout: float = None):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.channel_prefix = channel_prefix
+        self.timeout = timeout or settings.BROKER_TIMEOUT_SECONDS
+        self.handlers: Dict[str, Handler] = {}
+        # room -> set while Redis has confirmed the subscription
+        self._confirmed: Dict[str, asyncio.Event] = {}
+        self._pub = None
+        self._pub_lock = asyncio.Lock()
+        self._pub_failed_at = float("-inf")
+        self._sub_writer: Optional[asyncio.StreamWriter] = None
+        self._sub_ready: Optional[asyncio.Event] = None
+        self._sub_task = None
+        self._closed = False
+
+    async def _open(self):
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+            if self.password:
+                writer.write(_encode_command("AUTH", self.password))
+                await writer.drain()
+                await asyncio.wait_for(_read_reply(reader), self.timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError(f"Redis at {self.host}:{self.port} did not answer within {self.timeout}s")
+        return reader, writer
+
+    # ---- publishing ----
+    async def publish(self, room: str, text: str):
+        """Raises ConnectionError / OSError when Redis cannot be reached."""
+        async with self._pub_lock:
+            if time.monotonic() - self._pub_failed_at < self.RECONNECT_DELAY:
+                # Fail fast instead of every broadcast waiting out the timeout
+                raise ConnectionError("Redis publish connection is down")
+            for attempt in (1, 2):
+                fresh = self._pub is None
+                try:
+                    if fresh:
+                        self._pub = await self._open()
+                    reader, writer = self._pub
+                    writer.write(_encode_command("PUBLISH", self.channel_prefix + room, text))
+                    await writer.drain()
+                    return await asyncio.wait_for(_read_reply(reader), self.timeout)
+                except (ConnectionError, OSError, asyncio.TimeoutError):
+                    if self._pub is not None:
+                        self._pub[1].close()
+                        self._pub = None
+                    # Only a stale pooled connection is worth a second try
+                    if fresh or attempt == 2:
+                        self._pub_failed_at = time.monotonic()
+                        raise
+
+    # ---- subscribing ----
+    def _ensure_subscriber(self):
+        if self._sub_task is None or self._sub_task.done():
+            self._sub_ready = asyncio.Event()
+            self._sub_task = asyncio.ensure_future(self._run_subscriber())
+
+    async def _send_sub(self, *args):
+        try:
+            await asyncio.wait_for(self._sub_ready.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError(f"Redis subscriber not connected after {self.timeout}s")
+        self._sub_writer.write(_encode_command(*args))
+        await self._sub_writer.drain()
+
+    async def subscribe(self, room: str, handler: Handler):
+        """
+        Returns once Redis has confirmed the subscription. Raises
+        ConnectionError if that takes longer than the timeout; the room stays
+        registered and is subscribed as soon as the connection comes back.
+        """
+        self.handlers[room] = handler
+        confirmed = self._confirmed.setdefault(room, asyncio.Event())
+        self._ensure_subscriber()
+        if confirmed.is_set():
+            return
+        started = time.monotonic()
+        await self._send_sub("SUBSCRIBE", self.channel_prefix + room)
+        remaining = max(0.0, self.timeout - (time.monotonic() - started))
+        try:
+            await asyncio.wait_for(confirmed.wait(), remaining)
+        except asyncio.TimeoutError:
+            raise ConnectionError(f"Redis did not confirm the subscription to {room} within {self.timeout}s")
+
+    async def unsubscribe(self, room: str):
+        self._confirmed.pop(room, None)
+        if self.handlers.pop(room, None) is not None and self._sub_ready and self._sub_ready.is_set():
+            await self._send_sub("UNSUBSCRIBE", self.channel_prefix + room)
+
+    def is_subscribed(self, room: str) -> bool:
+        confirmed = self._confirmed.get(room)
+        return confirmed is not None and confirmed.is_set()
+
+    def _on_subscription(self, kind: bytes, channel: bytes):
+        room = channel.decode()[len(self.channel_prefix):]
+        confirmed = self._confirmed.get(room)
+        if confirmed is None:
+            return
+        if kind == b"subscribe" and room in self.handlers:
+            confirmed.set()
+        elif kind == b"unsubscribe":
+            confirmed.clear()
+
+    async def _run_subscriber(self):
+        while not self._closed:
+            writer = None
+            try:
+                reader, writer = await self._open()
+                if self.handlers:
+                    writer.write(_encode_command(
+                        "SUBSCRIBE", *[self.channel_prefix + r for r in self.handlers]
+                    ))
+                    await writer.drain()
+                self._sub_writer = writer
+                self._sub_ready.set()
+
+                while True:
+                    reply = await _read_reply(reader)
+                    if not isinstance(reply, list) or len(reply) != 3:
+                        continue
+                    if reply[0] == b"message":
+                        room = reply[1].decode()[len(self.channel_prefix):]
+                        handler = self.handlers.get(room)
+                        if handler is not None:
+                            handler(reply[2].decode())
+                    elif reply[0] in (b"subscribe", b"unsubscribe"):
+                        self._on_subscription(reply[0], reply[1])
+            except asyncio.CancelledError:
+                raise
+            except (ConnectionError, OSError, RedisError):
+                self._sub_ready.clear()
+                await asyncio.sleep(self.RECONNECT_DELAY)
+            finally:
+                for confirmed in self._confirmed.values():
+                    confirmed.clear()
+                if writer is not None:
+                    writer.close()
+
+    async def close(self):
+        self._closed = True
+        if self._sub_task is not None:
+            self._sub_task.cancel()
+        if self._pub is not None:
+            self._pub[1].close()
+            self._pub = None
+
+
+def build_broker(url: str = None) -> Broker:
+    url = url or settings.BROKER_URL
+    scheme = urlparse(url).scheme
+    if scheme == "redis":
+        return RedisBroker(url)
+    if scheme in ("", "memory"):
+        return InMemoryBroker()
+    raise ValueError(f"Unsupported BROKER_URL scheme: {scheme}")
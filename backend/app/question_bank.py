@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import random
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy.future import select
+
+from .config import settings
+from .db import async_session
+from .models import Question
+
+logger = logging.getLogger(__name__)
+
+def parse_tags(tags) -> FrozenSet[str]:
+    """Accepts "a, b" or ["a", "b"]; tags are matched case-insensitively."""
+    if not tags:
+        return frozenset()
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return frozenset(t.strip().lower() for t in tags if t and t.strip())
+
+
+@dataclass(frozen=True)
+class BankQuestion:
+    id: int
+    text: str
+    level: int
+    tags: Optional[str]
+
+    @classmethod
+    def from_row(cls, q: Question) -> "BankQuestion":
+        return cls(id=q.id, text=q.text, level=q.level or 1, tags=q.tags)
+
+
+# Served while the questions table is empty, same as the old crud fallback
+FALLBACK_QUESTIONS = [
+    BankQuestion(id=1, text="Explain the difference between a process and a thread.", level=1, tags=None),
+    BankQuestion(id=2, text="Describe how the virtual DOM works in React.", level=1, tags=None),
+    BankQuestion(id=3, text="What is a closure in JavaScript, and provide a use case?", level=1, tags=None),
+    BankQuestion(id=4, text="Walk me through the steps of an HTTP GET request.", level=1, tags=None),
+]
+
+
+class _Pool:
+    """Question ids for one (level, tag) key with O(1) add/remove."""
+
+    def __init__(self):
+        self.ids: List[int] = []
+        self.pos: Dict[int, int] = {}
+        self.version = 0
+
+    def add(self, qid: int):
+        if qid not in self.pos:
+            self.pos[qid] = len(self.ids)
+            self.ids.append(qid)
+            self.version += 1
+
+    def remove(self, qid: int):
+        i = self.pos.pop(qid, None)
+        if i is None:
+            return
+        last = self.ids.pop()
+        if last != qid:
+            self.ids[i] = last
+            self.pos[last] = i
+        self.version += 1
+
+
+class _Draw:
+    """
+    Sparse Fisher-Yates over a pool: each draw is O(1) and only the swapped
+    positions are stored, so starting an interview costs nothing up front.
+    If the pool changes underneath, the draw restarts and skips served ids.
+    """
+
+    def __init__(self, pool: _Pool):
+        self.pool = pool
+        self.version = pool.version
+        self.remaining = len(pool.ids)
+        self.swaps: Dict[int, int] = {}
+
+    def next(self) -> Optional[int]:
+        if self.version != self.pool.version:
+            self.__init__(self.pool)
+        if self.remaining == 0:
+            return None
+        j = random.randrange(self.remaining)
+        last = self.remaining - 1
+        picked = self.swaps.get(j, j)
+        self.swaps[j] = self.swaps.pop(last, last)
+        self.remaining = last
+        return self.pool.ids[picked]
+
+
+class _InterviewState:
+    def __init__(self, generation: int):
+        self.served = set()
+        self.draws: Dict[Tuple[int, Optional[str]], _Draw] = {}
+        # Bank generation the draws were made against; load() replaces every pool
+        self.generation = generation
+
+
+class QuestionBank:
+    """
+    All questions held in memory and indexed by level and by (level, tag), so
+    /questions never queries the database. The index is kept current by ORM
+    events for writes made in this process and by a periodic refresh that
+    picks up new rows by id and reloads fully when rows have been deleted.
+    """
+
+    def __init__(self, max_interviews: int = None, refresh_seconds: float = None):
+        self.max_interviews = max_interviews or settings.QUESTION_BANK_MAX_INTERVIEWS
+        self.refresh_seconds = refresh_seconds or settings.QUESTION_BANK_REFRESH_SECONDS
+        self._questions: Dict[int, BankQuestion] = {}
+        self._pools: Dict[Tuple[int, Optional[str]], _Pool] = {}
+        self._interviews: "OrderedDict[object, _InterviewState]" = OrderedDict()
+        self._max_id = 0
+        self._generation = 0
+        self._refresher = None
+
+    # ---------------- index maintenance ----------------
+    def _keys(self, q: BankQuestion):
+        yield (q.level, None)
+        for tag in parse_tags(q.tags):
+            yield (q.level, tag)
+
+    def add(self, q: BankQuestion):
+        if q.id in self._questions:
+            self.remove(q.id)
+        self._questions[q.id] = q
+        for key in self._keys(q):
+            self._pools.setdefault(key, _Pool()).add(q.id)
+        self._max_id = max(self._max_id, q.id)
+
+    def remove(self, qid: int):
+        q = self._questions.pop(qid, None)
+        if q is None:
+            return
+        for key in self._keys(q):
+            pool = self._pools.get(key)
+            if pool is not None:
+                pool.remove(qid)
+
+    async def load(self):
+        async with async_session() as session:
+            rows = (await session.execute(select(Question))).scalars().all()
+        self._questions.clear()
+        self._pools.clear()
+        self._max_id = 0
+        # Draws still point at the old pools; make every interview start new ones
+        self._generation += 1
+        for row in rows:
+            self.add(BankQuestion.from_row(row))
+
+    async def refresh(self):
+        async with async_session() as session:
+            count = (await session.execute(select(func.count(Question.id)))).scalar_one()
+            rows = (await session.execute(select(Question).where(Question.id > self._max_id))).scalars().all()
+        for row in rows:
+            self.add(BankQuestion.from_row(row))
+        if count != len(self._questions):
+            # Rows were deleted outside this process. Only the row count is
+            # compared: edits to existing rows made by other processes are not
+            # picked up until the next restart or full load.
+            await self.load()
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Question bank refresh failed")
+
+    async def start(self):
+        await self.load()
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.ensure_future(self._refresh_loop())
+
+    async def close(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            await asyncio.gather(self._refresher, return_exceptions=True)
+            self._refresher = None
+
+    # ---------------- sampling ----------------
+    def _state(self, interview_key) -> _InterviewState:
+        if interview_key is None:
+            return _InterviewState(self._generation)
+        state = self._interviews.get(interview_key)
+        if state is None:
+            state = self._interviews[interview_key] = _InterviewState(self._generation)
+            while len(self._interviews) > self.max_interviews:
+                self._interviews.popitem(last=False)
+        else:
+            self._interviews.move_to_end(interview_key)
+        return state
+
+    def sample(self, level: int = 1, limit: int = 5, tag: str = None, interview_key=None) -> List[BankQuestion]:
+        """
+        Up to `limit` random questions for the level (and tag). With an
+        interview_key, questions already served to that interview are not
+        repeated; the result shrinks once its pool is used up.
+        """
+        if not self._questions:
+            return FALLBACK_QUESTIONS[:limit]
+
+        key = (level, tag.strip().lower() if tag else None)
+        pool = self._pools.get(key)
+        if pool is None or not pool.ids:
+            return []
+
+        state = self._state(interview_key)
+        if state.generation != self._generation:
+            # Bank reloaded since this interview last drew; served ids still count
+            state.draws.clear()
+            state.generation = self._generation
+        draw = state.draws.get(key)
+        if draw is None:
+            draw = state.draws[key] = _Draw(pool)
+
+        picked = []
+        while len(picked) < limit:
+            qid = draw.next()
+            if qid is None:
+                break
+            question = self._questions.get(qid)
+            if question is None or qid in state.served:
+                # Removed since the draw started, or served from another tag's pool
+                continue
+            state.served.add(qid)
+            picked.append(question)
+        return picked
+
+    def stats(self) -> dict:
+        return {
+            "questions": len(self._questions),
+            "pools": len(self._pools),
+            "interviews": len(self._interviews),
+        }
+
+
+question_bank = QuestionBank()
+
+
+# Writes through the ORM in this process update the index immediately
+@event.listens_for(Question, "after_insert")
+@event.listens_for(Question, "after_update")
+def _index_question(mapper, connection, target):
+    question_bank.add(BankQuestion.from_row(target))
+
+
+@event.listens_for(Question, "after_delete")
+def _unindex_question(mapper, connection, target):
+    question_bank.remove(target.id)
@@ -0,0 +1,271 @@
+"""
+Offline re-scoring of stored evaluations.
+
+    python -m app.rescore --checkpoint rescore.json
+    python -m app.rescore --checkpoint rescore.json --concurrency 16 --batch-size 500
+
+Runs evaluate_answer_with_gemini (current prompt, GEMINI_MODEL) again on
+every evaluation that has a stored transcript and acoustic features, in id
+order, and writes the new scores and feedback back. Rows come from a
+server-side cursor, at most --concurrency are being scored at once and
+results are written --batch-size at a time, so memory stays flat however
+many rows there are. Users' aggregates are shifted by the score changes.
+
+The checkpoint records the id up to which every row is written; run the same
+command again to resume after a crash or Ctrl-C. Rows Gemini could not score
+are left unchanged and their ids appended to <checkpoint>.failed. The LLM
+response cache is bypassed, so a changed prompt is actually used. On SQLite
+the database is switched to WAL so the open cursor does not block writes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from contextlib import aclosing
+from typing import AsyncIterator, List, Optional
+
+from sqlalchemy.future import select
+
+from .ai_evaluator import evaluate_answer_with_gemini, UNPARSEABLE_FEEDBACK
+from .config import settings
+from .crud import update_rescored_evaluations
+from .db import engine, init_db
+from .llm_cache import llm_cache
+from .models import Evaluation, Interview
+
+# "[acoustic status] " the pipeline puts in front of Gemini's feedback
+STATUS_PREFIX = re.compile(r"^\[[^\]]*\] ")
+MAX_ATTEMPTS = 3
+
+
+class Checkpoint:
+    """
+    Progress on disk: every row with id <= last_id has been written (or
+    recorded as failed). Rows finish out of order, so last_id only advances
+    over the contiguous run of finished rows.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.last_id = 0
+        self.counts = {"rescored": 0, "failed": 0}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.last_id = data["last_id"]
+            self.counts.update(data.get("counts", {}))
+        self._started = deque()
+        self._finished = set()
+
+    def started(self, row_id: int):
+        self._started.append(row_id)
+
+    def finished(self, row_ids: List[int]):
+        self._finished.update(row_ids)
+
+    def record_failures(self, row_ids: List[int]):
+        if self.path and row_ids:
+            with open(self.path + ".failed", "a") as f:
+                f.writelines(f"{row_id}\n" for row_id in row_ids)
+
+    def save(self):
+        while self._started and self._started[0] in self._finished:
+            self._finished.discard(self._started[0])
+            self.last_id = self._started.popleft()
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "last_id": self.last_id,
+                "counts": self.counts,
+                "model": settings.GEMINI_MODEL,
+                "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }, f)
+        os.replace(tmp, self.path)
+
+
+def _query(after_id: int, limit: int):
+    return (
+        select(
+            Evaluation.id,
+            Evaluation.question_text,
+            Evaluation.transcript,
+            Evaluation.acoustic_features,
+            Evaluation.correctness_score,
+            Evaluation.fluency_score,
+            Evaluation.combined_score,
+            Evaluation.feedback,
+            Evaluation.created_at,
+            Interview.user_id,
+        )
+        .outerjoin(Interview, Interview.id == Evaluation.interview_id)
+        .where(
+            Evaluation.id > after_id,
+            Evaluation.transcript.isnot(None),
+            Evaluation.transcript != "",
+            Evaluation.acoustic_features.isnot(None),
+        )
+        .order_by(Evaluation.id)
+        .limit(limit)
+    )
+
+
+async def _stream_rows(after_id: int, window: int, fetch_size: int) -> AsyncIterator:
+    """
+    Rows in id order through a server-side cursor fetching `fetch_size` at a
+    time. The cursor is reopened every `window` rows so no read transaction
+    stays open for the whole run.
+    """
+    while True:
+        seen = 0
+        async with engine.connect() as conn:
+            result = await conn.stream(_query(after_id, window).execution_options(yield_per=fetch_size))
+            async for row in result:
+                seen += 1
+                after_id = row.id
+                yield row
+        if seen < window:
+            return
+
+
+async def _rescore_row(row) -> Optional[dict]:
+    """The updated row, or None when Gemini could not score it."""
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            result = await evaluate_answer_with_gemini(row.question_text, row.transcript, row.acoustic_features)
+        except Exception as e:
+            print(f"evaluation {row.id}: {e!r}", file=sys.stderr)
+            return None
+        if result.get("degraded"):
+            # Gemini unavailable: wait out the breaker instead of failing row after row
+            await asyncio.sleep(settings.LLM_BREAKER_COOLDOWN_SECONDS)
+            continue
+        if result["feedback"] == UNPARSEABLE_FEEDBACK:
+            continue
+        break
+    else:
+        return None
+
+    prefix = STATUS_PREFIX.match(row.feedback or "")
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "created_at": row.created_at,
+        "old_correctness_score": row.correctness_score,
+        "old_fluency_score": row.fluency_score,
+        "old_combined_score": row.combined_score,
+        "correctness_score": result["correctness_score"],
+        "fluency_score": result["fluency_score"],
+        "combined_score": result["combined_score"],
+        "feedback": (prefix.group(0) if prefix else "") + result["feedback"],
+    }
+
+
+async def rescore(
+    checkpoint_path: str = None,
+    concurrency: int = None,
+    batch_size: int = 200,
+    window: int = 10000,
+    limit: int = None,
+) -> dict:
+    concurrency = concurrency or settings.LLM_MAX_CONCURRENCY
+    await init_db()
+    llm_cache.backend = None
+    if engine.dialect.name == "sqlite":
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+    checkpoint = Checkpoint(checkpoint_path)
+    slots = asyncio.Semaphore(concurrency)
+    # Workers block on a full queue, which in turn holds back the cursor
+    results = asyncio.Queue(maxsize=batch_size)
+    started_at = time.perf_counter()
+    done_this_run = 0
+
+    async def write(updated, failed):
+        nonlocal done_this_run
+        await update_rescored_evaluations(updated)
+        checkpoint.record_failures(failed)
+        checkpoint.counts["rescored"] += len(updated)
+        checkpoint.counts["failed"] += len(failed)
+        checkpoint.finished([r["id"] for r in updated] + failed)
+        checkpoint.save()
+        done_this_run += len(updated) + len(failed)
+        rate = done_this_run / max(time.perf_counter() - started_at, 1e-9)
+        print(
+            f"rescored {checkpoint.counts['rescored']}, failed {checkpoint.counts['failed']}, "
+            f"checkpoint id {checkpoint.last_id}, {rate:.1f} rows/s",
+            file=sys.stderr,
+        )
+        updated.clear()
+        failed.clear()
+
+    async def writer():
+        updated, failed = [], []
+        while True:
+            item = await results.get()
+            if item is None:
+                break
+            row_id, row = item
+            if row is None:
+                failed.append(row_id)
+            else:
+                updated.append(row)
+            if len(updated) + len(failed) >= batch_size:
+                await write(updated, failed)
+        if updated or failed:
+            await write(updated, failed)
+
+    async def worker(row):
+        try:
+            try:
+                updated = await _rescore_row(row)
+            except Exception as e:
+                # Nothing awaits this task; an escaping error would stall the checkpoint
+                print(f"evaluation {row.id}: {e!r}", file=sys.stderr)
+                updated = None
+            await results.put((row.id, updated))
+        finally:
+            slots.release()
+
+    writer_task = asyncio.ensure_future(writer())
+    workers = set()
+    try:
+        count = 0
+        async with aclosing(_stream_rows(checkpoint.last_id, window, fetch_size=min(window, 1000))) as rows:
+            async for row in rows:
+                if limit is not None and count >= limit:
+                    break
+                await slots.acquire()
+                checkpoint.started(row.id)
+                task = asyncio.ensure_future(worker(row))
+                workers.add(task)
+                task.add_done_callback(workers.discard)
+                count += 1
+        await asyncio.gather(*workers)
+    finally:
+        await results.put(None)
+        await writer_task
+    return dict(checkpoint.counts, last_id=checkpoint.last_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score stored evaluations with the current Gemini prompt.")
+    parser.add_argument("--checkpoint", help="progress file; re-run with the same file to resume")
+    parser.add_argument("--concurrency", type=int, help="answers scored at once (default LLM_MAX_CONCURRENCY)")
+    parser.add_argument("--batch-size", type=int, default=200, help="rows per UPDATE transaction")
+    parser.add_argument("--window", type=int, default=10000, help="rows read per cursor before it is reopened")
+    parser.add_argument("--limit", type=int, help="stop after this many rows (trial runs)")
+    args = parser.parse_args(argv)
+
+    counts = asyncio.run(rescore(args.checkpoint, args.concurrency, args.batch_size, args.window, args.limit))
+    print(f"rescored {counts['rescored']}, failed {counts['failed']}, checkpoint id {counts['last_id']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,79 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
-import datetime
-
-class UserCreate(BaseModel):
-    email: EmailStr
-    password: str
-    full_name: Optional[str] = None
-
-class UserOut(BaseModel):
-    id: int
-    email: EmailStr
-    full_name: Optional[str] = None
-    class Config:
-        orm_mode = True
-
-class Token(BaseModel):
-    access_token: str
-    token_type: str
-
-class InterviewCreate(BaseModel):
-    user_id: int
-
-class InterviewOut(BaseModel):
-    id: int
-    user_id: int
-    score: Optional[float]
-    feedback: Optional[str]
-    started_at: datetime.datetime
-    ended_at: Optional[datetime.datetime]
-    class Config:
-        orm_mode = True
-
-# NEW SCHEMA
-class QuestionOut(BaseModel):
-    id: int
-    text: str
-    level: int
-    tags: Optional[str]
-
-    class Config:
-        orm_mode = True
-        
-# NEW SCHEMA
-class ProfileStatsOut(BaseModel):
-    total_interviews: int
-    avg_score: float
-    last_feedback: str
-
-class EvaluationOut(BaseModel):
-    id: int
-    question_text: str
-    correctness_score: float
-    fluency_score: float
-    combined_score: float
-    feedback: str
-    created_at: datetime.datetime
-
-    class Config:
-        orm_mode = True
-
-class ProfileFullOut(BaseModel):
-    total_interviews: int
-    avg_correctness: float
-    avg_fluency: float
-    avg_combined: float
-    last_feedback: str
-    history: List[EvaluationOut]
+from pydantic import BaseModel, EmailStr
+from typing import Optional, List
+import datetime
+
+class UserCreate(BaseModel):
+    email: EmailStr
+    password: str
+    full_name: Optional[str] = None
+
+class UserOut(BaseModel):
+    id: int
+    email: EmailStr
+    full_name: Optional[str] = None
+    class Config:
+        orm_mode = True
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str
+
+class InterviewCreate(BaseModel):
+    user_id: int
+
+class InterviewOut(BaseModel):
+    id: int
+    user_id: int
+    score: Optional[float]
+    feedback: Optional[str]
+    started_at: datetime.datetime
+    ended_at: Optional[datetime.datetime]
+    class Config:
+        orm_mode = True
+
+# NEW SCHEMA
+class QuestionOut(BaseModel):
+    id: int
+    text: str
+    level: int
+    tags: Optional[str]
+
+    class Config:
+        orm_mode = True
+        
+# NEW SCHEMA
+class ProfileStatsOut(BaseModel):
+    total_interviews: int
+    avg_score: float
+    last_feedback: str
+
+class EvaluationScores(BaseModel):
+    correctness_score: float
+    fluency_score: float
+    combined_score: float
+    feedback: str
+
+class EvaluationOut(EvaluationScores):
+    id: int
+    question_text: str
+    created_at: datetime.datetime
+
+    class Config:
+        orm_mode = True
+
+# Structured output of the single combined Gemini call
+class CombinedEvaluationOut(EvaluationScores):
+    followup_question: str
+
+class ProfileFullOut(BaseModel):
+    total_interviews: int
+    avg_correctness: float
+    avg_fluency: float
+    avg_combined: float
+    last_feedback: str
+    history: List[EvaluationOut]
+    next_cursor: Optional[str] = None
+
+class EvaluationPage(BaseModel):
+    items: List[EvaluationOut]
+    next_cursor: Optional[str] = None
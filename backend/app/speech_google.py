@@ -1,36 +1,225 @@
-from google.cloud import speech
-from google.oauth2 import service_account
-from .config import settings
-import os
-
-def transcribe_audio_google(wav_path: str):
-    """
-    Transcribes WAV audio using Google Cloud Speech-to-Text
-    with EXPLICIT credentials (works reliably in FastAPI).
-    """
-
-    # Load the JSON file path from your .env
-    creds_path = settings.GOOGLE_APPLICATION_CREDENTIALS
-
-    if not creds_path or not os.path.exists(creds_path):
-        raise FileNotFoundError(f"Google STT credentials not found at: {creds_path}")
-
-    # Load credentials explicitly
-    credentials = service_account.Credentials.from_service_account_file(creds_path)
-
-    client = speech.SpeechClient(credentials=credentials)
-
-    with open(wav_path, "rb") as f:
-        audio = speech.RecognitionAudio(content=f.read())
-
-    config = speech.RecognitionConfig(
-        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-        sample_rate_hertz=16000,
-        language_code="en-US",
-        enable_automatic_punctuation=True,
-    )
-
-    response = client.recognize(config=config, audio=audio)
-
-    transcripts = [result.alternatives[0].transcript for result in response.results]
-    return " ".join(transcripts)
+from google.cloud import speech
+from google.oauth2 import service_account
+from .config import settings
+from .audio_decoder import DecodedAudio
+from .transcription import TranscriptResult, Word, transcribe_in_chunks
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import queue
+import threading
+import time
+import os
+
+# ----------------------------------------------------
+# Long-lived client + bounded STT worker pool
+# ----------------------------------------------------
+_client = None
+_client_lock = threading.Lock()
+
+stt_executor = ThreadPoolExecutor(
+    max_workers=settings.STT_MAX_WORKERS, thread_name_prefix="google-stt"
+)
+
+# Streaming sessions hold a thread for the whole answer, so they get their own pool
+stt_stream_executor = ThreadPoolExecutor(
+    max_workers=settings.STT_MAX_STREAMS, thread_name_prefix="google-stt-stream"
+)
+
+
+def get_speech_client() -> speech.SpeechClient:
+    """
+    Build the SpeechClient once with EXPLICIT credentials (works reliably in FastAPI).
+    The gRPC client is thread-safe, so every STT worker shares the same channel.
+    """
+    global _client
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None:
+            # Load the JSON file path from your .env
+            creds_path = settings.GOOGLE_APPLICATION_CREDENTIALS
+
+            if not creds_path or not os.path.exists(creds_path):
+                raise FileNotFoundError(f"Google STT credentials not found at: {creds_path}")
+
+            credentials = service_account.Credentials.from_service_account_file(creds_path)
+            _client = speech.SpeechClient(credentials=credentials)
+    return _client
+
+
+class SttStats:
+    """Running per-call latency / queue-wait totals for the STT pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def record(self, queue_wait: float, latency: float, ok: bool):
+        with self._lock:
+            self.in_flight = max(self.in_flight - 1, 0)
+            self.calls += 1
+            self.errors += 0 if ok else 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.total_queue_wait += queue_wait
+            self.max_queue_wait = max(self.max_queue_wait, queue_wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            calls = self.calls or 1
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "avg_latency_sec": self.total_latency / calls,
+                "max_latency_sec": self.max_latency,
+                "avg_queue_wait_sec": self.total_queue_wait / calls,
+                "max_queue_wait_sec": self.max_queue_wait,
+            }
+
+
+stt_stats = SttStats()
+
+
+def _recognition_config(sample_rate: int) -> speech.RecognitionConfig:
+    return speech.RecognitionConfig(
+        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+        sample_rate_hertz=sample_rate,
+        language_code="en-US",
+        enable_automatic_punctuation=True,
+        enable_word_time_offsets=True,
+    )
+
+
+def recognize_pcm(audio: DecodedAudio) -> TranscriptResult:
+    """Blocking recognize call for one chunk (under a minute); run it through transcribe_audio_google."""
+    client = get_speech_client()
+
+    recognition_audio = speech.RecognitionAudio(content=audio.pcm_bytes)
+    config = _recognition_config(audio.sample_rate)
+
+    response = client.recognize(config=config, audio=recognition_audio)
+
+    transcripts, words = [], []
+    for result in response.results:
+        if not result.alternatives:
+            continue
+        best = result.alternatives[0]
+        transcripts.append(best.transcript.strip())
+        words.extend(
+            Word(w.word, w.start_time.total_seconds(), w.end_time.total_seconds())
+            for w in best.words
+        )
+    return TranscriptResult(text=" ".join(transcripts), words=words)
+
+
+async def _transcribe_chunk(audio: DecodedAudio) -> TranscriptResult:
+    submitted = time.perf_counter()
+
+    def job():
+        started = time.perf_counter()
+        stt_stats.started()
+        ok = False
+        try:
+            result = recognize_pcm(audio)
+            ok = True
+            return result
+        finally:
+            stt_stats.record(started - submitted, time.perf_counter() - started, ok)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(stt_executor, job)
+
+
+async def transcribe_audio_google(audio: DecodedAudio) -> TranscriptResult:
+    """
+    Transcribes decoded PCM audio using Google Cloud Speech-to-Text
+    on the STT worker pool, so the event loop never blocks on the round trip.
+    Answers longer than STT_CHUNK_SECONDS are split at pauses and the chunks
+    transcribed concurrently; word times are relative to the whole answer.
+    """
+    return await transcribe_in_chunks(audio, _transcribe_chunk)
+
+
+# ----------------------------------------------------
+# Streaming recognition (live partial transcripts)
+# ----------------------------------------------------
+class StreamingRecognizer:
+    """
+    Feeds PCM chunks into streaming_recognize while the candidate speaks.
+    `on_partial(text)` is scheduled on the event loop for every interim result;
+    finish() returns the final transcript once the last chunk is sent.
+    """
+
+    def __init__(self, sample_rate: int, on_partial=None):
+        self.sample_rate = sample_rate
+        self.on_partial = on_partial
+        self._chunks = queue.Queue()
+        self._finals = []
+        self._future = None
+        self._loop = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._future = self._loop.run_in_executor(stt_stream_executor, self._run)
+
+    def feed(self, pcm: bytes):
+        self._chunks.put(pcm)
+
+    async def finish(self) -> str:
+        self._chunks.put(None)
+        return await self._future
+
+    def abort(self):
+        self._chunks.put(None)
+
+    def _requests(self):
+        while True:
+            chunk = self._chunks.get()
+            if chunk is None:
+                return
+            yield speech.StreamingRecognizeRequest(audio_content=chunk)
+
+    def _publish(self, text: str):
+        if self.on_partial is not None:
+            asyncio.run_coroutine_threadsafe(self.on_partial(text), self._loop)
+
+    def _run(self) -> str:
+        started = time.perf_counter()
+        stt_stats.started()
+        ok = False
+        try:
+            client = get_speech_client()
+            streaming_config = speech.StreamingRecognitionConfig(
+                config=_recognition_config(self.sample_rate),
+                interim_results=True,
+            )
+            responses = client.streaming_recognize(
+                config=streaming_config, requests=self._requests()
+            )
+            for response in responses:
+                for result in response.results:
+                    if not result.alternatives:
+                        continue
+                    text = result.alternatives[0].transcript
+                    if result.is_final:
+                        self._finals.append(text.strip())
+                        self._publish(" ".join(self._finals))
+                    else:
+                        self._publish(" ".join(self._finals + [text.strip()]))
+            ok = True
+            return " ".join(self._finals)
+        finally:
+            # Queue wait is not meaningful for a session that spans the recording
+            stt_stats.record(0.0, time.perf_counter() - started, ok)
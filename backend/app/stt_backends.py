@@ -0,0 +1,158 @@
+import asyncio
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from .audio_decoder import DecodedAudio
+from .config import settings
+from .process_pool import new_process_pool
+from .speech_google import SttStats, stt_stats, transcribe_audio_google
+from .transcription import TranscriptResult, Word, transcribe_in_chunks
+
+LOCAL_SAMPLE_RATE = 16000
+
+
+class SttBackend:
+    """Turns decoded PCM into a TranscriptResult; selected by STT_BACKEND."""
+    name = "base"
+    # Live partial transcripts need Google streaming recognition
+    supports_streaming = False
+
+    async def transcribe(self, audio: DecodedAudio) -> TranscriptResult:
+        raise NotImplementedError
+
+    def start(self):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+    def close(self):
+        pass
+
+
+class GoogleSttBackend(SttBackend):
+    name = "google"
+    supports_streaming = True
+
+    async def transcribe(self, audio: DecodedAudio) -> TranscriptResult:
+        return await transcribe_audio_google(audio)
+
+    def stats(self) -> dict:
+        return stt_stats.snapshot()
+
+
+# ----------------------------------------------------
+# Worker side: one faster-whisper model per pool process
+# ----------------------------------------------------
+_local_model = None
+
+
+def _load_local_model(model_name: str, threads: int, compute_type: str):
+    global _local_model
+    if _local_model is None:
+        # Optional dependency, only needed with STT_BACKEND=local
+        from faster_whisper import WhisperModel
+
+        _local_model = WhisperModel(
+            model_name, device="cpu", compute_type=compute_type, cpu_threads=threads
+        )
+    return _local_model
+
+
+def _warm_local_model(model_name: str, threads: int, compute_type: str):
+    """Pool initializer: load the model before the first answer arrives."""
+    try:
+        _load_local_model(model_name, threads, compute_type)
+    except Exception:
+        # Surfaces (with its real error) on the first transcribe call instead
+        pass
+
+
+def _local_transcribe(samples: np.ndarray, sample_rate: int, model_name: str, threads: int,
+                      compute_type: str) -> Tuple[str, List[Tuple[str, float, float]]]:
+    model = _load_local_model(model_name, threads, compute_type)
+
+    audio = samples.astype(np.float32) / 32768.0
+    if sample_rate != LOCAL_SAMPLE_RATE:
+        positions = np.arange(int(len(audio) * LOCAL_SAMPLE_RATE / sample_rate)) * sample_rate / LOCAL_SAMPLE_RATE
+        audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+    segments, _ = model.transcribe(
+        audio, language="en", beam_size=1, word_timestamps=True, vad_filter=False
+    )
+    texts, words = [], []
+    for segment in segments:
+        texts.append(segment.text.strip())
+        words.extend((w.word.strip(), w.start, w.end) for w in (segment.words or []))
+    return " ".join(t for t in texts if t), words
+
+
+class LocalSttBackend(SttBackend):
+    """
+    faster-whisper on CPU in STT_LOCAL_WORKERS processes, each holding the
+    model in memory for its whole life. No network round trip and no cloud
+    credentials; long answers still go through the chunked fan-out.
+    """
+    name = "local"
+
+    def __init__(self, model_name: str = None, workers: int = None):
+        self.model_name = model_name or settings.STT_LOCAL_MODEL
+        self.workers = workers or settings.STT_LOCAL_WORKERS
+        self._pool = None
+        self._stats = SttStats()
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            self._pool = new_process_pool(
+                self.workers,
+                initializer=_warm_local_model,
+                initargs=(self.model_name, settings.STT_LOCAL_THREADS, settings.STT_LOCAL_COMPUTE_TYPE),
+            )
+        return self._pool
+
+    async def _transcribe_chunk(self, audio: DecodedAudio) -> TranscriptResult:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self._stats.started()
+        ok = False
+        try:
+            text, words = await loop.run_in_executor(
+                self._ensure_pool(), _local_transcribe, audio.samples, audio.sample_rate,
+                self.model_name, settings.STT_LOCAL_THREADS, settings.STT_LOCAL_COMPUTE_TYPE,
+            )
+            ok = True
+        finally:
+            # Queue wait and run time are not separable across the process boundary
+            self._stats.record(0.0, time.perf_counter() - started, ok)
+        return TranscriptResult(text=text, words=[Word(*w) for w in words])
+
+    async def transcribe(self, audio: DecodedAudio) -> TranscriptResult:
+        # Chunks let several workers share one long answer
+        return await transcribe_in_chunks(audio, self._transcribe_chunk, fanout=self.workers)
+
+    def start(self):
+        """Spawn the workers (and load their models) ahead of the first answer."""
+        self._ensure_pool()
+
+    def stats(self) -> dict:
+        return self._stats.snapshot()
+
+    def close(self):
+        if self._pool is not None:
+            # Called from the async shutdown hook: never wait for running workers there
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def build_stt_backend() -> SttBackend:
+    kind = settings.STT_BACKEND.lower()
+    if kind == "google":
+        return GoogleSttBackend()
+    if kind == "local":
+        return LocalSttBackend()
+    raise ValueError(f"Unknown STT_BACKEND: {settings.STT_BACKEND}")
+
+
+stt_backend = build_stt_backend()
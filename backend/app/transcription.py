@@ -0,0 +1,114 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Tuple
+
+import numpy as np
+
+from .audio_decoder import DecodedAudio
+from .config import settings
+from .vad import frame_energy_db
+
+# ----------------------------------------------------
+# Transcript with word timings
+# ----------------------------------------------------
+@dataclass
+class Word:
+    text: str
+    start: float        # seconds from the start of the audio that was transcribed
+    end: float
+
+
+@dataclass
+class TranscriptResult:
+    text: str
+    words: List[Word] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        return self.text
+
+    def shifted(self, offset: float) -> "TranscriptResult":
+        return TranscriptResult(
+            text=self.text,
+            words=[Word(w.text, w.start + offset, w.end + offset) for w in self.words],
+        )
+
+    def mapped(self, to_time: Callable[[float], float]) -> "TranscriptResult":
+        return TranscriptResult(
+            text=self.text,
+            words=[Word(w.text, to_time(w.start), to_time(w.end)) for w in self.words],
+        )
+
+    def speech_rate(self) -> float:
+        """Words per second between the first word's start and the last word's end; 0 without timings."""
+        if not self.words:
+            return 0.0
+        span = self.words[-1].end - self.words[0].start
+        return len(self.words) / span if span > 0 else 0.0
+
+    @classmethod
+    def join(cls, parts: List["TranscriptResult"]) -> "TranscriptResult":
+        texts = [p.text.strip() for p in parts if p.text and p.text.strip()]
+        return cls(text=" ".join(texts), words=[w for p in parts for w in p.words])
+
+
+# ----------------------------------------------------
+# Segmenter: cut long answers at the quietest point
+# ----------------------------------------------------
+FRAME_SEC = 0.02
+SMOOTH_FRAMES = 10          # 200 ms moving average, so a cut lands in a pause, not between syllables
+
+
+def split_at_silence(audio: DecodedAudio, max_seconds: float = None) -> List[Tuple[int, int]]:
+    """
+    (start, end) sample ranges, each at most max_seconds long. Every cut is
+    placed at the quietest 200 ms in the second half of the allowed window.
+    """
+    max_seconds = max_seconds or settings.STT_CHUNK_SECONDS
+    sr = audio.sample_rate
+    total = len(audio.samples)
+    max_len = int(max_seconds * sr)
+    if total <= max_len:
+        return [(0, total)]
+
+    frame_len = max(1, int(sr * FRAME_SEC))
+    energy = frame_energy_db(audio.as_float(), frame_len)
+    smoothed = np.convolve(energy, np.ones(SMOOTH_FRAMES) / SMOOTH_FRAMES, mode="same")
+
+    ranges, start = [], 0
+    while total - start > max_len:
+        lo = (start + max_len // 2) // frame_len
+        hi = min((start + max_len) // frame_len, len(smoothed))
+        cut = (lo + int(np.argmin(smoothed[lo:hi]))) * frame_len if hi > lo else start + max_len
+        cut = min(max(cut, start + frame_len), start + max_len)
+        ranges.append((start, cut))
+        start = cut
+    ranges.append((start, total))
+    return ranges
+
+
+async def transcribe_in_chunks(
+    audio: DecodedAudio,
+    transcribe_chunk: Callable[[DecodedAudio], Awaitable[TranscriptResult]],
+    max_seconds: float = None,
+    fanout: int = None,
+) -> TranscriptResult:
+    """
+    Transcribe an answer as bounded chunks, up to `fanout` at a time, and
+    stitch them back in order with word times relative to the whole answer.
+    """
+    fanout = fanout or settings.STT_CHUNK_FANOUT
+    ranges = split_at_silence(audio, max_seconds)
+    if len(ranges) == 1:
+        return await transcribe_chunk(audio)
+
+    slots = asyncio.Semaphore(fanout)
+    sr = audio.sample_rate
+
+    async def run(start, end):
+        chunk = DecodedAudio(samples=audio.samples[start:end], sample_rate=sr)
+        async with slots:
+            result = await transcribe_chunk(chunk)
+        return result.shifted(start / sr)
+
+    parts = await asyncio.gather(*(run(s, e) for s, e in ranges))
+    return TranscriptResult.join(list(parts))
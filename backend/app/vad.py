@@ -0,0 +1,181 @@
+import bisect
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+import numpy as np
+
+from .audio_decoder import DecodedAudio
+from .config import settings
+
+# ----------------------------------------------------
+# Energy / zero-crossing voice activity detection
+# ----------------------------------------------------
+FRAME_SEC = 0.02
+# Frames below this level are silence however quiet the recording is
+ABS_FLOOR_DB = -55.0
+# Fricatives ("s", "f") are quiet but cross zero often; accept them at a lower level
+FRICATIVE_ZCR = 0.25
+FRICATIVE_RELIEF_DB = 6.0
+# A recording with no quiet stretch at all is speech only if it is at least this loud
+CONTINUOUS_SPEECH_DB = -35.0
+
+
+@dataclass
+class VadResult:
+    audio: DecodedAudio                      # speech only; long pauses shortened
+    segments: List[Tuple[float, float]]      # speech (start, end) in the original audio, seconds
+    total_seconds: float
+    stats: dict = field(default_factory=dict)
+    # (start in trimmed audio, start in original audio) of each kept piece, seconds
+    timeline: List[Tuple[float, float]] = field(default_factory=list)
+
+    @property
+    def has_speech(self) -> bool:
+        return bool(self.segments)
+
+    def to_original(self, t: float) -> float:
+        """Map a time in the trimmed audio back to the original answer."""
+        if not self.timeline:
+            return t
+        i = max(0, bisect.bisect_right(self.timeline, (t, float("inf"))) - 1)
+        trimmed_start, original_start = self.timeline[i]
+        return original_start + (t - trimmed_start)
+
+
+def _runs(mask: np.ndarray) -> np.ndarray:
+    """(start, end) frame indices of each run of True, end exclusive."""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges.reshape(-1, 2)
+
+
+def _frames(x: np.ndarray, frame_len: int) -> np.ndarray:
+    n = len(x) // frame_len
+    return x[:n * frame_len].reshape(n, frame_len)
+
+
+def _energy_db(frames: np.ndarray) -> np.ndarray:
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def frame_energy_db(x: np.ndarray, frame_len: int) -> np.ndarray:
+    """RMS level of consecutive non-overlapping frames, dBFS."""
+    return _energy_db(_frames(x, frame_len))
+
+
+def _speech_frames(x: np.ndarray, frame_len: int) -> np.ndarray:
+    frames = _frames(x, frame_len)
+    n = len(frames)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+
+    energy_db = _energy_db(frames)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_len
+
+    # Adaptive threshold between this recording's quiet end and its peaks;
+    # the peak bound keeps answers without any silence from being cut up
+    margin = settings.VAD_ENERGY_MARGIN_DB
+    noise_floor, peak = np.percentile(energy_db, [10, 99])
+    if peak - noise_floor < margin and peak < CONTINUOUS_SPEECH_DB:
+        # Flat, quiet recording: background noise only
+        return np.zeros(n, dtype=bool)
+    threshold = max(min(noise_floor + margin, peak - 2 * margin), ABS_FLOOR_DB)
+
+    voiced = energy_db > threshold
+    fricative = (energy_db > threshold - FRICATIVE_RELIEF_DB) & (zcr > FRICATIVE_ZCR)
+    return voiced | fricative
+
+
+def _smooth(mask: np.ndarray, frame_sec: float) -> np.ndarray:
+    """Bridge short gaps between words, then drop blips too short to be speech."""
+    mask = mask.copy()
+    min_pause = int(round(settings.VAD_MIN_PAUSE_MS / 1000 / frame_sec))
+    min_speech = int(round(settings.VAD_MIN_SPEECH_MS / 1000 / frame_sec))
+
+    gaps = _runs(~mask)
+    if len(gaps):
+        inner = (gaps[:, 0] > 0) & (gaps[:, 1] < len(mask)) & (gaps[:, 1] - gaps[:, 0] < min_pause)
+        for start, end in gaps[inner]:
+            mask[start:end] = True
+
+    for start, end in _runs(mask):
+        if end - start < min_speech:
+            mask[start:end] = False
+    return mask
+
+
+def _pause_stats(segments: np.ndarray, total: float) -> dict:
+    speech = float(np.sum(segments[:, 1] - segments[:, 0])) if len(segments) else 0.0
+    pauses = segments[1:, 0] - segments[:-1, 1] if len(segments) > 1 else np.zeros(0)
+    span = float(segments[-1, 1] - segments[0, 0]) if len(segments) else 0.0
+    return {
+        "speech_seconds": round(speech, 3),
+        "total_seconds": round(total, 3),
+        "speech_ratio": round(speech / total, 4) if total > 0 else 0.0,
+        # Share of the time between first and last word spent silent
+        "pause_ratio": round(float(np.sum(pauses)) / span, 4) if span > 0 else 0.0,
+        "pause_count": int(len(pauses)),
+        "mean_pause_sec": round(float(np.mean(pauses)), 3) if len(pauses) else 0.0,
+        "longest_pause_sec": round(float(np.max(pauses)), 3) if len(pauses) else 0.0,
+        "leading_silence_sec": round(float(segments[0, 0]), 3) if len(segments) else round(total, 3),
+        "trailing_silence_sec": round(total - float(segments[-1, 1]), 3) if len(segments) else 0.0,
+    }
+
+
+def detect_speech(audio: DecodedAudio) -> VadResult:
+    """
+    Find speech segments and build a trimmed copy of the answer: leading and
+    trailing silence removed, pauses longer than VAD_MAX_KEPT_PAUSE_MS cut down
+    to that length. Pause statistics are computed on the original timing.
+    """
+    sr = audio.sample_rate
+    total = audio.duration
+    frame_len = max(1, int(sr * FRAME_SEC))
+    frame_sec = frame_len / sr
+
+    mask = _smooth(_speech_frames(audio.as_float(), frame_len), frame_sec)
+    runs = _runs(mask)
+    segments = runs * frame_sec
+
+    if not len(runs):
+        empty = DecodedAudio(samples=audio.samples[:0], sample_rate=sr)
+        return VadResult(audio=empty, segments=[], total_seconds=total, stats=_pause_stats(segments, total))
+
+    # Padding keeps word onsets / releases that fall under the threshold
+    pad = int(settings.VAD_PAD_MS / 1000 * sr)
+    keep_pause = int(settings.VAD_MAX_KEPT_PAUSE_MS / 1000 * sr)
+    pieces, timeline, kept, prev_end = [], [], 0, None
+
+    def keep(start, end):
+        nonlocal kept
+        timeline.append((kept / sr, float(start) / sr))
+        pieces.append(audio.samples[start:end])
+        kept += end - start
+
+    for start, end in runs * frame_len:
+        start, end = max(0, start - pad), min(len(audio.samples), end + pad)
+        if prev_end is not None and start > prev_end:
+            gap = start - prev_end
+            if gap > keep_pause:
+                # Keep half of the allowed pause on each side of the cut
+                keep(prev_end, prev_end + keep_pause // 2)
+                start -= keep_pause - keep_pause // 2
+            else:
+                start = prev_end
+        elif prev_end is not None:
+            start = prev_end
+        keep(start, end)
+        prev_end = end
+
+    trimmed = DecodedAudio(samples=np.concatenate(pieces), sample_rate=sr)
+    stats = _pause_stats(segments, total)
+    stats["trimmed_seconds"] = round(total - trimmed.duration, 3)
+    return VadResult(
+        audio=trimmed,
+        segments=[(round(float(s), 3), round(float(e), 3)) for s, e in segments],
+        total_seconds=total,
+        stats=stats,
+        timeline=timeline,
+    )
@@ -1,30 +1,172 @@
-from typing import Dict, List
-from fastapi import WebSocket
-
-class ConnectionManager:
-    def __init__(self):
-        # room_id -> list of websockets
-        self.active_rooms: Dict[str, List[WebSocket]] = {}
-
-    async def connect(self, room: str, websocket: WebSocket):
-        await websocket.accept()
-        if room not in self.active_rooms:
-            self.active_rooms[room] = []
-        self.active_rooms[room].append(websocket)
-
-    def disconnect(self, room: str, websocket: WebSocket):
-        if room in self.active_rooms:
-            self.active_rooms[room] = [ws for ws in self.active_rooms[room] if ws != websocket]
-            if not self.active_rooms[room]:
-                del self.active_rooms[room]
-
-    async def broadcast(self, room: str, message: dict):
-        if room not in self.active_rooms:
-            return
-        for connection in self.active_rooms[room]:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                pass
-
-manager = ConnectionManager()
+import asyncio
+import json
+import logging
+from typing import Dict
+from fastapi import WebSocket
+
+from .config import settings
+from .pubsub import Broker, build_broker
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+class _Connection:
+    """One socket with its own bounded send queue drained by a writer task."""
+
+    def __init__(self, manager: "ConnectionManager", room: str, websocket: WebSocket, max_queue: int):
+        self.manager = manager
+        self.room = room
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.writer = asyncio.ensure_future(self._write())
+
+    def offer(self, text: str) -> bool:
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _write(self):
+        while True:
+            text = await self.queue.get()
+            try:
+                await self.websocket.send_text(text)
+            except Exception:
+                self.manager._evict(self.room, self.websocket, code=1011)
+                return
+
+
+class ConnectionManager:
+    """
+    Local room members live here; messages travel through `broker` so rooms
+    can span several workers. A worker subscribes to a room only while it
+    has at least one local member. While that subscription is not confirmed
+    (Redis down or slow), broadcasts also go straight to the local members
+    and the subscribe is retried in the background.
+    """
+
+    def __init__(self, max_queue: int = None, broker: Broker = None):
+        # room_id -> {websocket: connection}; dict keys give O(1) membership
+        self.active_rooms: Dict[str, Dict[WebSocket, _Connection]] = {}
+        self.broker = broker or build_broker()
+        self.max_queue = max_queue or settings.WS_SEND_QUEUE_SIZE
+        self.dropped_messages = 0
+        self.evicted_connections = 0
+        self.publish_failures = 0
+        self.unsubscribed_broadcasts = 0
+        self._subscribing = set()
+
+    async def connect(self, room: str, websocket: WebSocket):
+        await websocket.accept()
+        first_member = room not in self.active_rooms
+        self.active_rooms.setdefault(room, {})[websocket] = _Connection(
+            self, room, websocket, self.max_queue
+        )
+        if first_member:
+            await self._subscribe(room)
+
+    async def _subscribe(self, room: str):
+        if room in self._subscribing or room not in self.active_rooms:
+            return
+        self._subscribing.add(room)
+        try:
+            await self.broker.subscribe(room, lambda text: self._deliver(room, text))
+        except Exception:
+            # The broker keeps the handler and subscribes once it reconnects;
+            # until then broadcast() also delivers locally
+            logger.warning("Broker subscribe for room %s failed", room, exc_info=True)
+        finally:
+            self._subscribing.discard(room)
+        # Everyone may have left while this was waiting
+        await self._release_room(room)
+
+    def disconnect(self, room: str, websocket: WebSocket):
+        members = self.active_rooms.get(room)
+        if members is None:
+            return
+        conn = members.pop(websocket, None)
+        if conn is not None:
+            conn.writer.cancel()
+        if not members:
+            del self.active_rooms[room]
+            asyncio.ensure_future(self._release_room(room))
+
+    async def _release_room(self, room: str):
+        # Someone may have joined again while this was scheduled
+        if room not in self.active_rooms:
+            try:
+                await self.broker.unsubscribe(room)
+            except Exception:
+                pass
+
+    def _evict(self, room: str, websocket: WebSocket, code: int):
+        """Drop a connection that overflowed or failed and close it."""
+        members = self.active_rooms.get(room)
+        if not members or websocket not in members:
+            return
+        self.evicted_connections += 1
+        self.disconnect(room, websocket)
+        asyncio.ensure_future(self._close_quietly(websocket, code))
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
+
+    async def broadcast(self, room: str, message: dict):
+        """Serialize once and publish to every worker that has members in `room`."""
+        text = json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+        metrics.payload_bytes.labels("ws_broadcast").observe(len(text))
+        # Checked before publishing: once confirmed, the message comes back through the broker
+        subscribed = self.broker.is_subscribed(room)
+        try:
+            await self.broker.publish(room, text)
+        except Exception:
+            # Members on this worker still get it; other workers miss it
+            self.publish_failures += 1
+            logger.warning("Broker publish to room %s failed; delivering locally only", room, exc_info=True)
+            self._deliver(room, text)
+            return
+        if not subscribed and room in self.active_rooms:
+            # The message will not come back to this worker; hand it over directly
+            self.unsubscribed_broadcasts += 1
+            self._deliver(room, text)
+            asyncio.ensure_future(self._subscribe(room))
+
+    def _deliver(self, room: str, text: str):
+        """
+        Broker callback: enqueue for every local member without awaiting any send.
+        A member whose queue is full is a stalled client: it is evicted.
+        """
+        members = self.active_rooms.get(room)
+        if not members:
+            return
+        for websocket, conn in list(members.items()):
+            if not conn.offer(text):
+                self.dropped_messages += 1
+                # 1013 = try again later
+                self._evict(room, websocket, code=1013)
+
+    def queue_depth(self, room: str = None) -> int:
+        rooms = [room] if room is not None else list(self.active_rooms)
+        return sum(
+            conn.queue.qsize()
+            for r in rooms
+            for conn in self.active_rooms.get(r, {}).values()
+        )
+
+    def stats(self) -> dict:
+        return {
+            "rooms": len(self.active_rooms),
+            "connections": sum(len(m) for m in self.active_rooms.values()),
+            "queue_depth": self.queue_depth(),
+            "dropped_messages": self.dropped_messages,
+            "evicted_connections": self.evicted_connections,
+            "publish_failures": self.publish_failures,
+            "unsubscribed_broadcasts": self.unsubscribed_broadcasts,
+        }
+
+manager = ConnectionManager()
@@ -0,0 +1,179 @@
+"""
+Conformance of the NumPy acoustic extractor against OpenSMILE on fixture WAVs.
+
+    OPENSMILE_PATH=/opt/opensmile/bin/SMILExtract \\
+        python -m bench.bench_acoustic_conformance \\
+        --config /opt/opensmile/config/emobase/emobase.conf \\
+        --config /opt/opensmile/config/is09-13/IS10_paraling.conf
+
+Compares, on every WAV in the fixture directory, what the two
+ACOUSTIC_BACKENDs return: extract_numpy_features against
+extract_opensmile_features run with SMILExtract (OPENSMILE_PATH, or
+--smilextract) and the --config list (default OPENSMILE_CONFIG_PATH). A
+feature passes when |numpy - opensmile| <= abs + rel * |opensmile| (see
+TOLERANCES); the exit status is 1 if any feature fails or no config produces
+it. emobase only produces pcm_intensity, the IS10 paralinguistic config the
+jitter, shimmer and voicing columns, hence two configs above (in production:
+OPENSMILE_CONFIG_PATH=emobase.conf,IS10_paraling.conf).
+
+The checked-in fixtures are synthetic voices (glottal pulses through three
+formant resonators) with known jitter, shimmer and pauses; regenerate them
+with --write-fixtures.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+from .common import setup_env
+
+setup_env()
+
+import numpy as np  # noqa: E402
+import soundfile as sf  # noqa: E402
+
+from app.acoustic_features import extract_numpy_features  # noqa: E402
+from app.audio_decoder import DecodedAudio  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.opensmile_integration import LLD_COLUMNS, config_paths, extract_opensmile_features  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "acoustic")
+SAMPLE_RATE = 16000
+
+# feature -> (absolute, relative) tolerance. Loudness follows emobase's
+# cIntensity exactly. Jitter and shimmer come from period marks like
+# cPitchJitter's but on an autocorrelation pitch track rather than SHS, and
+# voicing is an autocorrelation peak rather than the SHS score, so those
+# only have to land in the same band.
+TOLERANCES = {
+    "jitter": (0.002, 0.4),
+    "shimmer": (0.01, 0.3),
+    "loudness": (0.0, 0.01),
+    "voicing": (0.25, 0.0),
+}
+
+# name -> (f0 Hz, jitter, shimmer, pauses in seconds); relative std-devs per period
+VOICES = {
+    "steady_male_120hz": (120, 0.003, 0.02, ()),
+    "rough_male_110hz": (110, 0.01, 0.08, ()),
+    "steady_female_210hz": (210, 0.004, 0.03, ()),
+    "paused_female_190hz": (190, 0.008, 0.05, ((0.8, 1.4), (2.2, 2.5))),
+}
+
+
+# ----------------------------------------------------
+# Fixtures
+# ----------------------------------------------------
+def synth_voice(f0, jitter, shimmer, pauses, seconds=3.0, seed=0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    out = np.zeros(int(seconds * SAMPLE_RATE))
+    t = 0.0
+    while t < seconds - 0.02:
+        # Slow pitch drift like running speech, plus per-period perturbation
+        period = (1 + rng.normal(0, jitter)) / (f0 * (1 + 0.08 * np.sin(2 * np.pi * 0.7 * t)))
+        n = int(period * SAMPLE_RATE)
+        k = np.arange(n)
+        opening = int(0.6 * n)
+        pulse = np.where(
+            k < opening,
+            0.5 * (1 - np.cos(np.pi * k / opening)),
+            np.cos(np.pi * (k - opening) / (2 * (n - opening))),
+        )
+        start = int(t * SAMPLE_RATE)
+        flow = np.diff(pulse, prepend=0) * (1 + rng.normal(0, shimmer))
+        out[start:start + n] += flow[:len(out) - start]
+        t += period
+
+    for freq, bandwidth in ((700, 90), (1200, 110), (2600, 160)):
+        r = np.exp(-np.pi * bandwidth / SAMPLE_RATE)
+        a1, a2 = 2 * r * np.cos(2 * np.pi * freq / SAMPLE_RATE), -r * r
+        y, y1, y2 = np.zeros_like(out), 0.0, 0.0
+        for i, x in enumerate(out):
+            y[i] = (1 - r) * x + a1 * y1 + a2 * y2
+            y1, y2 = y[i], y1
+        out = y
+
+    out = 0.3 * out / np.max(np.abs(out))
+    for start, end in pauses:
+        out[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)] = 0.0
+    return out + rng.normal(0, 1e-3, len(out))
+
+
+def write_fixtures(directory: str):
+    os.makedirs(directory, exist_ok=True)
+    for seed, (name, (f0, jitter, shimmer, pauses)) in enumerate(VOICES.items(), 1):
+        path = os.path.join(directory, name + ".wav")
+        sf.write(path, synth_voice(f0, jitter, shimmer, pauses, seed=seed), SAMPLE_RATE, subtype="PCM_16")
+        print(f"wrote {path}")
+
+
+# ----------------------------------------------------
+# Runner
+# ----------------------------------------------------
+def numpy_features(wav_path: str) -> dict:
+    samples, sr = sf.read(wav_path, dtype="int16", always_2d=True)
+    return extract_numpy_features(DecodedAudio(samples=samples[:, 0], sample_rate=sr))
+
+
+def within(feature: str, value: float, reference: float):
+    absolute, relative = TOLERANCES[feature]
+    limit = absolute + relative * abs(reference)
+    return abs(value - reference) <= limit, limit
+
+
+def main(args) -> int:
+    if args.write_fixtures:
+        write_fixtures(args.fixtures)
+        return 0
+
+    wavs = sorted(glob.glob(os.path.join(args.fixtures, "*.wav")))
+    if not wavs:
+        raise SystemExit(f"No WAV fixtures in {args.fixtures}")
+    configs = args.config or config_paths()
+    for path in [args.smilextract] + configs:
+        if not os.path.isfile(path):
+            raise SystemExit(f"{path} not found; set OPENSMILE_PATH / --smilextract and --config")
+
+    failures = 0
+    numpy_seconds = smile_seconds = 0.0
+    print(f"{'fixture':24} {'feature':9} {'numpy':>11} {'opensmile':>11} {'diff':>10} {'limit':>10}")
+    for wav in wavs:
+        start = time.perf_counter()
+        ours = numpy_features(wav)
+        numpy_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        reference = extract_opensmile_features(wav, args.smilextract, configs, args.lld_option)
+        smile_seconds += time.perf_counter() - start
+
+        name = os.path.splitext(os.path.basename(wav))[0]
+        for feature in LLD_COLUMNS:
+            if feature not in reference:
+                failures += 1
+                print(f"{name:24} {feature:9} {ours[feature]:11.4g} {'missing':>11}  FAIL: no {LLD_COLUMNS[feature][0]} column")
+                continue
+            ok, limit = within(feature, ours[feature], reference[feature])
+            failures += not ok
+            diff = ours[feature] - reference[feature]
+            print(
+                f"{name:24} {feature:9} {ours[feature]:11.4g} {reference[feature]:11.4g} "
+                f"{diff:10.3g} {limit:10.3g}{'' if ok else '  FAIL'}"
+            )
+
+    print(f"\nnumpy {numpy_seconds * 1000:.0f}ms, SMILExtract {smile_seconds * 1000:.0f}ms for {len(wavs)} fixtures")
+    print(f"{failures} feature(s) out of tolerance" if failures else "all features within tolerance")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixtures", default=FIXTURES, help="directory of WAV fixtures")
+    parser.add_argument("--smilextract", default=settings.OPENSMILE_PATH)
+    parser.add_argument("--config", action="append", help="openSMILE config; repeat to merge columns from several")
+    parser.add_argument(
+        "--lld-option", default=settings.OPENSMILE_LLD_OPTION,
+        help="the config's command-line option for the frame-level CSV sink",
+    )
+    parser.add_argument("--write-fixtures", action="store_true", help="regenerate the synthetic fixtures and exit")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,71 @@
+"""
+Authenticated request throughput with and without the token → user cache.
+
+    python -m bench.bench_auth_cache --requests 2000 --concurrency 50
+
+Requests go through the ASGI app in-process (httpx.ASGITransport), so the
+numbers reflect handler + DB cost rather than socket overhead.
+"""
+import argparse
+import asyncio
+import time
+
+from .common import setup_env, percentile
+
+setup_env()
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.db import init_db  # noqa: E402
+from app.user_cache import user_cache  # noqa: E402
+
+
+async def _login(client):
+    creds = {"email": "bench@example.com", "password": "bench-password", "full_name": "Bench"}
+    await client.post("/register", json=creds)
+    resp = await client.post("/token", data={"username": creds["email"], "password": creds["password"]})
+    resp.raise_for_status()
+    return resp.json()["access_token"]
+
+
+async def _run(client, token, total, concurrency):
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            resp = await client.get("/profile/stats", headers=headers)
+            resp.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return total / elapsed, latencies
+
+
+async def main(args):
+    await init_db()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        token = await _login(client)
+        for enabled in (False, True):
+            user_cache.enabled = enabled
+            user_cache.clear()
+            await _run(client, token, min(100, args.requests), args.concurrency)  # warm-up
+            rps, latencies = await _run(client, token, args.requests, args.concurrency)
+            print(
+                f"cache={'on ' if enabled else 'off'}  {rps:8.1f} req/s  "
+                f"p50={percentile(latencies, 50) * 1000:.2f}ms  p95={percentile(latencies, 95) * 1000:.2f}ms"
+            )
+        print("cache stats:", user_cache.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,86 @@
+"""
+WebSocket message latency while a burst of logins hits /token.
+
+    python -m bench.bench_login_storm --logins 200 --concurrency 50
+
+A client in a room sends a message every few milliseconds and times the
+broadcast echo. The run is repeated with password hashing inline on the event
+loop (the old behaviour) and on the PasswordHasher process pool.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from .common import setup_env, percentile, InProcessServer
+
+setup_env()
+
+import httpx  # noqa: E402
+import websockets  # noqa: E402
+
+from app import auth  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+async def _inline_submit(fn, *args):
+    return fn(*args)
+
+
+async def _probe(ws_url, stop, latencies):
+    async with websockets.connect(f"{ws_url}/ws/bench-room") as ws:
+        while not stop.is_set():
+            sent = time.perf_counter()
+            await ws.send(json.dumps({"type": "ping", "sent": sent}))
+            await ws.recv()
+            latencies.append(time.perf_counter() - sent)
+            await asyncio.sleep(0.005)
+
+
+async def _storm(url, total, concurrency, creds):
+    remaining = iter(range(total))
+    statuses = {}
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        async def worker():
+            for _ in remaining:
+                resp = await client.post("/token", data=creds)
+                statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - start), statuses
+
+
+async def main(args):
+    creds = {"username": "storm@example.com", "password": "storm-password"}
+    async with InProcessServer(app, port=args.port) as server:
+        async with httpx.AsyncClient(base_url=server.url) as client:
+            await client.post("/register", json={"email": creds["username"], "password": creds["password"]})
+
+        for mode in ("inline", "pool"):
+            if mode == "inline":
+                auth.password_hasher._submit = _inline_submit
+            else:
+                del auth.password_hasher._submit
+
+            latencies = []
+            stop = asyncio.Event()
+            probe = asyncio.ensure_future(_probe(server.ws_url, stop, latencies))
+            await asyncio.sleep(0.2)
+            logins_per_s, statuses = await _storm(server.url, args.logins, args.concurrency, creds)
+            stop.set()
+            await probe
+            print(
+                f"{mode:6}  logins {logins_per_s:7.1f}/s {statuses}  ws echo "
+                f"p50={percentile(latencies, 50) * 1000:.1f}ms p99={percentile(latencies, 99) * 1000:.1f}ms "
+                f"max={max(latencies) * 1000:.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main(parser.parse_args()))
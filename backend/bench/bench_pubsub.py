@@ -0,0 +1,200 @@
+"""
+Room fan-out across workers through RedisBroker, against a local RESP stand-in.
+
+    python -m bench.bench_pubsub --messages 2000
+
+Two ConnectionManagers (the workers) share one room through FakeRedisServer.
+Checks, each printed as ok / FAIL (exit status 1 on any failure):
+
+- a broadcast from one worker reaches the other's members, in order
+- the channel subscription is dropped when a worker's last member leaves
+- when a subscribe is not confirmed but publishing works, broadcasts still
+  reach the local members, and the subscribe is retried
+- with Redis down, connect returns within the broker timeout and a
+  broadcast still reaches the local members
+- after Redis comes back, every room is re-subscribed and fan-out resumes
+
+then reports the cross-worker fan-out latency.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+
+from .common import setup_env, percentile
+
+setup_env()
+
+from app.pubsub import RedisBroker  # noqa: E402
+from app.websocket_manager import ConnectionManager  # noqa: E402
+
+from .fakes import FakeRedisServer  # noqa: E402
+
+ROOM = "bench-room"
+
+
+class FakeSocket:
+    def __init__(self):
+        self.received = asyncio.Queue()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.received.put_nowait(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def _receive(socket: FakeSocket, timeout: float):
+    try:
+        return await asyncio.wait_for(socket.received.get(), timeout)
+    except asyncio.TimeoutError:
+        return None
+
+
+def _drain(*sockets: FakeSocket):
+    for socket in sockets:
+        while not socket.received.empty():
+            socket.received.get_nowait()
+
+
+async def _wait_for(condition, timeout: float) -> bool:
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        await asyncio.sleep(0.02)
+    return True
+
+
+async def main(args) -> int:
+    # The outage check provokes broker warnings on purpose
+    logging.getLogger("app.websocket_manager").setLevel(logging.ERROR)
+    failures = 0
+
+    def check(name: str, ok: bool, detail: str = ""):
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'}  {name}{'  ' + detail if detail else ''}")
+
+    server = FakeRedisServer()
+    await server.start()
+    workers = [ConnectionManager(broker=RedisBroker(server.url, timeout=args.timeout)) for _ in range(2)]
+    try:
+        a, b = FakeSocket(), FakeSocket()
+        await workers[0].connect(ROOM, a)
+        await workers[1].connect(ROOM, b)
+        await _wait_for(lambda: server.subscribers("room:" + ROOM) == 2, args.timeout)
+
+        for i in range(5):
+            await workers[0].broadcast(ROOM, {"type": "seq", "i": i})
+        got = [await _receive(b, args.timeout) for _ in range(5)]
+        check("cross-worker delivery in order", [m and m["i"] for m in got] == list(range(5)), f"got {got}")
+
+        # ---- last member leaves ----
+        workers[1].disconnect(ROOM, b)
+        released = await _wait_for(lambda: server.subscribers("room:" + ROOM) == 1, args.timeout)
+        check("subscription released with the last member", released)
+        await workers[1].connect(ROOM, b)
+        await _wait_for(lambda: server.subscribers("room:" + ROOM) == 2, args.timeout)
+
+        # ---- subscribe unconfirmed, publish fine ----
+        server.ignore_subscribes = True
+        lone = FakeSocket()
+        worker = ConnectionManager(broker=RedisBroker(server.url, timeout=args.timeout))
+        workers.append(worker)
+        await worker.connect(ROOM, lone)
+        await worker.broadcast(ROOM, {"type": "unconfirmed"})
+        message = await _receive(lone, 1.0)
+        check(
+            "unsubscribed room still gets its broadcasts",
+            message == {"type": "unconfirmed"} and worker.unsubscribed_broadcasts == 1,
+            f"got {message}, unsubscribed_broadcasts={worker.unsubscribed_broadcasts}",
+        )
+        server.ignore_subscribes = False
+        await worker.broadcast(ROOM, {"type": "retry"})
+        confirmed = await _wait_for(lambda: worker.broker.is_subscribed(ROOM), args.timeout)
+        await asyncio.sleep(0.1)  # let "retry" reach the sockets before draining
+        _drain(a, b, lone)
+        await worker.broadcast(ROOM, {"type": "subscribed"})
+        got = [await _receive(s, args.timeout) for s in (a, b, lone)]
+        extra = await _receive(lone, 0.2)
+        check(
+            "subscribe retried after a broadcast",
+            confirmed and all(m == {"type": "subscribed"} for m in got) and extra is None,
+            f"got {got}, then {extra}",
+        )
+        worker.disconnect(ROOM, lone)
+        await _wait_for(lambda: server.subscribers("room:" + ROOM) == 2, args.timeout)
+
+        # ---- Redis down ----
+        await server.stop()
+        late = FakeSocket()
+        worker = ConnectionManager(broker=RedisBroker(server.url, timeout=args.timeout))
+        workers.append(worker)
+        start = time.perf_counter()
+        await worker.connect(ROOM, late)
+        waited = time.perf_counter() - start
+        check(
+            "connect returns while Redis is down", waited <= args.timeout + 0.5,
+            f"{waited:.2f}s (timeout {args.timeout}s)",
+        )
+        await worker.broadcast(ROOM, {"type": "outage"})
+        message = await _receive(late, 1.0)
+        check(
+            "broadcast falls back to local delivery",
+            message == {"type": "outage"} and worker.publish_failures == 1,
+            f"got {message}, publish_failures={worker.publish_failures}",
+        )
+
+        # ---- Redis back on the same port ----
+        await server.start()
+        resubscribed = await _wait_for(
+            lambda: server.subscribers("room:" + ROOM) == 3, 3 * RedisBroker.RECONNECT_DELAY + args.timeout
+        )
+        check("rooms re-subscribed after reconnect", resubscribed, f"{server.subscribers('room:' + ROOM)} subscribers")
+        # Publishing fails fast for RECONNECT_DELAY after an error
+        await asyncio.sleep(RedisBroker.RECONNECT_DELAY)
+        _drain(a, b, late)
+        await worker.broadcast(ROOM, {"type": "back"})
+        got = [await _receive(s, args.timeout) for s in (a, b, late)]
+        check("fan-out resumes after reconnect", all(m == {"type": "back"} for m in got), f"got {got}")
+
+        # ---- latency ----
+        _drain(a, b, late)
+        sent_at = {}
+        latencies = []
+        for i in range(args.messages):
+            sent_at[i] = time.perf_counter()
+            await workers[0].broadcast(ROOM, {"type": "seq", "i": i})
+            while not b.received.empty():
+                m = b.received.get_nowait()
+                latencies.append(time.perf_counter() - sent_at[m["i"]])
+        while len(latencies) < args.messages:
+            m = await _receive(b, args.timeout)
+            if m is None:
+                break
+            latencies.append(time.perf_counter() - sent_at[m["i"]])
+        check("every latency message delivered", len(latencies) == args.messages, f"{len(latencies)}/{args.messages}")
+        print(
+            f"\nfan-out over {len(latencies)} messages: p50={percentile(latencies, 50) * 1000:.2f}ms "
+            f"p95={percentile(latencies, 95) * 1000:.2f}ms max={max(latencies, default=0) * 1000:.2f}ms"
+        )
+    finally:
+        for worker in workers:
+            await worker.broker.close()
+        await server.stop()
+
+    print(f"{failures} check(s) failed" if failures else "all checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--timeout", type=float, default=1.0, help="broker connect/subscribe timeout, seconds")
+    sys.exit(asyncio.run(main(parser.parse_args())))
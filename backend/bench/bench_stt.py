@@ -0,0 +1,115 @@
+"""
+Latency and word error rate of the STT backends on fixture audio.
+
+    python -m bench.bench_stt fixtures/ --backends google,local --repeat 3
+
+A fixture is an audio file (WAV/FLAC/OGG, or WebM with ffmpeg installed)
+next to a .txt file with the same name holding the reference transcript.
+The Google backend needs real credentials (GOOGLE_APPLICATION_CREDENTIALS);
+the local backend needs faster-whisper and its model files.
+"""
+import argparse
+import asyncio
+import glob
+import os
+import re
+import time
+
+from .common import setup_env, percentile
+
+setup_env()
+
+import numpy as np  # noqa: E402
+import soundfile as sf  # noqa: E402
+
+from app.audio_decoder import DecodedAudio, decode_audio  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.stt_backends import GoogleSttBackend, LocalSttBackend  # noqa: E402
+
+BACKENDS = {"google": GoogleSttBackend, "local": LocalSttBackend}
+
+
+def _normalize(text: str):
+    return re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """(substitutions + deletions + insertions) / reference words."""
+    ref, hyp = _normalize(reference), _normalize(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1] / len(ref)
+
+
+async def _load(path: str) -> DecodedAudio:
+    try:
+        samples, sr = sf.read(path, dtype="float32", always_2d=True)
+    except RuntimeError:
+        with open(path, "rb") as f:
+            return await decode_audio(f.read())
+    mono = samples.mean(axis=1)
+    target = settings.AUDIO_SAMPLE_RATE
+    if sr != target:
+        positions = np.arange(int(len(mono) * target / sr)) * sr / target
+        mono = np.interp(positions, np.arange(len(mono)), mono)
+    return DecodedAudio(samples=(np.clip(mono, -1, 1) * 32767).astype(np.int16), sample_rate=target)
+
+
+def _fixtures(directory: str):
+    for txt in sorted(glob.glob(os.path.join(directory, "*.txt"))):
+        stem = os.path.splitext(txt)[0]
+        audio = [p for p in glob.glob(stem + ".*") if not p.endswith(".txt")]
+        if audio:
+            with open(txt, encoding="utf-8") as f:
+                yield audio[0], f.read().strip()
+
+
+async def main(args):
+    fixtures = [(path, ref, await _load(path)) for path, ref in _fixtures(args.fixtures)]
+    if not fixtures:
+        raise SystemExit(f"No fixtures (audio + .txt) found in {args.fixtures}")
+    total_audio = sum(audio.duration for _, _, audio in fixtures)
+    print(f"{len(fixtures)} fixtures, {total_audio:.1f}s of audio\n")
+
+    for name in args.backends.split(","):
+        backend = BACKENDS[name]()
+        backend.start()
+        try:
+            # First call pays for connection setup / model load; not counted
+            await backend.transcribe(fixtures[0][2])
+            latencies, errors, words = [], 0.0, 0
+            for _ in range(args.repeat):
+                for path, ref, audio in fixtures:
+                    start = time.perf_counter()
+                    result = await backend.transcribe(audio)
+                    latencies.append(time.perf_counter() - start)
+                    n = len(_normalize(ref))
+                    errors += word_error_rate(ref, result.text) * n
+                    words += n
+                    if args.verbose:
+                        print(f"  [{name}] {os.path.basename(path)}: {result.text}")
+            rtf = sum(latencies) / (total_audio * args.repeat)
+            print(
+                f"{name:7} WER={errors / max(words, 1):6.2%}  "
+                f"p50={percentile(latencies, 50) * 1000:7.0f}ms p95={percentile(latencies, 95) * 1000:7.0f}ms  "
+                f"real-time factor={rtf:.3f}"
+            )
+        except Exception as e:
+            print(f"{name:7} failed: {e!r}")
+        finally:
+            backend.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("fixtures", help="directory of audio files with .txt references")
+    parser.add_argument("--backends", default="google,local")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true")
+    asyncio.run(main(parser.parse_args()))
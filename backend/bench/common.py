@@ -0,0 +1,89 @@
+"""
+Shared setup for the benchmarks in this directory.
+
+Run them from backend/, e.g. ``python -m bench.bench_auth_cache``. Settings
+that the app requires but a benchmark does not exercise get throwaway values.
+"""
+import asyncio
+import os
+import tempfile
+
+
+def setup_env(**overrides):
+    """
+    Fills in settings for a benchmark run; `overrides` always win. The
+    database is a fresh SQLite file unless BENCH_DATABASE_URL is set, so a
+    DATABASE_URL exported for development is never written to.
+    """
+    work_dir = tempfile.mkdtemp(prefix="bench-")
+    defaults = {
+        "SECRET_KEY": "bench-secret",
+        "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+        "GEMINI_API_KEY": "bench",
+        "GOOGLE_APPLICATION_CREDENTIALS": os.path.join(work_dir, "none.json"),
+        "OPENSMILE_PATH": os.path.join(work_dir, "SMILExtract"),
+        "OPENSMILE_CONFIG_PATH": os.path.join(work_dir, "none.conf"),
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    os.environ["DATABASE_URL"] = os.environ.get(
+        "BENCH_DATABASE_URL", f"sqlite+aiosqlite:///{work_dir}/bench.db"
+    )
+    for key, value in overrides.items():
+        os.environ[key] = str(value)
+    return work_dir
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+class InProcessServer:
+    """uvicorn on a background task of the current loop; used as an async context manager."""
+
+    def __init__(self, app, host="127.0.0.1", port=8765):
+        import uvicorn
+
+        self.url = f"http://{host}:{port}"
+        self.ws_url = f"ws://{host}:{port}"
+        self._server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="on"))
+        self._task = None
+
+    async def __aenter__(self):
+        self._task = asyncio.ensure_future(self._server.serve())
+        while not self._server.started:
+            if self._task.done():
+                self._task.result()
+            await asyncio.sleep(0.01)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.should_exit = True
+        await self._task
+
+
+class LoopLagMonitor:
+    """Samples how late a periodic sleep wakes up; lag means the loop was blocked."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
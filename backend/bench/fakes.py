@@ -0,0 +1,307 @@
+"""
+Offline stand-ins for the external services used by the answer pipeline.
+
+Latencies are given as distribution specs:
+
+    const:200            always 200 ms
+    uniform:100,400      uniform between 100 and 400 ms
+    normal:300,50        mean 300 ms, stdev 50 ms (clipped at 0)
+    lognormal:300,0.5    median 300 ms, sigma 0.5 (long right tail)
+
+This module must not import `app`: the fake SMILExtract / ffmpeg executables
+import it from a fresh interpreter that has no settings in its environment.
+"""
+import asyncio
+import io
+import json
+import os
+import random
+import stat
+import sys
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = (
+    "the process thread memory scheduler react state closure function request "
+    "server cache index query latency client socket queue worker value because "
+    "so basically we then each when it would I think that is"
+).split()
+
+
+class LatencyDist:
+    def __init__(self, spec: str):
+        self.spec = spec
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",") if p]
+        if kind not in ("const", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self) -> float:
+        """Seconds."""
+        p = self.params
+        if self.kind == "const":
+            ms = p[0]
+        elif self.kind == "uniform":
+            ms = random.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            ms = max(0.0, random.gauss(p[0], p[1]))
+        else:
+            ms = random.lognormvariate(np.log(p[0]), p[1])
+        return ms / 1000.0
+
+
+# ----------------------------------------------------
+# Fixture audio
+# ----------------------------------------------------
+def make_fixture_wav(seconds: float = 8.0, sample_rate: int = 16000) -> bytes:
+    """Voiced bursts (150 Hz + harmonics) separated by short silences."""
+    import soundfile as sf
+
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    f0 = 150 + 10 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = (np.sin(2 * np.pi * 0.4 * t) > -0.3).astype(float)
+    signal = 0.3 * voiced * envelope + 0.003 * np.random.randn(t.size)
+
+    buf = io.BytesIO()
+    sf.write(buf, signal.astype(np.float32), sample_rate, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+# ----------------------------------------------------
+# Google STT / Gemini
+# ----------------------------------------------------
+def make_fake_recognize(latency: LatencyDist, words_per_second: float = 2.5):
+    """Blocking replacement for speech_google.recognize_pcm (runs on the STT pool)."""
+    from app.transcription import TranscriptResult, Word
+
+    def recognize_pcm(audio):
+        time.sleep(latency.sample())
+        n = max(1, int(audio.duration * words_per_second))
+        step = audio.duration / n
+        words = [Word(random.choice(WORDS), i * step, (i + 0.8) * step) for i in range(n)]
+        return TranscriptResult(text=" ".join(w.text for w in words), words=words)
+
+    return recognize_pcm
+
+
+class FakeGeminiClient:
+    """
+    Mimics client.models.generate_content(_stream); JSON when a config is
+    passed, else plain text. A stream spends STREAM_FIRST_CHUNK of the sampled
+    latency before its first chunk and the rest spread over the others.
+    """
+    STREAM_FIRST_CHUNK = 0.3
+    STREAM_CHUNK_CHARS = 24
+
+    def __init__(self, latency: LatencyDist):
+        self.latency = latency
+        self.models = SimpleNamespace(
+            generate_content=self.generate_content,
+            generate_content_stream=self.generate_content_stream,
+        )
+        self.calls = 0
+
+    def _response_text(self, config) -> str:
+        followup = f"Can you expand on {random.choice(WORDS)}?"
+        if config is None:
+            return followup
+        return json.dumps({
+            "correctness_score": round(random.uniform(40, 95), 1),
+            "fluency_score": round(random.uniform(40, 95), 1),
+            "combined_score": round(random.uniform(40, 95), 1),
+            "feedback": "Clear structure; give a concrete example next time. " + " ".join(random.choices(WORDS, k=30)),
+            "followup_question": followup,
+        })
+
+    def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        time.sleep(self.latency.sample())
+        return SimpleNamespace(text=self._response_text(config))
+
+    def generate_content_stream(self, model, contents, config=None):
+        self.calls += 1
+        latency = self.latency.sample()
+        text = self._response_text(config)
+        step = self.STREAM_CHUNK_CHARS
+        chunks = [text[i:i + step] for i in range(0, len(text), step)]
+        time.sleep(latency * self.STREAM_FIRST_CHUNK)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(latency * (1 - self.STREAM_FIRST_CHUNK) / (len(chunks) - 1))
+            yield SimpleNamespace(text=chunk)
+
+
+# ----------------------------------------------------
+# Redis (the pub/sub part of RESP)
+# ----------------------------------------------------
+def _resp(value) -> bytes:
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_resp(v) for v in value)
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class FakeRedisServer:
+    """
+    Enough of Redis for RedisBroker: AUTH, PING, PUBLISH, SUBSCRIBE and
+    UNSUBSCRIBE on a local port. stop() drops every client and the listener;
+    start() again serves on the same port, which simulates an outage. With
+    ignore_subscribes set, SUBSCRIBE is swallowed without a reply.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, password: str = None):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.channels = defaultdict(set)  # channel -> subscribed writers
+        self.published = 0
+        self.ignore_subscribes = False
+        self._server = None
+        self._clients = {}  # writer -> connection task
+
+    @property
+    def url(self) -> str:
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}{self.host}:{self.port}"
+
+    def subscribers(self, channel: str) -> int:
+        return len(self.channels.get(channel.encode(), ()))
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        for writer in list(self._clients):
+            writer.close()
+        await asyncio.gather(*self._clients.values(), return_exceptions=True)
+        await self._server.wait_closed()
+        self.channels.clear()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    @staticmethod
+    async def _read_command(reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    async def _serve(self, reader, writer):
+        self._clients[writer] = asyncio.current_task()
+        subscribed = set()
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                command = args[0].upper()
+                if command == b"AUTH":
+                    ok = self.password is not None and args[-1].decode() == self.password
+                    writer.write(b"+OK\r\n" if ok else b"-WRONGPASS invalid password\r\n")
+                elif command == b"PING":
+                    writer.write(b"+PONG\r\n")
+                elif command == b"PUBLISH":
+                    receivers = list(self.channels.get(args[1], ()))
+                    for receiver in receivers:
+                        receiver.write(_resp([b"message", args[1], args[2]]))
+                    self.published += 1
+                    writer.write(_resp(len(receivers)))
+                elif command == b"SUBSCRIBE" and self.ignore_subscribes:
+                    pass
+                elif command in (b"SUBSCRIBE", b"UNSUBSCRIBE"):
+                    for channel in args[1:]:
+                        if command == b"SUBSCRIBE":
+                            self.channels[channel].add(writer)
+                            subscribed.add(channel)
+                        else:
+                            self.channels.get(channel, set()).discard(writer)
+                            subscribed.discard(channel)
+                            if not self.channels.get(channel, True):
+                                del self.channels[channel]
+                        writer.write(_resp([command.lower(), channel, len(subscribed)]))
+                else:
+                    writer.write(b"-ERR unknown command '%s'\r\n" % args[0])
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for channel in subscribed:
+                self.channels.get(channel, set()).discard(writer)
+                if not self.channels.get(channel, True):
+                    del self.channels[channel]
+            self._clients.pop(writer, None)
+            writer.close()
+
+
+# ----------------------------------------------------
+# Fake executables (SMILExtract, ffmpeg)
+# ----------------------------------------------------
+def _write_script(path: str, entry: str):
+    with open(path, "w") as f:
+        f.write(
+            f"#!{sys.executable}\n"
+            "import sys\n"
+            f"sys.path.insert(0, {BACKEND_DIR!r})\n"
+            f"from bench.fakes import {entry}\n"
+            f"{entry}(sys.argv[1:])\n"
+        )
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def write_fake_smilextract(work_dir: str):
+    """Returns (binary, config); latency comes from BENCH_SMILE_LATENCY."""
+    config = os.path.join(work_dir, "fake_emobase.conf")
+    open(config, "w").close()
+    return _write_script(os.path.join(work_dir, "SMILExtract"), "fake_smilextract_main"), config
+
+
+def write_fake_ffmpeg(work_dir: str):
+    """Decodes WAV (not WebM) input to s16le mono; enough for the WAV fixture."""
+    return _write_script(os.path.join(work_dir, "ffmpeg"), "fake_ffmpeg_main")
+
+
+def fake_smilextract_main(argv):
+    """Frame-level LLD CSV (as written by -lld_csv_output) with plausible values."""
+    # -C config -I wav <lld option> out.csv
+    out = argv[argv.index("-I") + 3]
+    time.sleep(LatencyDist(os.environ.get("BENCH_SMILE_LATENCY", "const:150")).sample())
+    with open(out, "w") as f:
+        f.write("name;frameTime;jitterLocal_sma;shimmerLocal_sma;pcm_intensity_sma;voicingFinalUnclipped_sma\n")
+        for i in range(100):
+            f.write(
+                f"'unknown';{i * 0.01:.2f};{random.uniform(0.005, 0.02)};{random.uniform(0.03, 0.08)};"
+                f"{random.uniform(1e-6, 1e-4)};{random.uniform(0.5, 0.9)}\n"
+            )
+
+
+def fake_ffmpeg_main(argv):
+    import soundfile as sf
+
+    rate = int(argv[argv.index("-ar") + 1])
+    samples, source_rate = sf.read(io.BytesIO(sys.stdin.buffer.read()), dtype="float32", always_2d=True)
+    mono = samples.mean(axis=1)
+    if source_rate != rate:
+        positions = np.arange(int(len(mono) * rate / source_rate)) * source_rate / rate
+        mono = np.interp(positions, np.arange(len(mono)), mono)
+    sys.stdout.buffer.write((np.clip(mono, -1, 1) * 32767).astype("<i2").tobytes())
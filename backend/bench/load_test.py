@@ -0,0 +1,201 @@
+"""
+End-to-end load test for one worker, fully offline.
+
+    python -m bench.load_test --candidates 20 --answers 3
+    python -m bench.load_test --candidates 50 --stt lognormal:800,0.4 --gemini lognormal:1500,0.5
+
+Each simulated candidate registers, logs in, starts an interview, fetches
+questions and then streams fixture audio over /ws/{room_id} for every
+answer, waiting for the evaluation and follow-up before moving on. The app
+runs in-process under uvicorn with Google STT, Gemini and SMILExtract
+replaced by fakes with configurable latency (see bench/fakes.py).
+
+Without a real ffmpeg on PATH (or with --fake-ffmpeg) a stand-in decoder is
+used that only understands WAV, and the fixture is a generated WAV. Pass
+--audio answer.webm to send a recorded answer through a real ffmpeg.
+
+Reported: answer throughput, HTTP and per-stage latency percentiles
+(measured from audio_end to each pipeline message) and event-loop lag.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import time
+from collections import defaultdict
+
+from .common import setup_env, percentile, InProcessServer, LoopLagMonitor
+from . import fakes
+
+# Pipeline messages a candidate waits for after audio_end, in arrival order
+STAGE_MESSAGES = ("queued", "transcript_result", "acoustics", "first_scores", "evaluation", "followup")
+
+
+class Results:
+    def __init__(self):
+        self.http = defaultdict(list)
+        self.stages = defaultdict(list)
+        self.answers = 0
+        self.errors = defaultdict(int)
+
+    def error(self, kind):
+        self.errors[kind] += 1
+
+
+async def _timed(results, name, coro):
+    start = time.perf_counter()
+    resp = await coro
+    results.http[name].append(time.perf_counter() - start)
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def _answer(ws, results, audio, chunk_size, question, interview_id, timeout):
+    await ws.send(json.dumps({
+        "type": "audio_start",
+        "question": question,
+        "interview_id": interview_id,
+        "format": "audio/wav",
+    }))
+    for i in range(0, len(audio), chunk_size):
+        await ws.send(audio[i:i + chunk_size])
+    await ws.send(json.dumps({"type": "audio_end"}))
+    sent = time.perf_counter()
+
+    pending = {"evaluation", "followup"}
+    seen = set()
+    while pending:
+        msg = json.loads(await asyncio.wait_for(ws.recv(), timeout))
+        kind = msg.get("type")
+        if kind == "error":
+            results.error(msg.get("message", "error")[:60])
+            return
+        if kind == "evaluation_partial" and "scores" in msg:
+            # Time to first feedback with GEMINI_STREAMING
+            kind = "first_scores"
+        if kind in STAGE_MESSAGES and kind not in seen:
+            seen.add(kind)
+            results.stages[kind].append(time.perf_counter() - sent)
+        pending.discard(kind)
+    results.answers += 1
+
+
+async def _candidate(n, server, results, args, audio):
+    import httpx
+    import websockets
+
+    creds = {"email": f"candidate{n}@bench.example.com", "password": "bench-password"}
+    try:
+        async with httpx.AsyncClient(base_url=server.url, timeout=120) as client:
+            user = await _timed(results, "register", client.post("/register", json=creds))
+            token = (await _timed(results, "token", client.post(
+                "/token", data={"username": creds["email"], "password": creds["password"]}
+            )))["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            interview = await _timed(results, "start_interview", client.post(
+                "/start_interview", json={"user_id": user["id"]}, headers=headers
+            ))
+            questions = await _timed(results, "questions", client.get(
+                "/questions", params={"limit": args.answers, "interview_id": interview["id"]}, headers=headers
+            ))
+
+        async with websockets.connect(f"{server.ws_url}/ws/bench-{n}", max_size=None) as ws:
+            for i in range(args.answers):
+                question = questions[i % len(questions)]["text"]
+                await _answer(ws, results, audio, args.chunk_size, question, interview["id"], args.timeout)
+    except Exception as e:
+        results.error(type(e).__name__)
+
+
+def _report(results, elapsed, lag, fake_gemini):
+    def row(name, values):
+        if not values:
+            return f"  {name:18} -"
+        return (
+            f"  {name:18} n={len(values):<5} p50={percentile(values, 50) * 1000:8.1f}ms "
+            f"p95={percentile(values, 95) * 1000:8.1f}ms p99={percentile(values, 99) * 1000:8.1f}ms "
+            f"max={max(values) * 1000:8.1f}ms"
+        )
+
+    print(f"\nanswers completed: {results.answers} in {elapsed:.1f}s  ({results.answers / elapsed:.2f} answers/s)")
+    print(f"gemini calls: {fake_gemini.calls}")
+    if results.errors:
+        print("errors:", dict(results.errors))
+    print("http:")
+    for name, values in results.http.items():
+        print(row(name, values))
+    print("pipeline (from audio_end):")
+    for name in STAGE_MESSAGES:
+        print(row(name, results.stages.get(name, [])))
+    print("event loop lag:")
+    print(row("lag", lag.samples))
+
+    from app import metrics
+    print("server stage mean (pipeline_stage_seconds):")
+    for (stage,), child in sorted(metrics.stage_seconds._children.items()):
+        if child.count:
+            print(f"  {stage:18} n={child.count:<5} mean={child.sum / child.count * 1000:8.1f}ms")
+
+
+async def main(args):
+    work_dir = setup_env(
+        LLM_CACHE_BACKEND="off",
+        BENCH_SMILE_LATENCY=args.smile,
+        GEMINI_STREAMING="true" if args.stream else "false",
+    )
+    smile_path, smile_conf = fakes.write_fake_smilextract(work_dir)
+    overrides = {"OPENSMILE_PATH": smile_path, "OPENSMILE_CONFIG_PATH": smile_conf}
+    if args.fake_ffmpeg or not shutil.which("ffmpeg"):
+        overrides["FFMPEG_PATH"] = fakes.write_fake_ffmpeg(work_dir)
+        if args.audio:
+            raise SystemExit("--audio needs a real ffmpeg; the stand-in only decodes WAV")
+    os.environ.update(overrides)
+
+    # Settings are read at import time, so the app is imported only now
+    from app import ai_evaluator, speech_google
+    from app.main import app
+
+    speech_google.recognize_pcm = fakes.make_fake_recognize(fakes.LatencyDist(args.stt))
+    fake_gemini = fakes.FakeGeminiClient(fakes.LatencyDist(args.gemini))
+    ai_evaluator.client = fake_gemini
+
+    if args.audio:
+        with open(args.audio, "rb") as f:
+            audio = f.read()
+    else:
+        audio = fakes.make_fixture_wav(args.seconds)
+
+    results = Results()
+    lag = LoopLagMonitor()
+    async with InProcessServer(app, port=args.port) as server:
+        lag.start()
+        start = time.perf_counter()
+
+        async def staggered(n):
+            await asyncio.sleep(n * args.ramp / max(1, args.candidates))
+            await _candidate(n, server, results, args, audio)
+
+        await asyncio.gather(*(staggered(n) for n in range(args.candidates)))
+        elapsed = time.perf_counter() - start
+        await lag.stop()
+
+    _report(results, elapsed, lag, fake_gemini)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=10)
+    parser.add_argument("--answers", type=int, default=3, help="answers per candidate")
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which candidates arrive")
+    parser.add_argument("--audio", help="fixture answer (WebM needs a real ffmpeg); default: generated WAV")
+    parser.add_argument("--seconds", type=float, default=8.0, help="length of the generated fixture")
+    parser.add_argument("--chunk-size", type=int, default=16384)
+    parser.add_argument("--stt", default="lognormal:600,0.4", help="fake Google STT latency")
+    parser.add_argument("--gemini", default="lognormal:1200,0.5", help="fake Gemini latency")
+    parser.add_argument("--stream", action="store_true", help="stream Gemini responses (GEMINI_STREAMING)")
+    parser.add_argument("--smile", default="lognormal:150,0.3", help="fake SMILExtract latency")
+    parser.add_argument("--fake-ffmpeg", action="store_true", help="use the WAV-only stand-in decoder")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-message wait")
+    parser.add_argument("--port", type=int, default=8766)
+    asyncio.run(main(parser.parse_args()))